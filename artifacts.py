@@ -0,0 +1,315 @@
+"""
+Artifact files and the streaming download endpoint.
+
+Job artifacts (e.g. ZIP exports) are written to
+data/artifacts/<job_id>/<file name> instead of being held in memory or in
+the job table. When THEMESEEKER_ARTIFACT_PORT is set, a small HTTP server
+on a background thread streams them straight from disk, with Range support
+(resumable downloads) and short-lived HMAC-signed links, so the file never
+passes through Streamlit's websocket. Without it the app falls back to
+st.download_button.
+
+Configuration (environment variables):
+    THEMESEEKER_ARTIFACT_DIR        folder of the artifacts (default: data/artifacts/)
+    THEMESEEKER_ARTIFACT_PORT       port of the download endpoint (default: off)
+    THEMESEEKER_ARTIFACT_URL        public base URL of the endpoint, e.g. behind a
+                                    reverse proxy (default: http://localhost:<port>)
+    THEMESEEKER_ARTIFACT_SECRET     key that signs download links (default: random
+                                    per process, so links end with the process)
+    THEMESEEKER_ARTIFACT_TOKEN_TTL  seconds a download link stays valid (default: 300)
+"""
+import hashlib
+import hmac
+import mimetypes
+import os
+import re
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit, parse_qs
+
+from tracing import increment_counter, trace_span
+
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "artifacts")
+
+DEFAULT_TOKEN_TTL = 300
+
+# Bytes read from disk and written to the socket at a time
+CHUNK_SIZE = 64 * 1024
+
+_ARTIFACT_ID = re.compile(r'^[0-9a-f]{8,64}$')
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+_lock = threading.Lock()
+_secret = os.urandom(32)
+_server = None
+_server_failed = False
+
+
+def artifact_dir():
+    return os.environ.get("THEMESEEKER_ARTIFACT_DIR", DEFAULT_ARTIFACT_DIR)
+
+
+def _safe_name(name):
+    """Reject anything that is not a plain file name."""
+    name = os.path.basename(name or "")
+    if not name or name.startswith("."):
+        raise ValueError(f"Invalid artifact name: {name!r}")
+    return name
+
+
+def artifact_path(artifact_id, name):
+    """
+    Path of an artifact file.
+
+    Parameters:
+    artifact_id (str): Hex ID of the artifact (the job ID)
+    name (str): File name
+
+    Returns:
+    str: Absolute path
+    """
+    if not _ARTIFACT_ID.match(artifact_id or ""):
+        raise ValueError(f"Invalid artifact ID: {artifact_id!r}")
+    return os.path.join(artifact_dir(), artifact_id, _safe_name(name))
+
+
+def new_artifact_file(suffix=""):
+    """
+    Path of a fresh temporary file in the artifact folder, for writing an
+    artifact before it is stored under its ID with store_artifact().
+    """
+    folder = os.path.join(artifact_dir(), "tmp")
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{os.getpid()}-{threading.get_ident()}-{time.time_ns()}{suffix}")
+
+
+def store_artifact(artifact_id, name, data=None, source_path=None):
+    """
+    Store an artifact from bytes or by moving a file written with
+    new_artifact_file().
+
+    Parameters:
+    artifact_id (str): Hex ID of the artifact (the job ID)
+    name (str): File name
+    data (bytes): Content, when not moving a file
+    source_path (str): File to move into place
+
+    Returns:
+    str: Path of the stored artifact
+    """
+    path = artifact_path(artifact_id, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if source_path is not None:
+        os.replace(source_path, path)
+    else:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as artifact_file:
+            artifact_file.write(data)
+        os.replace(tmp_path, path)
+    return path
+
+
+def delete_artifact(artifact_id):
+    """Delete the artifacts stored under an ID, if any."""
+    path = os.path.dirname(artifact_path(artifact_id, "artifact"))
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def prune_artifacts(max_age):
+    """Delete artifacts (and leftover temporary files) older than max_age seconds."""
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(artifact_dir()))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.name == "tmp":
+                for tmp_entry in os.scandir(entry.path):
+                    if tmp_entry.stat().st_mtime < cutoff:
+                        os.remove(tmp_entry.path)
+            elif entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def _signing_key():
+    secret = os.environ.get("THEMESEEKER_ARTIFACT_SECRET")
+    return secret.encode("utf-8") if secret else _secret
+
+
+def artifact_token(artifact_id, name, expires):
+    """HMAC-SHA256 signature of an artifact link."""
+    message = f"{artifact_id}/{name}/{int(expires)}".encode("utf-8")
+    return hmac.new(_signing_key(), message, hashlib.sha256).hexdigest()
+
+
+def verify_token(artifact_id, name, expires, token):
+    """
+    Check a link signature and its expiry time.
+
+    Returns:
+    bool: True if the link is authentic and not expired
+    """
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(artifact_token(artifact_id, name, expires), token or "")
+
+
+def artifact_url(artifact_id, name, ttl=None):
+    """
+    Signed, short-lived download link of an artifact.
+
+    Parameters:
+    artifact_id (str): Hex ID of the artifact (the job ID)
+    name (str): File name
+    ttl (int): Seconds the link stays valid (default: THEMESEEKER_ARTIFACT_TOKEN_TTL or 300)
+
+    Returns:
+    str: The URL, or None when the download endpoint is not running
+    """
+    port = start_artifact_server()
+    if port is None:
+        return None
+    ttl = ttl or int(os.environ.get("THEMESEEKER_ARTIFACT_TOKEN_TTL", DEFAULT_TOKEN_TTL))
+    expires = int(time.time()) + ttl
+    base_url = os.environ.get("THEMESEEKER_ARTIFACT_URL") or f"http://localhost:{port}"
+    token = artifact_token(artifact_id, name, expires)
+    return f"{base_url.rstrip('/')}/artifacts/{artifact_id}/{quote(name)}?expires={expires}&token={token}"
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header.
+
+    Parameters:
+    header (str): The header value, e.g. "bytes=0-1023", "bytes=1024-" or "bytes=-500"
+    size (int): File size
+
+    Returns:
+    tuple: (start, end) inclusive, or None for the whole file
+
+    Raises:
+    ValueError: When the range cannot be satisfied
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match:
+        # Unsupported forms (e.g. several ranges) get the whole file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class _ArtifactHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        url = urlsplit(self.path)
+        parts = url.path.split("/")
+        if len(parts) != 4 or parts[1] != "artifacts":
+            self.send_error(404)
+            return
+        artifact_id, name = parts[2], unquote(parts[3])
+        query = parse_qs(url.query)
+        if not verify_token(artifact_id, name, query.get('expires', [None])[0], query.get('token', [None])[0]):
+            self.send_error(403, "Invalid or expired link")
+            return
+        try:
+            path = artifact_path(artifact_id, name)
+            artifact_file = open(path, "rb")
+        except (ValueError, OSError):
+            self.send_error(404)
+            return
+
+        with artifact_file, trace_span("artifact.serve", file=name):
+            size = os.fstat(artifact_file.fileno()).st_size
+            try:
+                byte_range = parse_range(self.headers.get("Range"), size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = byte_range or (0, size - 1)
+            length = max(0, end - start + 1)
+
+            self.send_response(206 if byte_range else 200)
+            self.send_header("Content-Type", mimetypes.guess_type(name)[0] or "application/octet-stream")
+            self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(name)}")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Cache-Control", "private, no-store")
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            if not send_body:
+                return
+
+            # Stream from disk in chunks; the file is never loaded whole
+            artifact_file.seek(start)
+            remaining = length
+            try:
+                while remaining > 0:
+                    chunk = artifact_file.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            increment_counter("artifact_bytes_served", length - remaining)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_artifact_server(port=None):
+    """
+    Serve /artifacts/ on a background thread. Called on every rerun; only
+    the first call per process starts the server.
+
+    Parameters:
+    port (int): Port to listen on (default: THEMESEEKER_ARTIFACT_PORT, or
+                no server when that is not set)
+
+    Returns:
+    int: The port being served, or None
+    """
+    global _server, _server_failed
+    with _lock:
+        if _server is not None:
+            return _server.server_address[1]
+        port = port or os.environ.get("THEMESEEKER_ARTIFACT_PORT")
+        if not port or _server_failed:
+            return None
+        try:
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _ArtifactHandler)
+        except OSError as e:
+            _server_failed = True
+            print(f"Could not start artifact server on port {port}: {str(e)}")
+            return None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server.server_address[1]
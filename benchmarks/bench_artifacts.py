@@ -0,0 +1,115 @@
+"""
+Benchmark serving a large ZIP export.
+
+Exports the same set of distinct themes (default 50, recorded texts with
+numbered titles, stand-in image service) twice and reports the peak Python
+memory (tracemalloc, all threads) and the payload each way:
+
+    in memory   ZIP built in a BytesIO and handed over as bytes, plus the
+                base64 data-URI link the app used to build for downloads
+    streamed    ZIP written to the artifact folder and downloaded through
+                the streaming endpoint (full download and a resumed one)
+
+Documents are served from the document cache in both runs after a warm-up,
+so the numbers isolate packing and transfer.
+
+Usage:
+    python benchmarks/bench_artifacts.py [num_documents]
+"""
+import base64
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from artifacts import artifact_url, new_artifact_file, start_artifact_server, store_artifact
+from documents import create_documents_zip
+from themes import Theme
+from benchmarks.bench_renderers import recorded_themes
+from benchmarks.stubs import StubServices
+
+ARTIFACT_ID = "0123456789abcdef0123456789abcdef"
+
+
+def distinct_themes(total):
+    """total English themes with distinct titles, so none share a cache entry."""
+    english = [theme for theme, language in recorded_themes() if language == "english"]
+    themes = []
+    for i in range(total):
+        data = english[i % len(english)].to_dict()
+        data['title'] = f"{data['title']} ({i + 1})"
+        data.pop('theme_id', None)
+        themes.append(Theme.from_dict(data))
+    return [(theme.title, theme) for theme in themes]
+
+
+def measure(func):
+    """Run func and return (its result, seconds, peak MiB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    work_dir = tempfile.mkdtemp(prefix="themeseeker-bench-")
+    os.environ["THEMESEEKER_IMAGE_LIBRARY"] = os.path.join(work_dir, "library")
+    os.environ["THEMESEEKER_IMAGE_CACHE"] = os.path.join(work_dir, "image_cache")
+    os.environ["THEMESEEKER_DOCUMENT_CACHE"] = os.path.join(work_dir, "document_cache")
+    os.environ["THEMESEEKER_ARTIFACT_DIR"] = os.path.join(work_dir, "artifacts")
+    port = start_artifact_server(int(os.environ.get("THEMESEEKER_ARTIFACT_PORT", 18502)))
+    selected = distinct_themes(total)
+
+    with StubServices(latency={'youtube': 0, 'gemini': 0, 'image': 0}):
+        # Warm-up: fills the document cache
+        create_documents_zip(selected, None, "english")
+
+        def in_memory():
+            zip_buffer, _, _ = create_documents_zip(selected, None, "english")
+            data = zip_buffer.getvalue()
+            link = f'<a href="data:application/zip;base64,{base64.b64encode(data).decode()}" download="x.zip">x</a>'
+            return len(data), len(link)
+
+        (zip_size, link_size), elapsed, peak = measure(in_memory)
+        print(f"documents:          {total}")
+        print(f"ZIP size:           {zip_size / (1024 * 1024):8.2f} MiB")
+        print(f"in memory:          {elapsed:8.3f} s  peak {peak:8.2f} MiB  data-URI payload {link_size / (1024 * 1024):.2f} MiB")
+
+        def streamed():
+            path = new_artifact_file(".zip")
+            create_documents_zip(selected, None, "english", output=path)
+            store_artifact(ARTIFACT_ID, "export.zip", source_path=path)
+
+        _, elapsed, peak = measure(streamed)
+        print(f"streamed (export):  {elapsed:8.3f} s  peak {peak:8.2f} MiB")
+
+    url = artifact_url(ARTIFACT_ID, "export.zip")
+    if port is None or url is None:
+        print("Artifact server not running; transfer not measured")
+        return
+
+    def download(headers=None):
+        received = 0
+        with requests.get(url, headers=headers or {}, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(64 * 1024):
+                received += len(chunk)
+        return received
+
+    received, elapsed, peak = measure(download)
+    print(f"streamed (full):    {elapsed:8.3f} s  peak {peak:8.2f} MiB  {received / (1024 * 1024) / elapsed:8.1f} MiB/s")
+    received, elapsed, peak = measure(lambda: download({'Range': f"bytes={zip_size // 2}-"}))
+    print(f"streamed (resume):  {elapsed:8.3f} s  peak {peak:8.2f} MiB  {received / (1024 * 1024):.2f} MiB of the second half")
+
+
+if __name__ == "__main__":
+    main()
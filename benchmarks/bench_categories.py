@@ -0,0 +1,70 @@
+"""
+Benchmark video categorization.
+
+Reports, on the hand-labelled English, Portuguese and Spanish titles in
+benchmarks/fixtures/category_titles.json, the accuracy of the keyword
+rules, of the centroid index alone and of the centroid index with the
+rules as fallback, then the throughput of both on a large batch built
+from the recorded video titles and descriptions (default 100,000).
+
+Usage:
+    python benchmarks/bench_categories.py [num_titles]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from categories import generate_video_context
+from category_index import MIN_CONFIDENCE, classify_texts, load_index, score_texts
+from benchmarks.stubs import load_fixture
+
+
+def accuracy(predicted, expected):
+    return sum(p == e for p, e in zip(predicted, expected)) / len(expected)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    os.environ["THEMESEEKER_CATEGORY_INDEX"] = os.path.join(tempfile.mkdtemp(prefix="themeseeker-bench-"),
+                                                            "category_index.npz")
+    start = time.perf_counter()
+    load_index()
+    print(f"index build:       {time.perf_counter() - start:7.3f} s")
+
+    labelled = load_fixture("category_titles")['titles']
+    titles = [title for title, _ in labelled]
+    expected = [label for _, label in labelled]
+    labels, scores = score_texts(titles)
+    predicted, confidence = classify_texts(titles)
+    print(f"labelled titles:   {len(titles)}")
+    print(f"rules:             {accuracy([generate_video_context(t, '') for t in titles], expected):7.1%}")
+    print(f"centroids:         {accuracy([labels[i] for i in scores.argmax(axis=1)], expected):7.1%}")
+    print(f"with fallback:     {accuracy(predicted, expected):7.1%}  "
+          f"({np.mean(confidence < MIN_CONFIDENCE):.0%} below {MIN_CONFIDENCE} decided by rules)")
+
+    videos = load_fixture("youtube_videos")['items']
+    repeat = -(-total // len(videos))
+    batch_titles = [video['snippet']['title'] for video in videos] * repeat
+    batch_descriptions = [video['snippet']['description'] for video in videos] * repeat
+    batch_titles, batch_descriptions = batch_titles[:total], batch_descriptions[:total]
+
+    for label, descriptions in (("titles", None), ("with descriptions", batch_descriptions)):
+        start = time.perf_counter()
+        classify_texts(batch_titles, descriptions)
+        elapsed = time.perf_counter() - start
+        print(f"centroids, {label + ':':<19} {elapsed:7.3f} s  {total / elapsed:9,.0f} texts/s")
+
+    start = time.perf_counter()
+    for title, description in zip(batch_titles, batch_descriptions):
+        generate_video_context(title, description)
+    elapsed = time.perf_counter() - start
+    print(f"rules, {'with descriptions:':<23} {elapsed:7.3f} s  {total / elapsed:9,.0f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark channel aggregation and the channel statistics cache.
+
+Aggregates synthetic mined videos (spread over channels and categories)
+per channel and per category with channels.py (factorized codes and
+bincounts) and with a per-video Python loop, then fetches the statistics
+of the recorded channels from the stand-in YouTube API: in 50-ID batches,
+again from the cache, and one call per channel for comparison (on the
+first 50 channels, scaled to all of them). Finally compares the tokens of
+the channel summary with those of the title lines it replaces in the
+prompt.
+
+Usage:
+    python benchmarks/bench_channels.py [videos] [channels] [youtube_latency]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["THEMESEEKER_CHANNELS_DB"] = os.path.join(tempfile.mkdtemp(prefix="themeseeker-bench-"),
+                                                     "channels.sqlite3")
+
+import numpy as np
+
+from benchmarks.stubs import StubServices, load_fixture
+from channels import BATCH_SIZE, category_channels, channel_statistics, channel_table, fetch_channel_batch
+from prompt_builder import dedupe_titles, estimate_tokens, format_channel_summary, format_titles_by_context
+from youtube_mining import build_youtube
+
+CATEGORIES = ["Meditation/Mindfulness practice", "Gnosticism/Gnostic philosophy", "Near-death experiences",
+              "Buddhism/Eastern philosophy", "Consciousness/Awakening", "Mystical Christianity",
+              "Hermeticism/Alchemy", "General spiritual content"]
+
+REPEATS = 5
+
+
+def synthetic_videos(count, channels, rng):
+    # A few large channels hold most of the views, as on YouTube
+    weights = np.array([1 / (rank + 1) for rank in range(channels)])
+    picks = rng.choices(range(channels), weights=weights, k=count)
+    return [{
+        'video_id': f"v{i}",
+        'title': f"Video {i} about {CATEGORIES[i % len(CATEGORIES)].split('/')[0].lower()}",
+        'channel': f"Channel {channel}",
+        'channel_id': f"UC{channel:022d}",
+        # Most uploads of a channel are on its own topic
+        'context': CATEGORIES[channel % len(CATEGORIES)] if rng.random() < 0.7 else rng.choice(CATEGORIES),
+        'view_count': int(rng.paretovariate(1.2) * 1000),
+    } for i, channel in enumerate(picks)]
+
+
+def loop_aggregation(videos):
+    """Reference: the same per-channel and per-category totals with dicts."""
+    channels, categories = {}, {}
+    for video in videos:
+        entry = channels.setdefault(video['channel_id'], {'views': 0, 'videos': 0, 'categories': set()})
+        entry['views'] += video['view_count']
+        entry['videos'] += 1
+        entry['categories'].add(video['context'])
+        category = categories.setdefault(video['context'], {})
+        category[video['channel_id']] = category.get(video['channel_id'], 0) + video['view_count']
+    total = sum(entry['views'] for entry in channels.values())
+    for entry in channels.values():
+        entry['view_share'] = entry['views'] / total
+    summary = []
+    for name, shares in categories.items():
+        views = sum(shares.values())
+        top = sorted(shares.items(), key=lambda item: item[1], reverse=True)[:3]
+        summary.append({'category': name, 'views': views, 'view_share': views / total, 'channels': len(shares),
+                        'top_channels': [(channel, value / views) for channel, value in top]})
+    return channels, sorted(summary, key=lambda entry: entry['views'], reverse=True)
+
+
+def timed(function, *args):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - start)
+    return result, np.median(times)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    channel_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    rng = random.Random(17)
+    videos = synthetic_videos(count, channel_count, rng)
+
+    # The app needs one or the other: the table under the mined videos, the summary in the job
+    table, table_time = timed(channel_table, videos)
+    summary, summary_time = timed(category_channels, videos)
+    (channels, loop_summary), loop_time = timed(loop_aggregation, videos)
+    assert len(table) == len(channels) and [entry['category'] for entry in summary] == \
+        [entry['category'] for entry in loop_summary]
+    print(f"aggregation of {count:,} videos, {len(table):,} channels: channel table {table_time * 1000:7.1f} ms, "
+          f"category summary {summary_time * 1000:7.1f} ms; loop building both {loop_time * 1000:7.1f} ms "
+          f"(median of {REPEATS})")
+
+    recorded = load_fixture("youtube_videos")['items']
+    channel_ids = list(dict.fromkeys(item['snippet']['channelId'] for item in recorded))
+    with StubServices(latency={'youtube': latency}):
+        start = time.perf_counter()
+        _, stats = channel_statistics("stub-key", channel_ids)
+        batched = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, cached_stats = channel_statistics("stub-key", channel_ids)
+        cached = time.perf_counter() - start
+
+        start = time.perf_counter()
+        youtube = build_youtube("stub-key")
+        for channel_id in channel_ids[:BATCH_SIZE]:
+            fetch_channel_batch(youtube, [channel_id])
+        single = (time.perf_counter() - start) * len(channel_ids) / min(BATCH_SIZE, len(channel_ids))
+    print(f"statistics of {len(channel_ids)} channels ({latency:.2f} s per call): batched {batched:6.2f} s, "
+          f"{stats['quota_used']} units; one per channel {single:6.2f} s, {len(channel_ids)} units; "
+          f"cached {cached * 1000:6.1f} ms, {cached_stats['quota_used']} units")
+
+    # The recorded videos, categorized the way the prompt sees them
+    sample = [{
+        'video_id': item['id'],
+        'title': item['snippet']['title'],
+        'channel': item['snippet']['channelTitle'],
+        'channel_id': item['snippet']['channelId'],
+        'context': CATEGORIES[i % len(CATEGORIES)],
+        'view_count': int(item['statistics'].get('viewCount', 0)),
+    } for i, item in enumerate(recorded)]
+    summary_tokens = estimate_tokens(format_channel_summary(category_channels(sample)))
+    title_tokens = estimate_tokens(format_titles_by_context(dedupe_titles(sample)))
+    print(f"prompt blocks for {len(sample)} recorded videos: channel summary ~{summary_tokens} tokens, "
+          f"all title lines ~{title_tokens} tokens")
+
+
+if __name__ == "__main__":
+    main()
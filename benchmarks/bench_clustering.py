@@ -0,0 +1,109 @@
+"""
+Benchmark near-duplicate clustering on synthetic video titles.
+
+Generates base titles and re-upload style variants of them (clip suffixes,
+hashtags, bracketed tags, case changes, small edits), clusters them and
+reports throughput together with precision/recall of the recovered groups
+against the known ground truth.
+
+Usage:
+    python benchmarks/bench_clustering.py [num_titles]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clustering import cluster_titles
+
+SUBJECTS = ["meditation", "gnosis", "the soul", "near death experiences", "consciousness", "karma",
+            "the kabbalah", "stoicism", "the inner light", "buddhist wisdom", "the tao", "prayer",
+            "the hermetic principles", "mindfulness", "the afterlife", "sacred geometry", "yoga nidra"]
+FRAMES = ["What nobody tells you about {s}", "The hidden truth of {s}", "{s} explained in {n} minutes",
+          "Why {s} changes everything", "A beginner's guide to {s}", "{n} lessons on {s}",
+          "The science behind {s}", "How {s} transformed my life", "Understanding {s} with Dr. {name}",
+          "{s}: the lost teachings, part {n}"]
+NAMES = ["Ramos", "Weiss", "Okafor", "Lindqvist", "Moreau", "Tanaka", "Silva", "Brennan"]
+QUALIFIERS = ["tonight", "for beginners", "with Master Lin", "live", "at dawn", "in Lisbon", "revisited",
+              "from the desert", "unplugged", "in 2024", "and the heart", "for skeptics", "by candlelight",
+              "on the mountain", "in silence", "with music", "in the city", "for parents", "after loss", "at sea"]
+SUFFIXES = [" | Clip", " #shorts", " (Full Interview)", " [4K]", " - Highlights", " | Podcast Ep. {n}", "!!", ""]
+
+
+def base_titles(count, rng):
+    titles = set()
+    while len(titles) < count:
+        frame = rng.choice(FRAMES)
+        title = frame.format(s=rng.choice(SUBJECTS), n=rng.randint(2, 999), name=rng.choice(NAMES))
+        # Templated titles would otherwise repeat; real channels add their own wording
+        titles.add(f"{title} {rng.choice(QUALIFIERS)} {rng.choice(QUALIFIERS)}")
+    return sorted(titles)
+
+
+def variant(title, rng):
+    title = title + rng.choice(SUFFIXES).format(n=rng.randint(1, 300))
+    if rng.random() < 0.3:
+        title = title.upper()
+    if rng.random() < 0.2:
+        # Small edit: drop one character
+        pos = rng.randrange(len(title))
+        title = title[:pos] + title[pos + 1:]
+    return title
+
+
+def synthetic_titles(total, seed=7):
+    """Return (titles, ground_truth_labels) with about 4 variants per base title."""
+    rng = random.Random(seed)
+    bases = base_titles(total // 4, rng)
+    titles, truth = [], []
+    for _ in range(total):
+        label = rng.randrange(len(bases))
+        titles.append(variant(bases[label], rng))
+        truth.append(label)
+    return titles, truth
+
+
+def pair_scores(labels, truth, sample=200000, seed=3):
+    """Estimate pairwise precision/recall by sampling pairs within clusters."""
+    rng = random.Random(seed)
+    by_label, by_truth = {}, {}
+    for i, (label, true) in enumerate(zip(labels, truth)):
+        by_label.setdefault(label, []).append(i)
+        by_truth.setdefault(true, []).append(i)
+
+    def sample_pairs(groups):
+        groups = [g for g in groups.values() if len(g) > 1]
+        pairs = []
+        for _ in range(min(sample, sum(len(g) for g in groups))):
+            group = rng.choice(groups)
+            pairs.append(tuple(rng.sample(group, 2)))
+        return pairs
+
+    predicted = sample_pairs(by_label)
+    actual = sample_pairs(by_truth)
+    precision = sum(truth[a] == truth[b] for a, b in predicted) / max(len(predicted), 1)
+    recall = sum(labels[a] == labels[b] for a, b in actual) / max(len(actual), 1)
+    return precision, recall
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    titles, truth = synthetic_titles(total)
+
+    start = time.perf_counter()
+    labels = cluster_titles(titles)
+    elapsed = time.perf_counter() - start
+
+    precision, recall = pair_scores(list(labels), truth)
+    print(f"titles:         {total:,}")
+    print(f"true groups:    {len(set(truth)):,}")
+    print(f"clusters found: {len(set(labels.tolist())):,}")
+    print(f"time:           {elapsed:.2f} s ({total / elapsed:,.0f} titles/s)")
+    print(f"pair precision: {precision:.3f}")
+    print(f"pair recall:    {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark viewer comment sampling.
+
+Samples the comments of the recorded videos (default 40) from
+the stand-in YouTube service with an injected latency and reports the wall
+time, commentThreads requests and quota units of each run:
+
+    sequential  first sampling with one worker thread
+    concurrent  first sampling with the bounded thread pool
+    cached      the same videos again, within the refresh interval
+    refresh     the refresh interval elapsed, a few new comments posted on
+                some videos: only pages up to the stored comments are read
+
+Usage:
+    python benchmarks/bench_comments.py [latency_seconds] [num_videos]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import comments
+from comments import audience_signals, sample_comments
+from benchmarks.stubs import StubServices
+
+API_KEY = "stub-key"
+
+
+def run(stubs, label, videos, quota_budget):
+    before = stubs.request_counts.get("youtube /youtube/v3/commentThreads", 0)
+    start = time.perf_counter()
+    stats = sample_comments(API_KEY, videos, max_videos=len(videos), quota_budget=quota_budget)
+    elapsed = time.perf_counter() - start
+    requests_made = stubs.request_counts.get("youtube /youtube/v3/commentThreads", 0) - before
+    print(f"{label + ':':<12} {elapsed:7.3f} s  {requests_made:4d} requests  {stats['quota_used']:4d} units  "
+          f"fetched {stats['fetched']:3d}  cached {stats['cached']:3d}  new comments {stats['new_comments']:5d}  "
+          f"errors {len(stats['errors'])}")
+
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.1
+    work_dir = tempfile.mkdtemp(prefix="themeseeker-bench-")
+
+    with StubServices(latency={'youtube': latency}) as stubs:
+        total = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+        videos = [{'video_id': video_id} for video_id in sorted(stubs.videos)[:total]]
+        quota_budget = total * (comments.MAX_REFRESH_PAGES + 1)
+        print(f"videos: {len(videos)}  latency: {latency:.3f} s/request  workers: {comments.MAX_WORKERS}")
+
+        max_workers = comments.MAX_WORKERS
+        comments.MAX_WORKERS = 1
+        os.environ["THEMESEEKER_COMMENTS_DB"] = os.path.join(work_dir, "sequential.sqlite3")
+        run(stubs, "sequential", videos, quota_budget)
+        comments.MAX_WORKERS = max_workers
+
+        os.environ["THEMESEEKER_COMMENTS_DB"] = os.path.join(work_dir, "comments.sqlite3")
+        run(stubs, "concurrent", videos, quota_budget)
+        run(stubs, "cached", videos, quota_budget)
+
+        for video in videos[::4]:
+            stubs.add_comments(video['video_id'], 5)
+        refresh_interval = comments.REFRESH_INTERVAL
+        comments.REFRESH_INTERVAL = 0
+        run(stubs, "refresh", videos, quota_budget)
+        comments.REFRESH_INTERVAL = refresh_interval
+
+        start = time.perf_counter()
+        signals = audience_signals(videos, max_videos=len(videos))
+        elapsed = time.perf_counter() - start
+        print(f"{'signals:':<12} {elapsed:7.3f} s  {sum(s['comments'] for s in signals)} comments "
+              f"in {len(signals)} categories")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark Gemini context caching of the philosophy context.
+
+Generates themes for every age group several times against the stand-in
+Gemini service, once with the full prompt sent inline and once with the
+static prefix (philosophy context and instructions) registered as cached
+content, and reports the median call time and the prompt tokens Gemini had
+to process per call. The stand-in charges a base latency per request plus a
+prefill time per 1000 uncached prompt tokens, standing in for
+time-to-first-token.
+
+Usage:
+    python benchmarks/bench_context_cache.py [base_latency] [prefill_per_1k_tokens] [rounds]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import context_cache
+from generation import generate_themes
+from prompt_builder import AGE_CHARACTERISTICS, MAX_PHILOSOPHY_CHARS
+from benchmarks.stubs import StubServices, load_fixture
+
+API_KEY = "stub-key"
+
+PHILOSOPHY = (
+    "The Golden Rosycross is a school of spiritual transformation in the Gnostic and Rosicrucian "
+    "tradition. It teaches that the human being carries a divine spark, the rose of the heart, which can "
+    "awaken through self-knowledge, inner stillness and a new way of life, and that this awakening "
+    "changes the whole personality from within. "
+)
+
+
+def mined_videos():
+    return [{
+        'title': video['snippet']['title'],
+        'context': "General spiritual content",
+        'view_count': int(video['statistics'].get('viewCount', 0)),
+    } for video in load_fixture("youtube_videos")['items']]
+
+
+def run(label, videos, philosophy, rounds):
+    times, processed = [], []
+    for _ in range(rounds):
+        for age_group in AGE_CHARACTERISTICS:
+            start = time.perf_counter()
+            _, _, stats = generate_themes(API_KEY, videos, age_group, philosophy)
+            times.append(time.perf_counter() - start)
+            processed.append(stats['tokens_in'] - stats['tokens_cached'])
+    print(f"{label + ':':<10} median {statistics.median(times):7.3f} s  first {times[0]:7.3f} s  "
+          f"{statistics.median(processed):6.0f} prompt tokens processed per call")
+
+
+def main():
+    base = float(sys.argv[1]) if len(sys.argv) > 1 else 0.3
+    prefill = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    philosophy = (PHILOSOPHY * (MAX_PHILOSOPHY_CHARS // len(PHILOSOPHY) + 1))[:MAX_PHILOSOPHY_CHARS]
+    videos = mined_videos()
+    print(f"base latency {base:.3f} s, prefill {prefill:.3f} s/1k tokens, "
+          f"{rounds * len(AGE_CHARACTERISTICS)} calls per mode")
+
+    with StubServices(latency={'gemini': base, 'gemini_prefill': prefill}) as stubs:
+        os.environ["THEMESEEKER_CONTEXT_CACHE"] = "0"
+        run("inline", videos, philosophy, rounds)
+        os.environ["THEMESEEKER_CONTEXT_CACHE"] = "1"
+        run("cached", videos, philosophy, rounds)
+        for handle in context_cache.context_cache_stats():
+            print(f"cached prefix: {handle['tokens']} tokens, used {handle['uses']} times")
+        print(f"cache requests: {sum(count for key, count in stubs.request_counts.items() if 'cachedContents' in key)}")
+
+
+if __name__ == "__main__":
+    main()
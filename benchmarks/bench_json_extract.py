@@ -0,0 +1,83 @@
+"""
+Benchmark json_extract against the regex chain it replaced.
+
+Reports, for the hand-written and fuzzed corpora, how many responses each
+parser salvaged with their content intact and the time spent per response.
+
+Usage:
+    python benchmarks/bench_json_extract.py
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import parse_themes_response
+from benchmarks.json_corpus import handwritten_corpus, fuzz_corpus, clean_response
+
+
+def legacy_parse(raw_response):
+    """The parsing chain previously inlined in generate_lecture_themes_json."""
+    try:
+        json_match = re.search(r'\[(.*?)\]', raw_response, re.DOTALL)
+        json_str = json_match.group(0) if json_match else raw_response
+        return json.loads(json_str)
+    except json.JSONDecodeError:
+        code_block_match = re.search(r'```(?:json)?(.*?)```', raw_response, re.DOTALL)
+        json_str = code_block_match.group(1).strip() if code_block_match else raw_response
+        try:
+            return json.loads(json_str)
+        except ValueError:
+            # The title-only fallback keeps no content, so it counts as a miss
+            return []
+
+
+def salvaged(themes, expected):
+    """A parse counts only if it returned themes with their full text."""
+    if not isinstance(themes, list) or not themes:
+        return False
+    if not all(isinstance(t, dict) and t.get("full_text") for t in themes):
+        return False
+    return expected is None or len(themes) == expected
+
+
+def run(name, parser, cases, repeat=20):
+    ok = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        ok = sum(1 for _, text, expected in cases if salvaged(parser(text), expected))
+    elapsed = (time.perf_counter() - start) / (repeat * len(cases))
+    print(f"  {name:<8} salvaged {ok:>4}/{len(cases):<4} {elapsed * 1e6:9.1f} us/response")
+    return ok
+
+
+def main():
+    corpora = [
+        ("handwritten", handwritten_corpus()),
+        ("fuzz", fuzz_corpus()),
+    ]
+    for corpus_name, cases in corpora:
+        print(f"{corpus_name} corpus ({len(cases)} responses)")
+        run("legacy", legacy_parse, cases)
+        run("extract", parse_themes_response, cases)
+
+        failures = [name for name, text, expected in cases
+                    if not salvaged(parse_themes_response(text), expected)]
+        if failures:
+            print(f"  not salvaged: {', '.join(failures[:20])}")
+
+    # Scan cost must grow linearly with response size
+    print("scaling (clean response with a trailing defect)")
+    for count in (10, 100, 1000):
+        text = clean_response(count)[:-3] + ",]"
+        start = time.perf_counter()
+        themes = parse_themes_response(text)
+        elapsed = time.perf_counter() - start
+        print(f"  {count:>5} themes, {len(text):>8} chars: {elapsed * 1000:8.2f} ms ({len(themes)} themes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Load test: concurrent simulated operators against app worker processes.
+
+Each worker is a process that runs themeseeker.py with Streamlit's AppTest,
+one AppTest per simulated user on its own thread, so the users of a worker
+share its module-level state (job queue and job workers, query, document
+and session stores) the way the sessions of one `streamlit run` process do.
+Every user goes through the whole flow, repeatedly:
+
+    mine     mine last week's videos
+    generate generate themes for an age group, translated to Portuguese,
+             polling like the browser does while the background job runs
+    export   select the themes and export them as a ZIP of Word documents
+
+The YouTube, Gemini and image services are the stand-ins of stubs.py with
+configurable latency, shared by all workers. Reported per worker: flows
+completed and failed, throughput, p50/p95/p99 of each step and of the
+whole flow, CPU use (1.0 = one core busy) and RSS at start and at its peak.
+Re-mining and exporting the same themes is served by the query and document
+caches after the first user of a worker, as it would be in production.
+
+AppTest installs a process-global Streamlit runtime and config override for
+the duration of each run and removes them afterwards, and compiles the
+script again on every run, which breaks overlapping runs. Workers install
+one shared runtime, config override and script cache instead, as a Streamlit server has, and pass the API keys
+through the environment rather than AppTest's (also global) secrets.
+
+Usage:
+    python benchmarks/bench_load.py [--users 10] [--workers 1] [--flows 2]
+                                    [--youtube-latency 0.2] [--gemini-latency 2.0]
+                                    [--image-latency 0.3] [--poll 0.25]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stubs import StubServices
+
+APP_SCRIPT = os.path.join(ROOT, "themeseeker.py")
+
+STEPS = ("mine", "generate", "export", "flow")
+
+# Seconds a single script run may take before the flow counts as failed
+RUN_TIMEOUT = 120
+
+# Seconds a background job may take before the flow counts as failed
+JOB_TIMEOUT = 300
+
+
+def rss_megabytes():
+    """Current resident memory of the process."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    # Peak rather than current RSS where /proc is missing (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class FlowFailed(Exception):
+    pass
+
+
+def _run(at):
+    at.run(timeout=RUN_TIMEOUT)
+    if at.exception:
+        raise FlowFailed(at.exception[0].value)
+
+
+def _widget(widgets, label):
+    for widget in widgets:
+        if widget.label.startswith(label):
+            return widget
+    raise FlowFailed(f"No widget labelled {label!r}")
+
+
+def _wait_for_job(at, session_key, poll):
+    """Rerun the page, as the progress fragment does, until the tracked job has finished."""
+    from jobs import DONE, FAILED, get_job
+    deadline = time.perf_counter() + JOB_TIMEOUT
+    while time.perf_counter() < deadline:
+        time.sleep(poll)
+        job = get_job(at.session_state[session_key])
+        if job['status'] in (DONE, FAILED):
+            _run(at)
+            if job['status'] == FAILED:
+                raise FlowFailed(job['error'])
+            return
+        _run(at)
+    raise FlowFailed(f"{session_key} did not finish within {JOB_TIMEOUT} s")
+
+
+def run_flow(at, age_group, poll, timings):
+    from session_store import get_themes
+    start = time.perf_counter()
+    step = "mine"
+    try:
+        _widget(at.button, "Mine Last Week").click()
+        _run(at)
+        if not at.session_state['weekly_videos']:
+            raise FlowFailed("mining returned no videos")
+        mined = time.perf_counter()
+
+        step = "generate"
+        _widget(at.selectbox, "Select Video Data Source").set_value("Last Week")
+        _widget(at.selectbox, "Select Target Age Group").set_value(age_group)
+        _widget(at.button, "Generate Lecture Themes").click()
+        _run(at)
+        _wait_for_job(at, 'generation_job', poll)
+        themes = (get_themes(at.session_state['theme_set']) or ([], {}))[0]
+        if not themes:
+            raise FlowFailed("no themes generated")
+        generated = time.perf_counter()
+
+        step = "export"
+        _widget(at.multiselect, "Select themes to create documents").set_value([theme.theme_id for theme in themes])
+        _run(at)
+        _widget(at.button, "Generate & Download All").click()
+        _run(at)
+        _wait_for_job(at, 'export_job', poll)
+        if not any(button.label.startswith("Download All") for button in at.get("download_button")):
+            raise FlowFailed("no ZIP download after the export")
+        exported = time.perf_counter()
+    except FlowFailed as e:
+        raise FlowFailed(f"{step}: {e}")
+    except Exception as e:
+        raise FlowFailed(f"{step}: {type(e).__name__}: {e}")
+
+    timings['mine'].append(mined - start)
+    timings['generate'].append(generated - mined)
+    timings['export'].append(exported - generated)
+    timings['flow'].append(exported - start)
+
+
+def share_runtime():
+    """Give all AppTest runs of the process one runtime, config override and script cache, so they can overlap."""
+    from contextlib import nullcontext
+    from unittest.mock import MagicMock
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = app_test.MediaFileManager(app_test.MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = app_test.DataframeSourceManager()
+    runtime.cache_storage_manager = app_test.MemoryCacheStorageManager()
+    runtime.bidi_component_registry = app_test.BidiComponentManager()
+    runtime.bidi_component_registry.discover_and_register_components(start_file_watching=False)
+    Runtime._instance = runtime
+
+    class PerRunRuntime:
+        # Takes the runtime AppTest sets up and tears down around each run
+        _instance = None
+
+    app_test.Runtime = PerRunRuntime
+    # A run that ends must not switch test mode off under a run still going
+    config.get_option = build_mock_config_get_option({"global.appTest": True})
+    app_test.patch_config_options = lambda overrides: nullcontext()
+    # The script is compiled once per process, not on every run
+    script_cache = app_test.ScriptCache()
+    script_cache.get_bytecode(APP_SCRIPT)
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+
+def simulated_user(number, flows, poll, timings, errors):
+    from prompt_builder import AGE_CHARACTERISTICS
+    from streamlit.testing.v1 import AppTest
+    age_groups = list(AGE_CHARACTERISTICS)
+    try:
+        at = AppTest.from_file(APP_SCRIPT, default_timeout=RUN_TIMEOUT)
+        _run(at)
+    except Exception as e:
+        errors.append(f"start: {e}")
+        return
+    for flow in range(flows):
+        try:
+            run_flow(at, age_groups[(number + flow) % len(age_groups)], poll, timings)
+        except Exception as e:
+            errors.append(str(e))
+
+
+def run_worker(users, flows, poll):
+    """Drive the users of one worker process and print its figures as JSON."""
+    share_runtime()
+    os.environ["YOUTUBE_API_KEY"] = os.environ["GEMINI_API_KEY"] = "stub-key"
+    timings = {step: [] for step in STEPS}
+    errors = []
+    samples = [rss_megabytes()]
+    done = threading.Event()
+
+    def sample_memory():
+        while not done.wait(0.5):
+            samples.append(rss_megabytes())
+
+    threading.Thread(target=sample_memory, daemon=True).start()
+    cpu_start, wall_start = os.times(), time.perf_counter()
+    threads = [threading.Thread(target=simulated_user, args=(number, flows, poll, timings, errors))
+               for number in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cpu_end, wall = os.times(), time.perf_counter() - wall_start
+    done.set()
+    samples.append(rss_megabytes())
+
+    print(json.dumps({
+        'timings': timings,
+        'errors': errors,
+        'wall': wall,
+        'cpu': (cpu_end.user + cpu_end.system - cpu_start.user - cpu_start.system) / wall,
+        'rss_start': samples[0],
+        'rss_peak': max(samples),
+    }))
+
+
+def percentiles(values):
+    if not values:
+        return "       -"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"{p50:6.2f} / {p95:6.2f} / {p99:6.2f} s"
+
+
+def report(label, figures, flows_started):
+    completed = len(figures['timings']['flow'])
+    print(f"{label}: {completed}/{flows_started} flows in {figures['wall']:.1f} s "
+          f"({completed / figures['wall'] * 60:.1f} flows/min), CPU {figures['cpu']:.2f} cores, "
+          f"RSS {figures['rss_start']:.0f} -> peak {figures['rss_peak']:.0f} MB")
+    for step in STEPS:
+        print(f"    {step:<9} p50/p95/p99 {percentiles(figures['timings'][step])}")
+    for error in sorted(set(figures['errors']))[:5]:
+        print(f"    failed: {error} (x{figures['errors'].count(error)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the Streamlit app")
+    parser.add_argument("--users", type=int, default=10, help="simulated users in total")
+    parser.add_argument("--workers", type=int, default=1, help="app worker processes the users are spread over")
+    parser.add_argument("--flows", type=int, default=2, help="mine/generate/export flows per user")
+    parser.add_argument("--youtube-latency", type=float, default=0.2)
+    parser.add_argument("--gemini-latency", type=float, default=2.0)
+    parser.add_argument("--image-latency", type=float, default=0.3)
+    parser.add_argument("--poll", type=float, default=0.25, help="seconds between reruns while a job runs")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.users, args.flows, args.poll)
+        return
+
+    latency = {'youtube': args.youtube_latency, 'gemini': args.gemini_latency, 'image': args.image_latency}
+    print(f"{args.users} users on {args.workers} worker(s), {args.flows} flows each, latency {latency}")
+    with StubServices(latency=latency):
+        processes = []
+        for index in range(args.workers):
+            users = args.users // args.workers + (index < args.users % args.workers)
+            # Every worker has its own data folder, as a separate dyno or container would
+            data_dir = tempfile.mkdtemp(prefix=f"themeseeker-load-{index}-")
+            env = dict(os.environ, **{
+                name: os.path.join(data_dir, file_name) for name, file_name in (
+                    ("THEMESEEKER_JOBS_DB", "jobs.sqlite3"),
+                    ("THEMESEEKER_ARTIFACT_DIR", "artifacts"),
+                    ("THEMESEEKER_DOCUMENT_CACHE", "document_cache"),
+                    ("THEMESEEKER_COMMENTS_DB", "comments.sqlite3"),
+                    ("THEMESEEKER_CATEGORY_INDEX", "category_index.npz"),
+                    ("THEMESEEKER_TRANSLATION_DB", "translations.sqlite3"),
+                    ("THEMESEEKER_THEME_HISTORY", "theme_history.sqlite3"),
+                    ("THEMESEEKER_CHANNELS_DB", "channels.sqlite3"),
+                )
+            })
+            command = [sys.executable, os.path.abspath(__file__), "--worker", "--users", str(users),
+                       "--flows", str(args.flows), "--poll", str(args.poll)]
+            processes.append((users, subprocess.Popen(command, env=env, cwd=ROOT, stdout=subprocess.PIPE,
+                                                      stderr=subprocess.DEVNULL, text=True)))
+
+        results = []
+        for index, (users, process) in enumerate(processes):
+            output, _ = process.communicate()
+            figures = json.loads(output.strip().splitlines()[-1])
+            results.append(figures)
+            report(f"worker {index} ({users} users)", figures, users * args.flows)
+
+    if len(results) > 1:
+        combined = {
+            'timings': {step: [value for figures in results for value in figures['timings'][step]] for step in STEPS},
+            'errors': [error for figures in results for error in figures['errors']],
+            'wall': max(figures['wall'] for figures in results),
+            'cpu': sum(figures['cpu'] for figures in results),
+            'rss_start': sum(figures['rss_start'] for figures in results),
+            'rss_peak': sum(figures['rss_peak'] for figures in results),
+        }
+        report("all workers", combined, args.users * args.flows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark the document backends.
+
+Lays out the recorded English and Portuguese themes (with a fixed in-memory
+image, so no network is involved) and reports, per backend, documents per
+second and the average output size. Layout is done once and shared by
+all backends, as in the app's multi-format export.
+
+Usage:
+    python benchmarks/bench_renderers.py [num_documents]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documents import build_theme_document, render_document
+from renderers import FORMATS
+from themes import themes_from_dicts
+from benchmarks.stubs import load_fixture, _stub_image
+
+
+def recorded_themes():
+    """(theme, language) pairs from the recorded Gemini responses."""
+    pairs = []
+    for fixture, language in (("gemini_themes", "english"), ("gemini_translation", "portuguese")):
+        text = load_fixture(fixture)['candidates'][0]['content']['parts'][0]['text']
+        pairs.extend((theme, language) for theme in themes_from_dicts(json.loads(text)))
+    return pairs
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    image = _stub_image()
+    pairs = recorded_themes()
+    inputs = [pairs[i % len(pairs)] for i in range(total)]
+
+    start = time.perf_counter()
+    documents = [build_theme_document(theme, language, image=image) for theme, language in inputs]
+    layout_time = time.perf_counter() - start
+    print(f"documents:      {total:,}")
+    print(f"layout:         {total / layout_time:>8,.1f} docs/s")
+
+    for output_format in FORMATS:
+        start = time.perf_counter()
+        sizes = [len(render_document(document, output_format)) for document in documents]
+        elapsed = time.perf_counter() - start
+        print(f"{output_format + ':':<15} {total / elapsed:>8,.1f} docs/s  {sum(sizes) / len(sizes) / 1024:>8,.1f} KiB avg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Load test of per-session memory: process RSS with many sessions.
+
+Simulates concurrent operators in one app process. Every session mines
+three periods from the same pool of videos (recorded fixture, descriptions
+lengthened to the size real uploads have), categorizes, clusters and ranks
+them, loads the philosophy context and generates its own themes with a
+Portuguese translation. The session state is then kept the way the app
+used to (full copies per session) and the way it does now (IDs into the
+process-level stores of session_store.py). Each layout runs in its own
+process, and the resident memory (RSS) is reported before and after the
+sessions are created.
+
+Usage:
+    python benchmarks/bench_session_memory.py [sessions]
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Real descriptions run to a few thousand characters; the fixture's are short
+DESCRIPTION_CHARS = 2000
+
+PERIODS = ('weekly_videos', 'monthly_videos', 'biannual_videos')
+
+VIDEOS_PER_PERIOD = 150
+
+
+def rss_megabytes():
+    """Current resident memory of the process."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    # Peak rather than current RSS where /proc is missing (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def video_pool():
+    from benchmarks.stubs import load_fixture
+    pool = []
+    for item in load_fixture("youtube_videos")['items']:
+        description = item['snippet']['description']
+        pool.append({
+            'title': item['snippet']['title'],
+            'channel': item['snippet']['channelTitle'],
+            'published_at': item['snippet']['publishedAt'],
+            'view_count': int(item['statistics'].get('viewCount', 0)),
+            'like_count': int(item['statistics'].get('likeCount', 0)),
+            'comment_count': int(item['statistics'].get('commentCount', 0)),
+            'video_id': item['id'],
+            'thumbnail': item['snippet']['thumbnails']['medium']['url'],
+            'thumbnail_small': item['snippet']['thumbnails']['default']['url'],
+            'description': (description + " ") * (DESCRIPTION_CHARS // (len(description) + 1) + 1),
+        })
+    return pool
+
+
+def mine(pool, rng):
+    """One period as mine_period returns it: new dicts, categorized, clustered and ranked."""
+    from category_index import categorize_videos
+    from clustering import cluster_videos
+    from ranking import rank_videos
+    # Video dicts are decoded from each API response, so every run has its own copies
+    videos = json.loads(json.dumps(rng.sample(pool, VIDEOS_PER_PERIOD)))
+    for video in videos:
+        video['popularity_score'] = rng.random()
+        video['queries'] = ["spirituality"]
+    videos = cluster_videos(videos)
+    categorize_videos(videos)
+    return rank_videos(videos)
+
+
+def generated_themes(session_number):
+    """Themes as a finished job returns them, different in every session."""
+    from benchmarks.stubs import load_fixture
+    from themes import themes_from_dicts, assign_theme_ids
+    themes, translations = [], {}
+    for name, language in (("gemini_themes", None), ("gemini_translation", "portuguese")):
+        dicts = json.loads(load_fixture(name)['candidates'][0]['content']['parts'][0]['text'])
+        for theme in dicts:
+            theme['title'] = f"{theme['title']} ({session_number})"
+        parsed = assign_theme_ids(themes_from_dicts(dicts))
+        if language:
+            translations[language] = parsed
+        else:
+            themes = parsed
+    return themes, translations
+
+
+def philosophy_context(raw_html):
+    from bs4 import BeautifulSoup
+    text = BeautifulSoup(raw_html, 'html.parser').get_text()
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def run_sessions(layout, count):
+    """Create the sessions in this process and print the RSS figures as JSON."""
+    import gc
+    import session_store
+
+    pool = video_pool()
+    # The HTML is a literal of the app script, shared by every session
+    raw_html = "<html><body>" + "<p>A Rosacruz Áurea é uma Escola iniciática contemporânea.</p>" * 60 + "</body></html>"
+    rng = random.Random(5)
+    # Import and warm up everything once, so the baseline only leaves out the sessions
+    mine(pool, rng)
+    philosophy_context(raw_html)
+    generated_themes(-1)
+    gc.collect()
+    baseline = rss_megabytes()
+
+    sessions = []
+    for number in range(count):
+        state = {}
+        for period in PERIODS:
+            videos = mine(pool, rng)
+            state[period] = videos if layout == "before" else session_store.put_videos(videos)
+        cleaned = philosophy_context(raw_html)
+        themes, translations = generated_themes(number)
+        if layout == "before":
+            state.update({'philosophy_context': raw_html, 'philosophy_context_cleaned': cleaned,
+                          'generated_themes': themes, 'translated_themes': translations})
+        else:
+            state.update({'philosophy_context_id': session_store.put_text(cleaned),
+                          'theme_set': session_store.put_themes(themes, translations, key=f"job-{number}")})
+        sessions.append(state)
+    gc.collect()
+
+    report = session_store.session_memory_report(sessions[-1])
+    print(json.dumps({
+        'baseline': baseline,
+        'rss': rss_megabytes(),
+        'session_kb': sum(row['bytes'] for row in report) / 1024,
+        'shared_kb': sum(row['shared_bytes'] for row in report) / 1024,
+        'stores': session_store.store_stats() if layout == "after" else None,
+    }))
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--layout":
+        run_sessions(sys.argv[2], int(sys.argv[3]))
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print(f"{count} sessions, 3 periods of {VIDEOS_PER_PERIOD} videos each, themes in English and Portuguese")
+    for layout, label in (("before", "full copies"), ("after", "store IDs")):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--layout", layout, str(count)],
+                                capture_output=True, text=True, check=True).stdout
+        figures = json.loads(output.strip().splitlines()[-1])
+        growth = figures['rss'] - figures['baseline']
+        print(f"{label + ':':<13} RSS {figures['baseline']:6.1f} -> {figures['rss']:6.1f} MB "
+              f"(+{growth:5.1f} MB, {growth * 1024 / count:6.1f} KB per session); one session's state "
+              f"{figures['session_kb']:7.1f} KB, referring to {figures['shared_kb']:7.1f} KB shared")
+        for store in figures['stores'] or []:
+            print(f"    {store['store']:<8} {store['entries']:6d} entries (limit {store['limit']}), "
+                  f"{store['megabytes']:6.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark speculative pre-generation of themes.
+
+Simulates a user who mines a period, looks at the results for a while and
+then clicks "Generate" for one age group, against the stand-in Gemini
+service. Reports the time from the click to finished themes (generation
+and Portuguese translation) when the job is only started on the click and
+when it was started speculatively right after mining, plus the share of
+speculative work that was wasted because the user picked another age group.
+
+Usage:
+    python benchmarks/bench_speculation.py [gemini_latency] [think_time] [rounds]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORK_DIR = tempfile.mkdtemp(prefix="themeseeker-bench-")
+os.environ["THEMESEEKER_JOBS_DB"] = os.path.join(WORK_DIR, "jobs.sqlite3")
+os.environ["THEMESEEKER_TRANSLATION_DB"] = os.path.join(WORK_DIR, "translations.sqlite3")
+
+from jobs import DONE, FAILED, claim_cached_job, get_job, submit_job
+from locales import DEFAULT_TRANSLATIONS
+from prompt_builder import AGE_CHARACTERISTICS
+from tasks import GENERATE_THEMES, generation_key, generation_params, speculate_generation
+from benchmarks.stubs import StubServices, load_fixture
+
+SECRETS = {'gemini_api_key': "stub-key"}
+
+SPECULATED_AGE_GROUPS = ["20-30", "30-40"]
+
+
+def mined_videos(round_number):
+    # A different title per round, so every round is a new video set
+    return [{
+        'video_id': video['id'],
+        'title': f"{video['snippet']['title']} #{round_number}",
+        'context': "General spiritual content",
+        'view_count': int(video['statistics'].get('viewCount', 0)),
+    } for video in load_fixture("youtube_videos")['items']]
+
+
+def wait_for(job_id):
+    while True:
+        job = get_job(job_id)
+        if job['status'] in (DONE, FAILED):
+            return job
+        time.sleep(0.02)
+
+
+def click(videos, age_group, speculative):
+    params = generation_params(videos, age_group)
+    start = time.perf_counter()
+    job_id = claim_cached_job(GENERATE_THEMES, generation_key(params)) if speculative else None
+    hit = job_id is not None
+    job_id = job_id or submit_job(GENERATE_THEMES, params, SECRETS)
+    wait_for(job_id)
+    return time.perf_counter() - start, hit
+
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    think_time = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    age_groups = list(AGE_CHARACTERISTICS)
+    print(f"gemini latency {latency:.2f} s, {think_time:.1f} s between mining and click, {rounds} rounds, "
+          f"pre-generating {', '.join(SPECULATED_AGE_GROUPS)}")
+
+    with StubServices(latency={'gemini': latency}):
+        for speculative in (False, True):
+            times, hits, submitted = [], 0, 0
+            for round_number in range(rounds):
+                videos = mined_videos(round_number)
+                if speculative:
+                    submitted += len(speculate_generation(videos, SPECULATED_AGE_GROUPS, "", 6000, None,
+                                                          DEFAULT_TRANSLATIONS, SECRETS))
+                time.sleep(think_time)
+                # The user mostly picks a pre-generated age group, sometimes another one
+                age_group = SPECULATED_AGE_GROUPS[round_number % 2] if round_number % 4 != 3 else age_groups[-1]
+                elapsed, hit = click(videos, age_group, speculative)
+                times.append(elapsed)
+                hits += hit
+            label = "speculative" if speculative else "on click"
+            wasted = f"  {submitted - hits} of {submitted} pre-generated jobs unused" if speculative else ""
+            print(f"{label + ':':<13} median {statistics.median(times):6.3f} s  max {max(times):6.3f} s  "
+                  f"{hits}/{rounds} served from speculation{wasted}")
+
+
+if __name__ == "__main__":
+    main()
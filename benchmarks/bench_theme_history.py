@@ -0,0 +1,121 @@
+"""
+Benchmark the repeat check of new themes against the theme history.
+
+Fills a history with synthetic themes spread over the last weeks, then
+checks batches of new themes against it: some are light rewrites of stored
+themes (repeats), the others are new. Reports the time to store the
+history, to load the in-memory index, and to check a batch of 10 themes
+with the LSH index and with a scan of every stored signature, together
+with how many planted repeats were found and how many new themes were
+wrongly flagged.
+
+Usage:
+    python benchmarks/bench_theme_history.py [history_size] [batches]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["THEMESEEKER_THEME_HISTORY"] = os.path.join(tempfile.mkdtemp(prefix="themeseeker-bench-"),
+                                                       "theme_history.sqlite3")
+
+import numpy as np
+
+import theme_history
+from theme_history import DEFAULT_THRESHOLD, DEFAULT_WEEKS, WEEK, db_path, find_repeats, record_themes, theme_signatures
+from themes import Theme, assign_theme_ids
+from benchmarks.bench_clustering import FRAMES, NAMES, QUALIFIERS, SUBJECTS
+
+VERBS = ["awakens", "heals", "reveals", "quiets", "guides", "transforms", "frees", "grounds", "opens", "restores"]
+OBJECTS = ["the restless mind", "daily habits", "old wounds", "family life", "the search for meaning",
+           "working hours", "digital noise", "grief", "ambition", "friendship", "the inner voice", "fear of change"]
+
+BATCH = 10
+
+
+def synthetic_theme(rng):
+    title = rng.choice(FRAMES).format(s=rng.choice(SUBJECTS), n=rng.randint(2, 99), name=rng.choice(NAMES))
+    title = f"{title} {rng.choice(QUALIFIERS)}"
+    sentences = [f"{rng.choice(SUBJECTS).capitalize()} {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(QUALIFIERS)}."
+                 for _ in range(3)]
+    return Theme.from_dict({'title': title.capitalize(), 'description': " ".join(sentences)})
+
+
+def rewrite(theme, rng):
+    """A repeat: same theme with a changed word or two, as the model tends to produce."""
+    words = theme.description.split()
+    pos = rng.randrange(len(words))
+    words[pos] = rng.choice(VERBS)
+    return Theme.from_dict({'title': theme.title.replace(":", " -"), 'description': " ".join(words)})
+
+
+def fill_history(size, rng, now):
+    stored = []
+    start = time.perf_counter()
+    # Spread over twice the look-back window, so half of the history is too old to count
+    for chunk in range(0, size, 1000):
+        themes = assign_theme_ids([synthetic_theme(rng) for _ in range(min(1000, size - chunk))])
+        record_themes(themes, "30-40", now=now - rng.random() * 2 * DEFAULT_WEEKS * WEEK)
+        stored.extend(themes)
+    return stored, time.perf_counter() - start
+
+
+def scan_repeats(themes, now):
+    """Reference check: compare with every stored signature in the window."""
+    index = theme_history._indexes[db_path()]
+    recent = index['created'] >= now - DEFAULT_WEEKS * WEEK
+    signatures = index['signatures'][recent]
+    found = []
+    for signature in theme_signatures(themes):
+        similarity = (signatures == signature).mean(axis=1)
+        found.append(similarity.max() >= DEFAULT_THRESHOLD)
+    return found
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    batches = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(11)
+    now = time.time()
+
+    stored, fill_time = fill_history(size, rng, now)
+    print(f"history:          {size:,} themes over {2 * DEFAULT_WEEKS} weeks, stored in {fill_time:.2f} s")
+
+    start = time.perf_counter()
+    find_repeats([synthetic_theme(rng)], now=now)
+    print(f"index load:       {time.perf_counter() - start:.2f} s (first check of the process)")
+
+    # Half of every batch rewrites stored themes from inside the window
+    created = theme_history._indexes[db_path()]['created']
+    recent = [theme for theme, stamp in zip(stored, created) if stamp >= now - DEFAULT_WEEKS * WEEK]
+    lsh_times, scan_times = [], []
+    planted = found = false_flags = scan_found = 0
+    for _ in range(batches):
+        repeats = [rewrite(theme, rng) for theme in rng.sample(recent, BATCH // 2)]
+        batch = repeats + [synthetic_theme(rng) for _ in range(BATCH - len(repeats))]
+
+        start = time.perf_counter()
+        matches = find_repeats(batch, now=now)
+        lsh_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        scanned = scan_repeats(batch, now)
+        scan_times.append(time.perf_counter() - start)
+
+        planted += len(repeats)
+        found += sum(match is not None for match in matches[:len(repeats)])
+        false_flags += sum(match is not None for match in matches[len(repeats):])
+        scan_found += sum(scanned[:len(repeats)])
+
+    print(f"check of {BATCH} themes: LSH index {np.median(lsh_times) * 1000:7.2f} ms, "
+          f"full scan {np.median(scan_times) * 1000:7.2f} ms (median of {batches})")
+    print(f"repeats found:    {found}/{planted} with the index, {scan_found}/{planted} with the scan")
+    print(f"new themes flagged: {false_flags}/{batches * BATCH - planted}")
+
+
+if __name__ == "__main__":
+    main()
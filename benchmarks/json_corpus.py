@@ -0,0 +1,87 @@
+"""
+Corpus of malformed Gemini responses used to fuzz and benchmark json_extract.
+
+Each entry is a (name, response_text, expected_theme_count) tuple. The
+hand-written cases reproduce defects seen in real responses; fuzz_corpus()
+mutates clean responses at random to cover combinations of them.
+"""
+import json
+import random
+
+SAMPLE_THEME = {
+    "title": "The Algorithm of Your Soul",
+    "description": "How inner patterns shape what we see [and what we miss].",
+    "age_resonance": "Digital natives recognise algorithms from their feeds.",
+    "philosophical_connection": "Self-knowledge as the first step of the path.",
+    "lecture_outline": "1. Introduction [5 min]\n2. The inner algorithm\n3. Practice",
+    "teaser": "Feeling trapped in an echo chamber? Discover the code behind your thoughts.",
+    "full_text": "The algorithm of your soul is the invisible pattern that shapes your thoughts.\n\nBy understanding it, you can change it.",
+}
+
+
+def make_themes(count=10):
+    """Return count distinct copies of the sample theme."""
+    themes = []
+    for i in range(count):
+        theme = dict(SAMPLE_THEME)
+        theme["title"] = f"{SAMPLE_THEME['title']} {i + 1}"
+        themes.append(theme)
+    return themes
+
+
+def clean_response(count=10):
+    """A well-formed JSON array, as the prompt asks for."""
+    return json.dumps(make_themes(count), ensure_ascii=False, indent=2)
+
+
+def handwritten_corpus():
+    """Responses reproducing the defects observed in production."""
+    clean = clean_response(3)
+    fenced = f"Here are your themes:\n```json\n{clean}\n```\nLet me know if you need more."
+    cases = [
+        ("clean", clean, 3),
+        ("prose_and_fence", fenced, 3),
+        ("bracket_in_text", clean_response(1), 1),
+        ("prose_brackets_before", "Below are [10] themes [as requested]:\n" + clean, 3),
+        ("trailing_commas", clean.replace('"\n  }', '",\n  }').replace("}\n]", "},\n]"), 3),
+        ("smart_quote_delimiters", clean.replace('"title": "', '“title”: “').replace('1",', '1”,'), 3),
+        ("raw_newlines", clean.replace("\\n", "\n"), 3),
+        ("inner_quotes", clean.replace("echo chamber", '"echo chamber"'), 3),
+        ("missing_commas", clean.replace('",\n    "description"', '"\n    "description"'), 3),
+        ("truncated", clean[:len(clean) - 40], 2),
+        ("wrapped_object", json.dumps({"themes": make_themes(3)}), 3),
+        ("single_object", json.dumps(SAMPLE_THEME), 1),
+        ("list_outline", json.dumps([dict(SAMPLE_THEME, lecture_outline=["Intro", "Body", "Close"])]), 1),
+        ("stray_backslash", clean.replace("Self-knowledge", "Self\\knowledge"), 3),
+    ]
+    return cases
+
+
+_MUTATIONS = [
+    lambda s, rng: s.replace("Practice", "\tPractice"),
+    lambda s, rng: s.replace("}\n", "},\n"),
+    lambda s, rng: s.replace("\\n", "\n"),
+    lambda s, rng: s.replace(': "', ': “', 3).replace('",\n', '”,\n', 3),
+    lambda s, rng: "Sure! Here is the JSON you asked for:\n" + s,
+    lambda s, rng: "```json\n" + s + "\n```",
+    lambda s, rng: s + "\n\nI hope these themes [all 10 of them] help!",
+    lambda s, rng: s.replace("echo chamber", 'so-called "echo chamber"'),
+    lambda s, rng: s[:rng.randint(len(s) // 2, len(s) - 1)],
+]
+
+
+def fuzz_corpus(size=200, seed=1234):
+    """
+    Generate size responses with one to three random mutations applied.
+
+    The expected count is None because truncation can drop any number of
+    themes; the benchmark only checks that something is salvaged.
+    """
+    rng = random.Random(seed)
+    cases = []
+    for i in range(size):
+        text = clean_response(rng.randint(1, 10))
+        for mutation in rng.sample(_MUTATIONS, rng.randint(1, 3)):
+            text = mutation(text, rng)
+        cases.append((f"fuzz_{i}", text, None))
+    return cases
@@ -0,0 +1,334 @@
+"""
+Offline benchmark suite for the whole pipeline.
+
+Every external service is replaced by the local stand-ins in
+benchmarks/stubs.py, answering from recorded responses with injected
+latency, so the numbers are comparable between runs and machines need no
+API keys. Each case reports the median wall time over several runs, the
+throughput where it has a natural unit, and the peak Python memory
+allocated (tracemalloc) in a separate run.
+
+Results are written to benchmarks/results/<timestamp>.json. When
+benchmarks/results/baseline.json exists, every case is compared against it
+and the script exits with status 1 if time or memory grew by more than the
+regression threshold.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--repeat N] [--latency-scale X]
+                                        [--threshold 0.25] [--only mining,zip]
+                                        [--save-baseline]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import youtube_mining
+from categories import generate_video_context
+from category_index import categorize_videos, classify_texts, load_index
+from clustering import cluster_videos
+from document_cache import clear_cache
+from documents import create_theme_document_with_language_option, create_documents_zip, create_multilingual_zip
+from generation import generate_themes
+from json_extract import parse_themes_response
+from prompt_builder import build_theme_prompt
+from ranking import rank_videos
+from themes import themes_from_dicts, inherit_theme_ids, pair_themes
+from translation import clear_translation_memory, translate_themes
+from benchmarks.json_corpus import handwritten_corpus
+from benchmarks.stubs import StubServices, load_fixture
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+
+# Per-request latency (seconds) of the stand-in services, close to what the
+# real services show from a typical deployment
+LATENCY_PROFILE = {'youtube': 0.12, 'gemini': 1.0, 'image': 0.25}
+
+DEFAULT_THRESHOLD = 0.25
+
+API_KEY = "offline-benchmark-key"
+PUBLISHED_AFTER = "2025-01-01T00:00:00Z"
+
+
+def _video_data(videos):
+    """The video dicts generate_themes receives from the UI."""
+    return [
+        {
+            'title': video['title'],
+            'context': video['context'],
+            'view_count': video['view_count'],
+            'cluster_size': video.get('cluster_size', 1),
+            'cluster_view_count': video.get('cluster_view_count', video['view_count']),
+        }
+        for video in videos
+    ]
+
+
+def _mined_videos():
+    """The recorded video pool in the shape produced by get_popular_videos."""
+    videos = []
+    for item in load_fixture("youtube_videos")['items']:
+        videos.append({
+            'title': item['snippet']['title'],
+            'channel': item['snippet']['channelTitle'],
+            'published_at': item['snippet']['publishedAt'],
+            'view_count': int(item['statistics']['viewCount']),
+            'like_count': int(item['statistics']['likeCount']),
+            'comment_count': int(item['statistics']['commentCount']),
+            'video_id': item['id'],
+            'description': item['snippet']['description'],
+        })
+    return videos
+
+
+def _fixture_themes(name):
+    return themes_from_dicts(json.loads(load_fixture(name)['candidates'][0]['content']['parts'][0]['text']))
+
+
+def build_cases():
+    """
+    Return the benchmark cases as name -> (function, items processed per
+    call or None). Inputs are prepared here so only the work itself is timed.
+    """
+    videos = categorize_videos(_mined_videos())
+    video_data = _video_data(cluster_videos(videos))
+    corpus = [text for _, text, _ in handwritten_corpus()]
+    themes = _fixture_themes("gemini_themes")
+    portuguese_themes = _fixture_themes("gemini_translation")
+    inherit_theme_ids(portuguese_themes, themes)
+    classify_inputs = [(video['title'], video['description']) for video in videos] * 20
+    classify_titles = [title for title, _ in classify_inputs]
+    classify_descriptions = [description for _, description in classify_inputs]
+    load_index()
+
+    def mining():
+        # Same steps as one "Mine" click: fan-out, clustering, categorization, ranking
+        youtube_mining._query_cache.clear()
+        mined, _ = youtube_mining.mine_period(API_KEY, youtube_mining.DEFAULT_QUERIES, 25, PUBLISHED_AFTER)
+        clustered = cluster_videos(mined)
+        categorize_videos(clustered)
+        rank_videos(clustered)
+
+    def ranking():
+        rank_videos(videos)
+
+    def classification():
+        classify_texts(classify_titles, classify_descriptions)
+
+    def classification_rules():
+        for title, description in classify_inputs:
+            generate_video_context(title, description)
+
+    def prompt_build():
+        build_theme_prompt(video_data, "30-40")
+
+    def json_parse():
+        for text in corpus:
+            parse_themes_response(text)
+
+    def generation():
+        generate_themes(API_KEY, video_data, "30-40")
+
+    def translation():
+        # Nothing in the translation memory yet
+        clear_translation_memory()
+        translate_themes(API_KEY, themes, ["portuguese"])
+
+    def translation_languages():
+        # Four languages fanned out at once
+        clear_translation_memory()
+        translate_themes(API_KEY, themes, ["portuguese", "spanish", "french", "german"])
+
+    def translation_cached():
+        # Every segment already in the translation memory
+        translate_themes(API_KEY, themes, ["portuguese", "spanish", "french", "german"])
+
+    # Cases that measure building documents start without cached documents
+    def docx():
+        clear_cache()
+        create_theme_document_with_language_option(themes[0], API_KEY, "english")
+
+    def docx_cold():
+        # Without a cached image every document waits for a download
+        clear_cache()
+        shutil.rmtree(os.environ["THEMESEEKER_IMAGE_CACHE"], ignore_errors=True)
+        create_theme_document_with_language_option(themes[0], API_KEY, "english")
+
+    def docx_cached():
+        # Re-download of a document that was already built
+        create_theme_document_with_language_option(themes[0], API_KEY, "english")
+
+    def zip_export():
+        clear_cache()
+        create_documents_zip([(theme.title, theme) for theme in themes], API_KEY, "english")
+
+    def zip_cached():
+        # ZIP of themes that were all built before
+        create_documents_zip([(theme.title, theme) for theme in themes], API_KEY, "english")
+
+    def zip_bilingual():
+        # Both languages in one pass, one image fetch per theme
+        clear_cache()
+        shutil.rmtree(os.environ["THEMESEEKER_IMAGE_CACHE"], ignore_errors=True)
+        create_multilingual_zip([(en.title, en, [("portuguese", pt)]) for en, pt in pair_themes(themes, portuguese_themes)],
+                                API_KEY)
+
+    def zip_two_passes():
+        # The same documents exported one language at a time
+        clear_cache()
+        shutil.rmtree(os.environ["THEMESEEKER_IMAGE_CACHE"], ignore_errors=True)
+        create_documents_zip([(theme.title, theme) for theme in themes], API_KEY, "english")
+        create_documents_zip([(theme.title, theme) for theme in portuguese_themes], API_KEY, "portuguese")
+
+    return {
+        'mining': (mining, len(youtube_mining.DEFAULT_QUERIES)),
+        'classification': (classification, len(classify_inputs)),
+        'classification_rules': (classification_rules, len(classify_inputs)),
+        'ranking': (ranking, len(videos)),
+        'prompt_build': (prompt_build, len(video_data)),
+        'json_parse': (json_parse, len(corpus)),
+        'generation': (generation, None),
+        'translation': (translation, len(themes)),
+        'translation_languages': (translation_languages, 4 * len(themes)),
+        'translation_cached': (translation_cached, 4 * len(themes)),
+        'docx': (docx, 1),
+        'docx_cold': (docx_cold, 1),
+        'docx_cached': (docx_cached, 1),
+        'zip': (zip_export, len(themes)),
+        'zip_cached': (zip_cached, len(themes)),
+        'zip_bilingual': (zip_bilingual, 2 * len(themes)),
+        'zip_two_passes': (zip_two_passes, 2 * len(themes)),
+    }
+
+
+def run_case(func, items, repeat):
+    """
+    Time func over repeat runs, then measure its peak memory in one more.
+
+    Returns:
+    dict: median/min seconds, throughput (items/s) and peak_kb
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(durations)
+    return {
+        'median_s': round(median, 5),
+        'min_s': round(min(durations), 5),
+        'throughput': round(items / median, 2) if items and median else None,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline.
+
+    Returns:
+    list: Human-readable regression messages (empty when none)
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous:
+            continue
+        # The fastest run is the least noisy measure of the work itself
+        for metric in ('min_s', 'peak_kb'):
+            if previous[metric] and result[metric] > previous[metric] * (1 + threshold):
+                change = result[metric] / previous[metric] - 1
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {result[metric]} (+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplier for the injected service latency (0 disables it)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative growth before a case counts as a regression")
+    parser.add_argument("--only", default="", help="comma-separated case names to run")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    latency = {service: seconds * args.latency_scale for service, seconds in LATENCY_PROFILE.items()}
+    selected = {name for name in args.only.split(",") if name}
+
+    # Images come from the stand-in only: empty library, private download and document caches
+    work_dir = tempfile.mkdtemp(prefix="themeseeker-bench-")
+    os.environ["THEMESEEKER_IMAGE_LIBRARY"] = os.path.join(work_dir, "library")
+    os.environ["THEMESEEKER_IMAGE_CACHE"] = os.path.join(work_dir, "image_cache")
+    os.environ["THEMESEEKER_DOCUMENT_CACHE"] = os.path.join(work_dir, "document_cache")
+    os.environ["THEMESEEKER_CATEGORY_INDEX"] = os.path.join(work_dir, "category_index.npz")
+    os.environ["THEMESEEKER_TRANSLATION_DB"] = os.path.join(work_dir, "translations.sqlite3")
+
+    results = {}
+    with StubServices(latency=latency) as stubs:
+        cases = build_cases()
+        for name, (func, items) in cases.items():
+            if selected and name not in selected:
+                continue
+            results[name] = run_case(func, items, args.repeat)
+            result = results[name]
+            throughput = f"{result['throughput']:>10,.1f}/s" if result['throughput'] else " " * 12
+            print(f"{name:<15} median {result['median_s']:>9.4f} s  {throughput}  peak {result['peak_kb']:>10,.1f} KiB")
+        request_counts = dict(stubs.request_counts)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'python': sys.version.split()[0],
+        'repeat': args.repeat,
+        'latency': latency,
+        'cases': results,
+        'stub_requests': request_counts,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(result_path, "w", encoding="utf-8") as result_file:
+        json.dump(report, result_file, indent=2)
+    print(f"\nResults saved to {result_path}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Baseline saved to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("No baseline yet; run with --save-baseline to create one.")
+        return 0
+
+    with open(BASELINE_PATH, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get('latency') != latency:
+        print("Warning: the baseline was recorded with a different latency profile.")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressions against the baseline from {baseline['timestamp']}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"\nNo regressions against the baseline from {baseline['timestamp']}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,402 @@
+"""
+Local stand-in servers for the external services the app calls.
+
+StubServices serves, on one local port, the parts of the YouTube Data API
+(search, videos, channels, commentThreads), the Gemini REST API (models,
+generateContent, countTokens, cachedContents) and the image endpoint that
+the app uses, answering from the recorded responses in benchmarks/fixtures/.
+Each service can be given an injected latency so benchmarks reflect
+realistic network waits. Gemini additionally waits 'gemini_prefill' seconds
+per 1000 prompt tokens it has to process, where tokens read from cached
+content are free, to model time-to-first-token. While active it points the
+app at itself through the YOUTUBE_API_ENDPOINT, GEMINI_API_ENDPOINT and
+THEMESEEKER_IMAGE_URL environment variables.
+
+Usage:
+    with StubServices(latency={'youtube': 0.1, 'gemini': 1.5, 'image': 0.3}) as stubs:
+        ...  # call mine_period, generate_themes, create_documents_zip, ...
+        print(stubs.request_counts)
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urlparse, parse_qs
+
+from PIL import Image
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Seconds added to every request of a service; 'gemini_prefill' is per 1000
+# uncached prompt tokens of a generateContent request
+DEFAULT_LATENCY = {'youtube': 0.0, 'gemini': 0.0, 'image': 0.0, 'gemini_prefill': 0.0}
+
+# Smallest prompt prefix the stand-in accepts as cached content, in tokens
+MIN_CACHE_TOKENS = 1024
+
+# Start of the segment list in a translation prompt
+SEGMENTS_MARKER = "Segments (JSON array):"
+
+ENV_VARS = ("YOUTUBE_API_ENDPOINT", "GEMINI_API_ENDPOINT", "THEMESEEKER_IMAGE_URL")
+
+
+def load_fixture(name):
+    """Load a recorded response from benchmarks/fixtures/<name>.json."""
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json"), encoding="utf-8") as fixture_file:
+        return json.load(fixture_file)
+
+
+def _search_item(video):
+    return {
+        'kind': 'youtube#searchResult',
+        'id': {'kind': 'youtube#video', 'videoId': video['id']},
+        'snippet': video['snippet'],
+    }
+
+
+def _stub_image(size=(1200, 600)):
+    """A gradient JPEG roughly the size and weight of a real photo."""
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    buffer = BytesIO()
+    img.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _service(self, path):
+        if path.startswith("/youtube/"):
+            return 'youtube'
+        if path.startswith("/v1beta/") or path.startswith("/v1/"):
+            return 'gemini'
+        if path.startswith("/image"):
+            return 'image'
+        return None
+
+    def _handle(self, body=b""):
+        stubs = self.server.stubs
+        url = urlparse(self.path)
+        service = self._service(url.path)
+        if service is None:
+            self._send(404, {'error': {'code': 404, 'message': f"No stub for {url.path}"}})
+            return
+        stubs.record(service, url.path)
+        if stubs.latency.get(service):
+            time.sleep(stubs.latency[service])
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        status, payload, content_type = stubs.respond(service, url.path, params, body, self.command)
+        self._send(status, payload, content_type)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self._handle(self.rfile.read(length))
+
+    do_PATCH = do_POST
+
+    def do_DELETE(self):
+        self._handle()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServices:
+    """
+    Serve recorded YouTube, Gemini and image responses on a local port.
+
+    Parameters:
+    latency (dict): Injected seconds per request, by service name
+                    ('youtube', 'gemini', 'image')
+    port (int): Port to listen on (default: any free port)
+    """
+
+    def __init__(self, latency=None, port=0):
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.port = port
+        self.request_counts = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._saved_env = {}
+
+        self.videos = {video['id']: video for video in load_fixture("youtube_videos")['items']}
+        self.channels = {video['snippet']['channelId']: video['snippet']['channelTitle'] for video in self.videos.values()}
+        self.models = load_fixture("gemini_models")
+        self.themes_response = load_fixture("gemini_themes")
+        self.translation_response = load_fixture("gemini_translation")
+        self.image = _stub_image()
+        self.comment_texts = load_fixture("youtube_comments")['texts']
+        self.extra_comments = {}
+        self.cached_contents = {}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def record(self, service, path):
+        key = f"{service} {path.rsplit(':', 1)[-1] if ':' in path else path}"
+        with self._lock:
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+    def _search(self, params):
+        # Each query gets its own deterministic slice of the recorded pool
+        pool = sorted(self.videos)
+        digest = int(hashlib.sha1(params.get('q', '').encode("utf-8")).hexdigest(), 16)
+        count = min(int(params.get('maxResults', 5)), 50)
+        start = digest % len(pool)
+        ids = [pool[(start + i * 7) % len(pool)] for i in range(count)]
+        return {
+            'kind': 'youtube#searchListResponse',
+            'pageInfo': {'totalResults': len(pool), 'resultsPerPage': count},
+            'items': [_search_item(self.videos[video_id]) for video_id in ids],
+        }
+
+    def _videos(self, params):
+        ids = [video_id for video_id in params.get('id', '').split(',') if video_id]
+        return {'kind': 'youtube#videoListResponse', 'items': [self.videos[i] for i in ids if i in self.videos]}
+
+    def _channels(self, params):
+        """Channels of the recorded videos, with statistics derived from the channel ID."""
+        ids = [channel_id for channel_id in params.get('id', '').split(',') if channel_id][:50]
+        items = []
+        for channel_id in ids:
+            if channel_id not in self.channels:
+                continue
+            digest = int(hashlib.sha1(channel_id.encode("utf-8")).hexdigest(), 16)
+            statistics = {'viewCount': str(digest % 500_000_000), 'videoCount': str(digest % 2000 + 1),
+                          'hiddenSubscriberCount': digest % 11 == 0}
+            if not statistics['hiddenSubscriberCount']:
+                statistics['subscriberCount'] = str(digest % 5_000_000)
+            items.append({'kind': 'youtube#channel', 'id': channel_id,
+                          'snippet': {'title': self.channels[channel_id]}, 'statistics': statistics})
+        return {'kind': 'youtube#channelListResponse', 'items': items}
+
+    def _video_comments(self, video_id):
+        """
+        The comment threads of a video, newest first: a deterministic set
+        derived from the recorded pool, plus any added with add_comments().
+        Videos whose ID hash is a multiple of 17 have comments disabled.
+        """
+        digest = int(hashlib.sha1(video_id.encode("utf-8")).hexdigest(), 16)
+        if digest % 17 == 0:
+            return None
+        published = datetime.strptime(self.videos[video_id]['snippet']['publishedAt'], "%Y-%m-%dT%H:%M:%SZ")
+        count = min(int(self.videos[video_id]['statistics'].get('commentCount', 0)), 150)
+        comments = [{
+            'id': f"{video_id}.c{i}",
+            'text': self.comment_texts[(digest + i * 5) % len(self.comment_texts)],
+            'likeCount': (digest >> (i % 32)) % 200,
+            'publishedAt': (published + timedelta(hours=i + 1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        } for i in range(count)]
+        comments.extend(self.extra_comments.get(video_id, []))
+        return sorted(comments, key=lambda comment: comment['publishedAt'], reverse=True)
+
+    def add_comments(self, video_id, count):
+        """Post count new comments on a video, published now."""
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        with self._lock:
+            extra = self.extra_comments.setdefault(video_id, [])
+            for _ in range(count):
+                extra.append({
+                    'id': f"{video_id}.n{len(extra)}",
+                    'text': self.comment_texts[len(extra) % len(self.comment_texts)],
+                    'likeCount': 0,
+                    'publishedAt': now,
+                })
+
+    def _comment_threads(self, params):
+        video_id = params.get('videoId', '')
+        if video_id not in self.videos:
+            return 404, {'error': {'code': 404, 'message': "Video not found", 'errors': [{'reason': 'videoNotFound'}]}}
+        comments = self._video_comments(video_id)
+        if comments is None:
+            return 403, {'error': {'code': 403, 'message': "The video has disabled comments.",
+                                   'errors': [{'reason': 'commentsDisabled'}]}}
+        if params.get('order') == 'relevance':
+            comments = sorted(comments, key=lambda comment: comment['likeCount'], reverse=True)
+        start = int(params.get('pageToken') or 0)
+        size = min(int(params.get('maxResults', 20)), 100)
+        response = {
+            'kind': 'youtube#commentThreadListResponse',
+            'items': [{
+                'kind': 'youtube#commentThread',
+                'id': comment['id'],
+                'snippet': {
+                    'videoId': video_id,
+                    'topLevelComment': {'id': comment['id'], 'snippet': {
+                        'textOriginal': comment['text'],
+                        'likeCount': comment['likeCount'],
+                        'publishedAt': comment['publishedAt'],
+                    }},
+                    'totalReplyCount': 0,
+                },
+            } for comment in comments[start:start + size]],
+        }
+        if start + size < len(comments):
+            response['nextPageToken'] = str(start + size)
+        return 200, response
+
+    @staticmethod
+    def _text_of(contents):
+        return " ".join(part.get('text', '') for content in contents or [] for part in content.get('parts', []))
+
+    def _generate(self, body):
+        request = json.loads(body or b"{}")
+        prompt = self._text_of(request.get('contents'))
+        cached_tokens = 0
+        if request.get('cachedContent'):
+            cached = self.cached_contents.get(request['cachedContent'])
+            if cached is None or cached['expires'] < time.time():
+                return 404, {'error': {'code': 404, 'message': "CachedContent not found", 'status': "NOT_FOUND"}}
+            cached_tokens = cached['tokens']
+        prompt_tokens = len(prompt) // 4
+        if self.latency.get('gemini_prefill'):
+            time.sleep(self.latency['gemini_prefill'] * prompt_tokens / 1000)
+        if SEGMENTS_MARKER in prompt:
+            response = self._segment_translation(prompt)
+        else:
+            response = dict(self.translation_response if "Translate" in prompt else self.themes_response)
+        usage = dict(response.get('usageMetadata', {}))
+        usage['promptTokenCount'] = prompt_tokens + cached_tokens
+        if cached_tokens:
+            usage['cachedContentTokenCount'] = cached_tokens
+        response['usageMetadata'] = usage
+        return 200, response
+
+    @staticmethod
+    def _segment_translation(prompt):
+        """Answer a segment translation prompt (translation.py) with tagged copies of the segments."""
+        segments_json = prompt.split(SEGMENTS_MARKER, 1)[1].split("IMPORTANT:", 1)[0]
+        target = prompt.split("from English to ", 1)[1].split(" ", 1)[0]
+        translated = [f"[{target}] {segment}" for segment in json.loads(segments_json)]
+        return {
+            'candidates': [{'content': {'parts': [{'text': json.dumps(translated, ensure_ascii=False)}], 'role': "model"},
+                            'finishReason': "STOP", 'index': 0}],
+            'usageMetadata': {'candidatesTokenCount': len(segments_json) // 4},
+        }
+
+    def _cached_content_resource(self, cached):
+        def timestamp(seconds):
+            return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        return {
+            'name': cached['name'],
+            'model': cached['model'],
+            'displayName': cached['display_name'],
+            'createTime': timestamp(cached['created']),
+            'updateTime': timestamp(cached['updated']),
+            'expireTime': timestamp(cached['expires']),
+            'usageMetadata': {'totalTokenCount': cached['tokens']},
+        }
+
+    def _cached_contents(self, path, params, body, method):
+        """Create, list, get, update (TTL) and delete cached content."""
+        name = path.split("/v1beta/", 1)[-1]
+        request = json.loads(body or b"{}")
+        now = time.time()
+        with self._lock:
+            for key in [key for key, cached in self.cached_contents.items() if cached['expires'] < now]:
+                del self.cached_contents[key]
+            if name == "cachedContents" and method == "POST":
+                tokens = len(self._text_of(request.get('contents')) + self._text_of(
+                    [request['systemInstruction']] if request.get('systemInstruction') else [])) // 4
+                if tokens < MIN_CACHE_TOKENS:
+                    return 400, {'error': {'code': 400, 'status': "INVALID_ARGUMENT", 'message':
+                                           f"Cached content is too small. total_token_count={tokens}, "
+                                           f"min_total_token_count={MIN_CACHE_TOKENS}"}}
+                name = f"cachedContents/{hashlib.sha1(f'{now}{len(self.cached_contents)}'.encode()).hexdigest()[:16]}"
+                self.cached_contents[name] = {
+                    'name': name, 'model': request.get('model', ''), 'display_name': request.get('displayName', ''),
+                    'created': now, 'updated': now, 'tokens': tokens,
+                    'expires': now + float(str(request.get('ttl', "3600s")).rstrip("s")),
+                }
+                return 200, self._cached_content_resource(self.cached_contents[name])
+            if name == "cachedContents":
+                return 200, {'cachedContents': [self._cached_content_resource(cached)
+                                                for cached in self.cached_contents.values()]}
+            cached = self.cached_contents.get(name)
+            if cached is None:
+                return 404, {'error': {'code': 404, 'message': "CachedContent not found", 'status': "NOT_FOUND"}}
+            if method == "DELETE":
+                del self.cached_contents[name]
+                return 200, {}
+            if method == "PATCH":
+                cached['updated'] = now
+                cached['expires'] = now + float(str(request.get('ttl', "3600s")).rstrip("s"))
+            return 200, self._cached_content_resource(cached)
+
+    def respond(self, service, path, params, body, method="GET"):
+        """
+        Build the response for one request.
+
+        Returns:
+        tuple: (HTTP status, body as dict or bytes, content type)
+        """
+        if service == 'image':
+            return 200, self.image, "image/jpeg"
+        if service == 'youtube':
+            if path.endswith("/search"):
+                return 200, self._search(params), "application/json"
+            if path.endswith("/videos"):
+                return 200, self._videos(params), "application/json"
+            if path.endswith("/channels"):
+                return 200, self._channels(params), "application/json"
+            if path.endswith("/commentThreads"):
+                status, payload = self._comment_threads(params)
+                return status, payload, "application/json"
+        if service == 'gemini':
+            if path.endswith("/models"):
+                return 200, self.models, "application/json"
+            if path.endswith(":generateContent"):
+                status, payload = self._generate(body)
+                return status, payload, "application/json"
+            if "/cachedContents" in path:
+                status, payload = self._cached_contents(path, params, body, method)
+                return status, payload, "application/json"
+            if path.endswith(":countTokens"):
+                return 200, {'totalTokens': len(body) // 4}, "application/json"
+        return 404, {'error': {'code': 404, 'message': f"No stub for {path}"}}, "application/json"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stubs = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        self._saved_env = {name: os.environ.get(name) for name in ENV_VARS}
+        os.environ["YOUTUBE_API_ENDPOINT"] = self.base_url
+        os.environ["GEMINI_API_ENDPOINT"] = self.base_url
+        os.environ["THEMESEEKER_IMAGE_URL"] = self.base_url + "/image/?{query}"
+        return self
+
+    def stop(self):
+        for name, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,78 @@
+"""
+Topic categorization of mined videos, and keyword extraction from free
+text such as viewer comments.
+"""
+import re
+
+GENERAL_CONTEXT = "General spiritual content"
+
+# Common English and Portuguese words that carry no topic
+STOPWORDS = frozenset("""
+about after again also always amazing anyone anything around back because been before being best
+better between both bring came cannot could didn does doing done down during each else even ever
+every everything feel felt finally find first from full gave give going good great have having
+here helps how into just know knew like little live
+long look love made make makes many more most much must need never next nothing now only other
+over part please really right same says should show since some someone something still such
+sure take talk than thank thanks that their them then there these they thing things think this
+those though through
+time today very video videos want watch watching well were what when where which while whole
+will with without would year years your yours
+aqui assim cada coisa coisas como com contra depois desse deste disso ela elas ele eles essa esse
+esta este estou isso isto mais mesmo meu minha muito muita nada nossa nosso obrigado obrigada
+onde para pela pelo pode porque quando quem sempre sobre sua seu também tenho todo todos tudo
+vídeo você vocês
+""".split())
+
+_WORD = re.compile(r"[^\W\d_]{4,}")
+
+
+def extract_keywords(text):
+    """
+    Distinct content words of a text: lowercase words of four or more
+    letters that are not stopwords, in order of first appearance.
+
+    Parameters:
+    text (str): Free text (title, description, comment)
+
+    Returns:
+    list: Keywords
+    """
+    words = (word for word in _WORD.findall(text.lower()) if word not in STOPWORDS)
+    return list(dict.fromkeys(words))
+
+
+# Function to generate brief context for each video
+def generate_video_context(title, description):
+    # Extract first 200 characters of description or less
+    brief_desc = description[:200] + "..." if len(description) > 200 else description
+    
+    # Simple rule-based contextualizing (could be replaced with more sophisticated NLP)
+    context = ""
+    
+    if re.search(r'meditation|mindfulness', title.lower() + brief_desc.lower()):
+        context = "Meditation/Mindfulness practice"
+    elif re.search(r'buddhis|zen|tao', title.lower() + brief_desc.lower()):
+        context = "Eastern philosophy"
+    elif re.search(r'christian|jesus|bible|faith', title.lower() + brief_desc.lower()):
+        context = "Christian spirituality"
+    elif re.search(r'islam|muslim|quran', title.lower() + brief_desc.lower()):
+        context = "Islamic spirituality"
+    elif re.search(r'judaism|jewish|torah', title.lower() + brief_desc.lower()):
+        context = "Jewish spirituality"
+    elif re.search(r'hindu|vedanta|yoga', title.lower() + brief_desc.lower()):
+        context = "Hindu spirituality"
+    elif re.search(r'consciousness|awareness', title.lower() + brief_desc.lower()):
+        context = "Consciousness exploration"
+    elif re.search(r'psychedelic|plant medicine|ayahuasca|dmt', title.lower() + brief_desc.lower()):
+        context = "Psychedelic spirituality"
+    elif re.search(r'near death|afterlife|heaven', title.lower() + brief_desc.lower()):
+        context = "Afterlife exploration"
+    elif re.search(r'science|physics|quantum', title.lower() + brief_desc.lower()):
+        context = "Science and spirituality"
+    elif re.search(r'gnosticism|gnostic|consciousness|awareness', title.lower() + brief_desc.lower()):
+        context = "Gnosticism"
+    else:
+        context = GENERAL_CONTEXT
+    
+    return context
@@ -0,0 +1,376 @@
+"""
+Offline topic categorization of video titles with a centroid index.
+
+Every text is turned into a hashed bag of character n-grams (3 to 5
+letters of each word, with the word boundaries, after lowercasing and
+removing accents), so related word forms and languages share features:
+"meditation", "meditação" and "meditación" all contain "medit". Each
+category is described by a list of seed terms in English, Portuguese and
+Spanish; the centroid of a category is the mean of its seed vectors,
+weighted down where an n-gram is shared by many categories. The centroids
+form one NumPy matrix, built once and kept on disk next to a fingerprint
+of the seeds. Classifying a batch takes one weighted bincount per category
+over the batch's hashed n-grams, plus an argmax. No model download and no
+network access is needed.
+
+Without SciPy there is no sparse matrix product. A CSR product written in
+NumPy (n-grams sorted by text, centroid rows gathered and summed with
+np.add.reduceat) is slower than the per-category bincounts: the gather
+reads the centroid matrix at random. So is a dense (texts x known n-grams)
+matrix times the centroids. With descriptions, every text has about ten
+times as many n-grams, and hashing them costs as much as scoring. The
+index then classifies about half as fast as the keyword rules, but with
+96% accuracy on the labelled titles against 32% (see
+benchmarks/bench_categories.py). On titles alone it is the faster of the
+two.
+
+The score of the best category is its cosine similarity with the text and
+is returned as the confidence. Texts scoring below MIN_CONFIDENCE are
+labelled by the keyword rules of generate_video_context instead.
+
+Configuration (environment variables):
+    THEMESEEKER_CATEGORY_INDEX  path of the centroid index (default: data/category_index.npz)
+"""
+import hashlib
+import json
+import os
+import re
+import string
+import threading
+import unicodedata
+
+import numpy as np
+
+from categories import STOPWORDS, generate_video_context
+from tracing import trace_span, increment_counter
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "category_index.npz")
+
+# Seed terms per category; changing them rebuilds the index
+CATEGORY_SEEDS = {
+    "Meditation/Mindfulness practice": """
+        meditation meditate guided meditation mindfulness mindful breathwork breathing breath stillness
+        silence present moment calm mind contemplation concentration vipassana relaxation deep sleep
+        meditação meditar meditação guiada atenção plena respiração silêncio interior momento presente
+        mente calma contemplação relaxamento
+        meditación meditar atención plena respiración quietud silencio momento presente
+    """,
+    "Eastern philosophy": """
+        buddhism buddhist buddha zen tao taoism taoist lao tzu dharma karma nirvana sutra koan
+        impermanence samsara enlightenment bodhisattva confucius tibetan
+        budismo budista buda zen taoísmo taoísta carma impermanência iluminação sabedoria oriental
+        budismo budista taoísmo iluminación sabiduría oriental
+    """,
+    "Christian spirituality": """
+        christian christianity mystical christianity christ jesus gospel bible biblical faith prayer
+        church saints holy spirit god grace resurrection
+        cristão cristianismo cristianismo místico cristo jesus evangelho bíblia oração igreja santos
+        espírito santo deus graça ressurreição
+        cristiano cristianismo evangelio biblia oración iglesia santos espíritu santo dios
+    """,
+    "Islamic spirituality": """
+        islam islamic muslim quran koran sufi sufism rumi allah prophet muhammad mosque ramadan
+        islã islâmico muçulmano alcorão sufi sufismo profeta maomé mesquita
+        islam islámico musulmán corán sufismo profeta mahoma mezquita
+    """,
+    "Jewish spirituality": """
+        judaism jewish torah talmud rabbi shabbat kabbalah kabbalistic zohar sefirot tree of life
+        judaísmo judeu judaica torá talmude rabino cabala cabalística zohar árvore da vida
+        judaísmo judío judía torá talmud rabino cábala árbol de la vida
+    """,
+    "Hindu spirituality": """
+        hindu hinduism vedanta advaita yoga yogi upanishads bhagavad gita krishna brahman atman
+        chakra chakras kundalini mantra veda vedas
+        hindu hinduísmo vedanta ioga iogue upanixades bhagavad gita krishna chacra chacras mantra
+        hinduismo yoga upanishads chakra mantra
+    """,
+    "Consciousness exploration": """
+        consciousness conscious awareness awakening awaken self realization higher self ego
+        inner light inner self soul mind
+        consciência consciente despertar despertar espiritual autoconhecimento eu superior ego
+        luz interior alma mente
+        conciencia consciente despertar autoconocimiento yo superior luz interior alma
+    """,
+    "Psychedelic spirituality": """
+        psychedelic psychedelics ayahuasca dmt psilocybin magic mushrooms plant medicine lsd
+        mescaline entheogen
+        psicodélico psicodélicos ayahuasca cogumelos mágicos medicina da floresta enteógeno
+        psicodélico hongos mágicos medicina de plantas enteógeno
+    """,
+    "Afterlife exploration": """
+        near death experience near death experiences afterlife life after death heaven hell
+        reincarnation past lives died and saw death dying beyond death
+        experiência de quase morte vida após a morte céu inferno reencarnação vidas passadas morte
+        morri e vi
+        experiencia cercana a la muerte vida después de la muerte cielo reencarnación vidas pasadas
+        muerte
+    """,
+    "Science and spirituality": """
+        science scientific scientist physics quantum quantum physics neuroscience brain research
+        universe cosmos evidence study
+        ciência científico cientista física quântica física neurociência cérebro pesquisa universo
+        cosmos
+        ciencia científico física cuántica neurociencia cerebro investigación universo
+    """,
+    "Gnosticism": """
+        gnosticism gnostic gnostics gnosis nag hammadi demiurge pistis sophia archons gospel of thomas
+        cathars manichaeism
+        gnosticismo gnóstico gnósticos gnose demiurgo arcontes evangelho de tomé cátaros
+        gnosticismo gnóstico gnosis demiurgo arcontes cátaros
+    """,
+    "Western esotericism": """
+        rosicrucian rosicrucians rosicrucianism hermetic hermeticism hermetic principles hermes
+        trismegistus kybalion alchemy alchemist esoteric esotericism occult mystery schools
+        theosophy freemasonry mystic mysticism initiation
+        rosacruz rosacruzes rosa cruz hermetismo princípios herméticos alquimia alquimista esotérico
+        esoterismo ocultismo escolas de mistérios teosofia maçonaria místico misticismo iniciação
+        rosacruces hermetismo alquimia esoterismo ocultismo escuelas de misterios teosofía masonería
+    """,
+}
+
+# Bump when the vectorization changes, so stored indexes are rebuilt
+INDEX_VERSION = 1
+
+# Size of the hashed feature space (2 ** HASH_BITS dimensions)
+HASH_BITS = 18
+
+NGRAM_SIZES = (3, 4, 5)
+
+# Weight of the description relative to the title
+DESCRIPTION_WEIGHT = 0.5
+
+# Characters of the description used, as in generate_video_context
+DESCRIPTION_CHARS = 200
+
+# Best-category cosine below which the keyword rules decide
+MIN_CONFIDENCE = 0.1
+
+# Texts vectorized per chunk, which bounds the memory of a large batch
+BATCH_SIZE = 8192
+
+# Short function words that survive the length filter
+_SHORT_STOPWORDS = frozenset("and are but can for has her him his how its not our out the who why you "
+                             "com das dos ela ele mas nao nos por que sem seu sua uma".split())
+
+_COMBINING = re.compile(r"[\u0300-\u036f]")
+_ASCII_NON_LETTERS = str.maketrans({char: " " for char in map(chr, range(128))
+                                     if not char.isalpha() and char != "\n"})
+_NON_LETTERS = re.compile(r"[^\w\n]|[\d_]")
+# Words dropped before hashing: stopwords and every word of at most two
+# ASCII letters (longer ones are dropped as well, only less cheaply)
+_DROPPED_WORDS = frozenset(
+    {_COMBINING.sub("", unicodedata.normalize("NFKD", word)) for word in STOPWORDS | _SHORT_STOPWORDS}
+    | {""} | set(string.ascii_lowercase) | {a + b for a in string.ascii_lowercase for b in string.ascii_lowercase})
+
+_HASH_PRIME = np.uint64(1099511628211)
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index_path():
+    return os.environ.get("THEMESEEKER_CATEGORY_INDEX", DEFAULT_INDEX_PATH)
+
+
+def _normalize(texts):
+    """
+    One string for a batch of texts: lowercase, accents, digits,
+    punctuation, stopwords and one- or two-letter words removed, texts
+    separated by newlines and every word by spaces.
+    """
+    # The whole batch is cleaned in a few passes over one string
+    joined = " \n ".join(text.replace("\n", " ") for text in texts).lower()
+    joined = joined.translate(_ASCII_NON_LETTERS)
+    if not joined.isascii():
+        joined = _NON_LETTERS.sub(" ", _COMBINING.sub("", unicodedata.normalize("NFKD", joined)))
+    words = joined.split(" ")
+    # One flat pass over all words; the newline separators are kept as words
+    kept = [word for word in words if word not in _DROPPED_WORDS]
+    return f" {' '.join(kept)} \n"
+
+
+def _hashed_ngrams(texts):
+    """
+    Hashed character n-grams of a batch of texts.
+
+    Parameters:
+    texts (list): Texts
+
+    Returns:
+    tuple: (text of each n-gram, feature column of each n-gram), both ndarrays
+    """
+    codes = np.frombuffer(_normalize(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    # Running counts of separators (the text an n-gram belongs to) and of spaces
+    separators = np.concatenate(([0], np.cumsum(codes == 10)))
+    spaces = np.concatenate(([0], np.cumsum(codes == 32)))
+
+    rows, columns = [], []
+    hashes = np.zeros(len(codes), dtype=np.uint64)
+    for size in range(1, max(NGRAM_SIZES) + 1):
+        # Each size extends the hashes of the previous one by one character
+        count = len(codes) - size + 1
+        hashes = hashes[:count] * _HASH_PRIME + codes[size - 1:size - 1 + count]
+        if size not in NGRAM_SIZES:
+            continue
+        # Inside one text, with spaces only at the ends (word boundaries)
+        valid = (separators[size:size + count] == separators[:count]) & \
+                (spaces[size - 1:size - 1 + count] == spaces[1:1 + count])
+        rows.append(separators[:count][valid])
+        mixed = (hashes[valid] ^ np.uint64(size)) * _HASH_MIX
+        columns.append((mixed >> np.uint64(64 - HASH_BITS)).astype(np.intp))
+    return np.concatenate(rows), np.concatenate(columns)
+
+
+def _seed_fingerprint():
+    payload = json.dumps([CATEGORY_SEEDS, sorted(STOPWORDS), HASH_BITS, NGRAM_SIZES, INDEX_VERSION], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_index():
+    """
+    Compute the category centroids from CATEGORY_SEEDS.
+
+    Returns:
+    tuple: (list of category labels, float32 ndarray of shape
+           (categories, 2 ** HASH_BITS) with unit-length rows, float32
+           ndarray of feature weights, 0 for n-grams no seed contains)
+    """
+    labels = list(CATEGORY_SEEDS)
+    centroids = np.zeros((len(labels), 1 << HASH_BITS))
+    for row, label in enumerate(labels):
+        seeds = CATEGORY_SEEDS[label].split()
+        seed_rows, columns = _hashed_ngrams(seeds)
+        norms = np.sqrt(np.bincount(seed_rows, minlength=len(seeds)))
+        np.add.at(centroids[row], columns, 1 / norms[seed_rows] / len(seeds))
+
+    # N-grams found in many categories ("tion", "ism ") say little about any of them
+    spread = np.count_nonzero(centroids, axis=0)
+    feature_weights = np.where(spread > 0, np.log1p(len(labels) / np.maximum(spread, 1)), 0.0)
+    centroids *= feature_weights
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    return labels, centroids.astype(np.float32), feature_weights.astype(np.float32)
+
+
+def load_index():
+    """
+    The centroid index, read from disk or built (and saved) when missing or
+    built from other seeds.
+
+    Returns:
+    tuple: (list of category labels, centroid matrix, feature weights)
+    """
+    global _index
+    with _index_lock:
+        if _index is not None:
+            return _index
+        path = index_path()
+        fingerprint = _seed_fingerprint()
+        try:
+            with np.load(path) as stored:
+                if str(stored['fingerprint']) == fingerprint:
+                    _index = (list(stored['labels']), stored['centroids'], stored['feature_weights'])
+        except (OSError, KeyError, ValueError):
+            pass
+        if _index is None:
+            with trace_span("categories.build_index"):
+                _index = build_index()
+            labels, centroids, feature_weights = _index
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                temp_path = f"{path}.{os.getpid()}.tmp.npz"
+                np.savez_compressed(temp_path, fingerprint=fingerprint, labels=np.array(labels),
+                                    centroids=centroids, feature_weights=feature_weights)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"Could not save the category index: {e}")
+        return _index
+
+
+def score_texts(titles, descriptions=None):
+    """
+    Cosine similarity of every text with every category centroid. Texts are
+    weighted like the centroids, and n-grams no seed contains are left out,
+    so words unrelated to any category do not dilute the score.
+
+    Parameters:
+    titles (list): Titles (or any short texts)
+    descriptions (list): Optional descriptions, one per title; only the
+                         first DESCRIPTION_CHARS characters are used
+
+    Returns:
+    tuple: (list of category labels, float32 ndarray of shape (texts, categories))
+    """
+    labels, centroids, feature_weights = load_index()
+    scores = np.zeros((len(titles), len(labels)), dtype=np.float32)
+    for start in range(0, len(titles), BATCH_SIZE):
+        batch = titles[start:start + BATCH_SIZE]
+        rows, columns = _hashed_ngrams(batch)
+        values = feature_weights[columns]
+        if descriptions is not None:
+            brief = [(description or "")[:DESCRIPTION_CHARS] for description in descriptions[start:start + BATCH_SIZE]]
+            description_rows, description_columns = _hashed_ngrams(brief)
+            rows = np.concatenate((rows, description_rows))
+            columns = np.concatenate((columns, description_columns))
+            values = np.concatenate((values, DESCRIPTION_WEIGHT * feature_weights[description_columns]))
+        known = values > 0
+        rows, columns, values = rows[known], columns[known], values[known]
+        # Repeated n-grams are counted as separate features, which keeps the
+        # batch free of a sort and changes the norms only slightly
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(batch)))
+        values = values / norms[rows]
+        # Sparse (texts x features) times dense (features x categories), one
+        # bincount per category; faster here than gathering whole centroid rows
+        for column in range(len(labels)):
+            scores[start:start + len(batch), column] = np.bincount(
+                rows, weights=values * centroids[column, columns], minlength=len(batch))
+    return labels, scores
+
+
+def classify_texts(titles, descriptions=None, min_confidence=MIN_CONFIDENCE):
+    """
+    Categorize a batch of texts.
+
+    Parameters:
+    titles (list): Titles (or any short texts)
+    descriptions (list): Optional descriptions, one per title
+    min_confidence (float): Best-category score below which the keyword
+                            rules of generate_video_context decide
+
+    Returns:
+    tuple: (list of category labels, ndarray of confidence scores in [0, 1])
+    """
+    if not len(titles):
+        return [], np.zeros(0, dtype=np.float32)
+    with trace_span("categories.classify", texts=len(titles)):
+        labels, scores = score_texts(titles, descriptions)
+        best = scores.argmax(axis=1)
+        confidence = np.clip(scores[np.arange(len(titles)), best], 0.0, 1.0)
+        result = [labels[column] for column in best]
+        low = np.flatnonzero(confidence < min_confidence)
+        for i in low:
+            result[i] = generate_video_context(titles[i], descriptions[i] if descriptions is not None else "")
+    increment_counter("video_categories", len(titles) - len(low), method="centroid")
+    increment_counter("video_categories", len(low), method="rules")
+    return result, confidence
+
+
+def categorize_videos(videos):
+    """
+    Add 'context' and 'context_confidence' to video dicts, in place.
+
+    Parameters:
+    videos (list): Video dicts with 'title' and 'description'
+
+    Returns:
+    list: The same videos
+    """
+    labels, confidence = classify_texts(
+        [video.get('title', "") for video in videos],
+        [video.get('description', "") for video in videos],
+    )
+    for video, label, score in zip(videos, labels, confidence):
+        video['context'] = label
+        video['context_confidence'] = round(float(score), 3)
+    return videos
+
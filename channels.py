@@ -0,0 +1,302 @@
+"""
+Channel-level aggregation of mined videos.
+
+Mined videos carry the ID and title of their channel. The statistics of
+the channels (subscribers, total views, uploads) are fetched with
+channels().list, 50 IDs per call at 1 quota unit, and stored in a SQLite
+table; a channel fetched within CHANNEL_TTL is served from the table.
+Channel sizes change slowly, so the TTL is long and a mining run rarely
+costs more than a call or two.
+
+The videos are then grouped by channel and by category and channel, with
+the channels and categories factorized once and every total computed as a
+bincount over the codes (as ranking.py does for its per-period groups):
+
+    channel_table()     one row per channel: videos, views and share of all
+                        views, categories covered, subscribers and views
+                        per subscriber
+    category_channels() one entry per category: share of all views, number
+                        of channels and the channels with the largest share
+                        of the category's views
+
+category_channels() is compact enough to go into the theme prompt in
+place of some of the title lines (see prompt_builder.py).
+
+Configuration (environment variables):
+    THEMESEEKER_CHANNELS_DB  path of the SQLite database (default: data/channels.sqlite3)
+"""
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from categories import GENERAL_CONTEXT
+from tracing import trace_span, increment_counter
+from youtube_mining import build_youtube
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "channels.sqlite3")
+
+CHANNELS_LIST_QUOTA_COST = 1
+
+# IDs per channels().list call (the API maximum)
+BATCH_SIZE = 50
+
+# Channels fetched more recently than this are served from the table
+CHANNEL_TTL = 7 * 24 * 60 * 60
+
+# Channels listed per category
+TOP_CHANNELS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    title TEXT,
+    subscriber_count INTEGER,
+    view_count INTEGER,
+    video_count INTEGER,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def db_path():
+    return os.environ.get("THEMESEEKER_CHANNELS_DB", DEFAULT_DB_PATH)
+
+
+def _connect():
+    path = db_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _parse_channel(item):
+    statistics = item.get('statistics', {})
+    # Channels can hide their subscriber count
+    hidden = statistics.get('hiddenSubscriberCount') or 'subscriberCount' not in statistics
+    return {
+        'channel_id': item['id'],
+        'title': item.get('snippet', {}).get('title'),
+        'subscriber_count': None if hidden else int(statistics['subscriberCount']),
+        'view_count': int(statistics['viewCount']) if 'viewCount' in statistics else None,
+        'video_count': int(statistics['videoCount']) if 'videoCount' in statistics else None,
+    }
+
+
+def fetch_channel_batch(youtube, channel_ids):
+    """
+    Fetch the statistics of up to BATCH_SIZE channels in one call.
+
+    Parameters:
+    youtube: YouTube Data API client
+    channel_ids (list): Channel IDs
+
+    Returns:
+    list: Channel dicts; channels that no longer exist are left out
+    """
+    increment_counter("youtube_quota_units", CHANNELS_LIST_QUOTA_COST, call="channels.list")
+    with trace_span("youtube.channels_list", channels=len(channel_ids)):
+        response = youtube.channels().list(
+            part="snippet,statistics",
+            id=','.join(channel_ids),
+            maxResults=BATCH_SIZE
+        ).execute()
+    return [_parse_channel(item) for item in response.get('items', [])]
+
+
+def _stored_channels(conn, channel_ids):
+    rows = []
+    # SQLite limits the number of parameters of one statement
+    for start in range(0, len(channel_ids), 500):
+        chunk = channel_ids[start:start + 500]
+        rows.extend(conn.execute(
+            f"SELECT channel_id, title, subscriber_count, view_count, video_count, fetched_at FROM channels "
+            f"WHERE channel_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        ).fetchall())
+    return {row[0]: {'channel_id': row[0], 'title': row[1], 'subscriber_count': row[2], 'view_count': row[3],
+                     'video_count': row[4], 'fetched_at': row[5]} for row in rows}
+
+
+def channel_statistics(api_key, channel_ids):
+    """
+    Statistics of some channels, fetching only those not in the table or
+    older than CHANNEL_TTL.
+
+    Parameters:
+    api_key (str): YouTube Data API key
+    channel_ids (list): Channel IDs
+
+    Returns:
+    tuple: (dict channel ID -> channel dict, stats dict with channels,
+            cached, fetched, batches, quota used and errors)
+    """
+    channel_ids = list(dict.fromkeys(channel_id for channel_id in channel_ids if channel_id))
+    stats = {'channels': len(channel_ids), 'cached': 0, 'fetched': 0, 'batches': 0, 'quota_used': 0,
+             'errors': []}
+    if not channel_ids:
+        return {}, stats
+
+    conn = _connect()
+    try:
+        stored = _stored_channels(conn, channel_ids)
+        now = time.time()
+        to_fetch = [channel_id for channel_id in channel_ids
+                    if channel_id not in stored or now - stored[channel_id]['fetched_at'] >= CHANNEL_TTL]
+        stats['cached'] = len(channel_ids) - len(to_fetch)
+
+        if to_fetch:
+            youtube = build_youtube(api_key)
+            for start in range(0, len(to_fetch), BATCH_SIZE):
+                batch = to_fetch[start:start + BATCH_SIZE]
+                stats['batches'] += 1
+                stats['quota_used'] += CHANNELS_LIST_QUOTA_COST
+                try:
+                    channels = {channel['channel_id']: channel for channel in fetch_channel_batch(youtube, batch)}
+                except Exception as e:
+                    stats['errors'].append(str(e))
+                    continue
+                # Missing channels are stored too, so they are not asked for again until the TTL ends
+                rows = [channels.get(channel_id, {'channel_id': channel_id}) for channel_id in batch]
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO channels (channel_id, title, subscriber_count, view_count, "
+                        "video_count, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(row['channel_id'], row.get('title'), row.get('subscriber_count'), row.get('view_count'),
+                          row.get('video_count'), now) for row in rows],
+                    )
+                for row in rows:
+                    stored[row['channel_id']] = dict(row, fetched_at=now)
+                stats['fetched'] += len(channels)
+    finally:
+        conn.close()
+    return {channel_id: stored[channel_id] for channel_id in channel_ids if channel_id in stored}, stats
+
+
+def _grouped(videos):
+    """
+    Factorize the channel and category of every video, so that the
+    aggregations are bincounts over integer codes.
+
+    Returns:
+    dict: 'channel' and 'context' codes per video, 'channel_ids',
+          'channels' (title of each channel) and 'contexts' per code, and
+          'views' per video
+    """
+    # Videos mined before the channel ID was recorded are grouped by channel title
+    keys = [video.get('channel_id') or video.get('channel') or "" for video in videos]
+    videos = [video for video, key in zip(videos, keys) if key]
+    channel_codes, channel_ids = pd.factorize(np.array([key for key in keys if key], dtype=object))
+    context_codes, contexts = pd.factorize(np.array([video.get('context') or GENERAL_CONTEXT for video in videos],
+                                                    dtype=object))
+    # Codes follow the order of first appearance, so these are the first video of each channel
+    _, first = np.unique(channel_codes, return_index=True)
+    return {
+        'channel': channel_codes,
+        'context': context_codes,
+        'channel_ids': np.asarray(channel_ids, dtype=object),
+        'channels': np.array([videos[position].get('channel') or "" for position in first], dtype=object),
+        'contexts': np.asarray(contexts, dtype=object),
+        'views': np.fromiter((video.get('view_count') or 0 for video in videos), dtype=np.float64, count=len(videos)),
+    }
+
+
+def _subscribers(channel_ids, statistics):
+    statistics = statistics or {}
+    return np.array([(statistics.get(channel_id) or {}).get('subscriber_count') for channel_id in channel_ids],
+                    dtype=np.float64)
+
+
+def channel_table(videos, statistics=None):
+    """
+    Aggregate videos per channel.
+
+    Parameters:
+    videos (list): Video dicts with 'channel_id', 'channel', 'context' and 'view_count'
+    statistics (dict): Optional output of channel_statistics() (channel ID -> channel dict)
+
+    Returns:
+    pandas.DataFrame: One row per channel, most viewed first, with
+                      'channel_id', 'channel', 'videos', 'views',
+                      'view_share', 'categories', 'subscribers' and
+                      'views_per_subscriber' (NaN when the subscriber
+                      count is unknown or hidden)
+    """
+    grouped = _grouped(videos)
+    channel_count, context_count = len(grouped['channel_ids']), len(grouped['contexts'])
+    views = np.bincount(grouped['channel'], weights=grouped['views'], minlength=channel_count)
+    # Distinct (channel, category) pairs, counted per channel
+    pairs = np.unique(grouped['channel'].astype(np.int64) * max(context_count, 1) + grouped['context'])
+    categories = np.bincount(pairs // max(context_count, 1), minlength=channel_count)
+    total = views.sum()
+    subscribers = _subscribers(grouped['channel_ids'], statistics)
+    table = pd.DataFrame({
+        'channel_id': grouped['channel_ids'],
+        'channel': grouped['channels'],
+        'videos': np.bincount(grouped['channel'], minlength=channel_count),
+        'views': views.astype(np.int64),
+        'view_share': views / total if total else np.zeros(channel_count),
+        'categories': categories,
+        'subscribers': subscribers,
+        'views_per_subscriber': np.divide(views, subscribers, out=np.full(channel_count, np.nan),
+                                          where=subscribers > 0),
+    })
+    return table.sort_values('views', ascending=False, kind="stable").reset_index(drop=True)
+
+
+def category_channels(videos, statistics=None, top=TOP_CHANNELS):
+    """
+    Aggregate videos per category and channel: how much of the views each
+    category has, and which channels account for them.
+
+    Parameters:
+    videos (list): Video dicts with 'channel_id', 'channel', 'context' and 'view_count'
+    statistics (dict): Optional output of channel_statistics()
+    top (int): Channels listed per category
+
+    Returns:
+    list: Dicts with 'category', 'views', 'view_share' (of all views),
+          'channels' (number of channels) and 'top_channels' (dicts with
+          'channel', 'view_share' of the category's views and
+          'subscribers', or None), most viewed category first
+    """
+    grouped = _grouped(videos)
+    channel_count, context_count = len(grouped['channel_ids']), len(grouped['contexts'])
+    if not channel_count:
+        return []
+    # Views of every (category, channel) pair that has videos
+    pair_codes = grouped['context'].astype(np.int64) * channel_count + grouped['channel']
+    pairs, pair_index = np.unique(pair_codes, return_inverse=True)
+    pair_views = np.bincount(pair_index, weights=grouped['views'])
+    pair_contexts, pair_channels = pairs // channel_count, pairs % channel_count
+
+    category_views = np.bincount(pair_contexts, weights=pair_views, minlength=context_count)
+    category_channel_counts = np.bincount(pair_contexts, minlength=context_count)
+    total = category_views.sum()
+    subscribers = _subscribers(grouped['channel_ids'], statistics)
+
+    # Pairs by category, most viewed channel first
+    order = np.lexsort((-pair_views, pair_contexts))
+    starts = np.searchsorted(pair_contexts[order], np.arange(context_count))
+
+    summary = []
+    for context in np.argsort(-category_views, kind="stable"):
+        leaders = order[starts[context]:starts[context] + min(top, category_channel_counts[context])]
+        views = category_views[context]
+        summary.append({
+            'category': grouped['contexts'][context],
+            'views': int(views),
+            'view_share': round(float(views / total), 3) if total else 0.0,
+            'channels': int(category_channel_counts[context]),
+            'top_channels': [{
+                'channel': grouped['channels'][pair_channels[pair]],
+                'view_share': round(float(pair_views[pair] / views), 3) if views else 0.0,
+                'subscribers': None if np.isnan(subscribers[pair_channels[pair]])
+                else int(subscribers[pair_channels[pair]]),
+            } for pair in leaders],
+        })
+    return summary
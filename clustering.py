@@ -0,0 +1,210 @@
+"""
+Near-duplicate clustering of mined video titles.
+
+Re-uploads, clips and lightly edited copies of the same video are collapsed
+with MinHash signatures over character shingles of the normalized title and
+locality-sensitive hashing (LSH) to find candidate pairs, all vectorized
+with NumPy and fully offline. Candidates are confirmed by their estimated
+Jaccard similarity and merged with a union-find.
+"""
+import re
+import zlib
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.7
+
+# Shingle hashes are processed in blocks to bound memory (NUM_PERM x block)
+_BLOCK = 200000
+
+
+def normalize_title(title):
+    """
+    Reduce a video title to a comparison key: lowercase, no hashtags,
+    bracketed tags ("[Official Video]", "(4K)"), channel suffixes after '|'
+    or punctuation.
+    """
+    key = title.lower()
+    key = re.sub(r'#\w+', ' ', key)
+    key = re.sub(r'[\[(][^\])]*[\])]', ' ', key)
+    key = key.split('|')[0]
+    key = re.sub(r'[^\w\s]', ' ', key)
+    return ' '.join(key.split())
+
+
+def _shingle_hashes(text, size=SHINGLE_SIZE):
+    """Return the distinct 32-bit hashes of the character shingles of text."""
+    if len(text) <= size:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)}
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=1):
+    """
+    Compute MinHash signatures for already-normalized texts.
+
+    Parameters:
+    texts (list): Normalized strings
+    num_perm (int): Number of hash functions (signature length)
+    seed (int): Seed for the hash function parameters
+
+    Returns:
+    numpy.ndarray: uint32 array of shape (len(texts), num_perm)
+    """
+    hashes = []
+    owners = []
+    for i, text in enumerate(texts):
+        shingles = _shingle_hashes(text)
+        hashes.extend(shingles)
+        owners.extend([i] * len(shingles))
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    owners = np.asarray(owners, dtype=np.int64)
+
+    # Multiply-add-shift hashing: ((a * h + b) mod 2^64) >> 32
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    if len(hashes) == 0:
+        return signatures
+
+    # owners is non-decreasing, so each block reduces over contiguous runs
+    for start in range(0, len(hashes), _BLOCK):
+        block = hashes[start:start + _BLOCK]
+        block_owners = owners[start:start + _BLOCK]
+        with np.errstate(over='ignore'):
+            permuted = ((a[:, None] * block[None, :] + b[:, None]) >> np.uint64(32)).astype(np.uint32)
+        run_starts = np.flatnonzero(np.r_[True, block_owners[1:] != block_owners[:-1]])
+        minima = np.minimum.reduceat(permuted, run_starts, axis=1).T
+        rows = block_owners[run_starts]
+        signatures[rows] = np.minimum(signatures[rows], minima)
+    return signatures
+
+
+def _find(parent, i):
+    """Union-find lookup with path halving."""
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def band_keys(signatures, bands=BANDS):
+    """
+    LSH bucket keys: one 64-bit key per band of each signature. Signatures
+    that agree on every row of a band share its key.
+
+    Parameters:
+    signatures (numpy.ndarray): Output of minhash_signatures
+    bands (int): Number of LSH bands (must divide the signature length)
+
+    Returns:
+    numpy.ndarray: uint64 array of shape (len(signatures), bands)
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    rng = np.random.default_rng(0)
+    mixers = rng.integers(1, 2 ** 63, size=rows, dtype=np.uint64) | np.uint64(1)
+    chunks = signatures[:, :bands * rows].astype(np.uint64).reshape(n, bands, rows)
+    with np.errstate(over='ignore'):
+        return (chunks * mixers).sum(axis=2)
+
+
+def cluster_signatures(signatures, threshold=DEFAULT_THRESHOLD, bands=BANDS):
+    """
+    Group signatures whose estimated Jaccard similarity reaches threshold.
+
+    Parameters:
+    signatures (numpy.ndarray): Output of minhash_signatures
+    threshold (float): Minimum estimated similarity to merge two items
+    bands (int): Number of LSH bands (must divide the signature length)
+
+    Returns:
+    numpy.ndarray: Cluster label per row (the index of a member of the cluster)
+    """
+    n = len(signatures)
+    parent = np.arange(n)
+    if n < 2:
+        return parent
+
+    all_keys = band_keys(signatures, bands)
+    for band in range(bands):
+        keys = all_keys[:, band]
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+
+        # Every member of a bucket is compared with the first one in it
+        new_bucket = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        heads = order[np.maximum.accumulate(np.where(new_bucket, np.arange(n), 0))]
+        candidates = np.flatnonzero(~new_bucket)
+        if len(candidates) == 0:
+            continue
+        members = order[candidates]
+        leaders = heads[candidates]
+        similarity = (signatures[members] == signatures[leaders]).mean(axis=1)
+        for member, leader in zip(members[similarity >= threshold], leaders[similarity >= threshold]):
+            root_a = _find(parent, member)
+            root_b = _find(parent, leader)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    return np.array([_find(parent, i) for i in range(n)])
+
+
+def cluster_titles(titles, threshold=DEFAULT_THRESHOLD):
+    """
+    Cluster raw titles into near-duplicate groups.
+
+    Parameters:
+    titles (list): Video titles
+    threshold (float): Minimum estimated Jaccard similarity
+
+    Returns:
+    numpy.ndarray: Cluster label per title
+    """
+    normalized = [normalize_title(title) or title.lower() for title in titles]
+    return cluster_signatures(minhash_signatures(normalized), threshold)
+
+
+def cluster_videos(videos, threshold=DEFAULT_THRESHOLD):
+    """
+    Collapse near-duplicate videos into one representative per cluster.
+
+    The representative is the most viewed member; it gains 'cluster_size',
+    'cluster_view_count' and 'cluster_members' (video_id -> views). Videos
+    that are already representatives keep their members, so clustering the
+    combined output of several mining runs aggregates without double counting.
+
+    Parameters:
+    videos (list): Video dicts with 'title', 'video_id' and 'view_count'
+    threshold (float): Minimum estimated Jaccard similarity
+
+    Returns:
+    list: Representative video dicts, ordered by aggregated views
+    """
+    if not videos:
+        return []
+
+    labels = cluster_titles([video['title'] for video in videos], threshold)
+
+    clusters = {}
+    for label, video in zip(labels, videos):
+        clusters.setdefault(label, []).append(video)
+
+    representatives = []
+    for members in clusters.values():
+        representative = dict(max(members, key=lambda video: video['view_count']))
+        member_views = {}
+        for video in members:
+            member_views.update(video.get('cluster_members') or {video['video_id']: video['view_count']})
+        representative['cluster_members'] = member_views
+        representative['cluster_size'] = len(member_views)
+        representative['cluster_view_count'] = sum(member_views.values())
+        representatives.append(representative)
+
+    representatives.sort(key=lambda video: video['cluster_view_count'], reverse=True)
+    return representatives
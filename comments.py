@@ -0,0 +1,326 @@
+"""
+Viewer comment sampling for audience-interest signals.
+
+Titles and descriptions say what creators publish; comments say what the
+audience cares about. For the highest-ranked videos, the top comment
+threads (commentThreads().list, 1 quota unit per page) are fetched
+concurrently by a bounded thread pool, under a quota budget shared by all
+workers. Comments are stored per video ID in a SQLite table, so the
+sampling is incremental: a video checked within REFRESH_INTERVAL is not
+fetched again, and a later refresh pages through the newest comments only
+until it reaches the ones already stored. Videos with comments turned
+off are asked about again only after DISABLED_REFRESH_INTERVAL.
+
+The stored comments are then run through the category classifier
+(category_index.py) in one batch and the keyword extractor (categories.py),
+and aggregated per category into
+audience signals for the theme prompt.
+
+Configuration (environment variables):
+    THEMESEEKER_COMMENTS_DB  path of the SQLite database (default: data/comments.sqlite3)
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from categories import GENERAL_CONTEXT, extract_keywords
+from category_index import classify_texts
+from tracing import trace_span, increment_counter
+from youtube_mining import build_youtube
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "comments.sqlite3")
+
+COMMENT_THREADS_QUOTA_COST = 1
+
+DEFAULT_VIDEOS = 20
+DEFAULT_COMMENT_QUOTA = 100
+
+# Threads per page (the API maximum)
+PAGE_SIZE = 100
+
+# Pages read per refresh at most; the first fetch reads one page of top threads
+MAX_REFRESH_PAGES = 3
+
+# Videos checked more recently than this are served from the table
+REFRESH_INTERVAL = 60 * 60
+
+# Videos with comments turned off are checked again only after this long
+DISABLED_REFRESH_INTERVAL = 7 * 24 * 60 * 60
+
+MAX_WORKERS = 8
+
+# Keywords kept per category
+TOP_KEYWORDS = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comment_videos (
+    video_id TEXT PRIMARY KEY,
+    checked_at REAL NOT NULL,
+    newest_at TEXT,
+    disabled INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS comments (
+    comment_id TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    published_at TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_video ON comments (video_id);
+"""
+
+_clients = threading.local()
+
+
+class QuotaBudget:
+    """YouTube quota units left for one enrichment run, shared by the workers."""
+
+    def __init__(self, units):
+        self.remaining = units
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def spend(self, units):
+        """Reserve units; False when the budget does not allow it."""
+        with self._lock:
+            if self.remaining < units:
+                return False
+            self.remaining -= units
+            self.used += units
+            return True
+
+
+def db_path():
+    return os.environ.get("THEMESEEKER_COMMENTS_DB", DEFAULT_DB_PATH)
+
+
+def _connect():
+    path = db_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _youtube(api_key):
+    """One API client per worker thread; the client is not thread-safe."""
+    if getattr(_clients, 'key', None) != api_key:
+        _clients.youtube = build_youtube(api_key)
+        _clients.key = api_key
+    return _clients.youtube
+
+
+def _parse_thread(item):
+    comment = item['snippet']['topLevelComment']
+    snippet = comment['snippet']
+    return {
+        'comment_id': comment['id'],
+        'text': snippet.get('textOriginal') or snippet.get('textDisplay', ''),
+        'like_count': int(snippet.get('likeCount', 0)),
+        'published_at': snippet.get('publishedAt'),
+    }
+
+
+def fetch_new_comments(api_key, video_id, newest_at, budget):
+    """
+    Fetch the comments of a video that are not stored yet.
+
+    The first fetch (newest_at is None) reads one page of the top threads
+    by relevance; a refresh pages through the newest threads until it
+    reaches newest_at. Every page is paid from the shared budget.
+
+    Parameters:
+    api_key (str): YouTube Data API key
+    video_id (str): Video ID
+    newest_at (str): Publish time of the newest stored comment, or None
+    budget (QuotaBudget): Shared quota budget
+
+    Returns:
+    tuple: (list of comment dicts, pages fetched, comments disabled)
+    """
+    youtube = _youtube(api_key)
+    comments = []
+    pages = 0
+    page_token = None
+    max_pages = 1 if newest_at is None else MAX_REFRESH_PAGES
+    while pages < max_pages and budget.spend(COMMENT_THREADS_QUOTA_COST):
+        increment_counter("youtube_quota_units", COMMENT_THREADS_QUOTA_COST, call="commentThreads.list")
+        request = dict(part="snippet", videoId=video_id, maxResults=PAGE_SIZE, textFormat="plainText",
+                       order="relevance" if newest_at is None else "time")
+        if page_token:
+            request['pageToken'] = page_token
+        try:
+            with trace_span("youtube.comment_threads", video=video_id):
+                response = youtube.commentThreads().list(**request).execute()
+        except Exception as e:
+            if "commentsDisabled" in str(e):
+                return comments, pages + 1, True
+            raise
+        pages += 1
+
+        page = [_parse_thread(item) for item in response.get('items', [])]
+        if newest_at is not None:
+            known = [comment for comment in page if (comment['published_at'] or "") <= newest_at]
+            comments.extend(comment for comment in page if (comment['published_at'] or "") > newest_at)
+            if known:
+                break
+        else:
+            comments.extend(page)
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+    return comments, pages, False
+
+
+def _video_states(conn, video_ids):
+    rows = conn.execute(
+        f"SELECT video_id, checked_at, newest_at, disabled FROM comment_videos "
+        f"WHERE video_id IN ({','.join('?' * len(video_ids))})",
+        video_ids,
+    ).fetchall()
+    return {row[0]: {'checked_at': row[1], 'newest_at': row[2], 'disabled': row[3]} for row in rows}
+
+
+def _store(conn, video_id, state, comments, disabled):
+    newest = max((comment['published_at'] or "" for comment in comments), default="")
+    newest_at = max(newest, (state or {}).get('newest_at') or "") or None
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO comments (comment_id, video_id, text, like_count, published_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(c['comment_id'], video_id, c['text'], c['like_count'], c['published_at']) for c in comments],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO comment_videos (video_id, checked_at, newest_at, disabled) VALUES (?, ?, ?, ?)",
+            (video_id, time.time(), newest_at, int(disabled)),
+        )
+
+
+def sample_comments(api_key, videos, max_videos=DEFAULT_VIDEOS, quota_budget=DEFAULT_COMMENT_QUOTA):
+    """
+    Make sure the comments of the highest-ranked videos are stored,
+    fetching only what is missing.
+
+    Parameters:
+    api_key (str): YouTube Data API key
+    videos (list): Video dicts with 'video_id', best ranked first
+    max_videos (int): Number of top videos to sample
+    quota_budget (int): Maximum YouTube quota units to spend
+
+    Returns:
+    dict: Stats with videos sampled, fetched, cached and skipped, new
+          comments, quota used and errors (video ID -> message)
+    """
+    top = [video['video_id'] for video in videos if video.get('video_id')][:max_videos]
+    top = list(dict.fromkeys(top))
+    stats = {'videos': len(top), 'fetched': 0, 'cached': 0, 'skipped': 0, 'new_comments': 0,
+             'quota_used': 0, 'errors': {}}
+    if not top:
+        return stats
+
+    conn = _connect()
+    try:
+        states = _video_states(conn, top)
+        now = time.time()
+        to_fetch = [video_id for video_id in top if video_id not in states or now - states[video_id]['checked_at']
+                    >= (DISABLED_REFRESH_INTERVAL if states[video_id]['disabled'] else REFRESH_INTERVAL)]
+        stats['cached'] = len(top) - len(to_fetch)
+
+        budget = QuotaBudget(quota_budget)
+        if to_fetch:
+            with trace_span("youtube.sample_comments", videos=len(to_fetch)), \
+                    ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(to_fetch))) as executor:
+                futures = {
+                    video_id: executor.submit(fetch_new_comments, api_key, video_id,
+                                              (states.get(video_id) or {}).get('newest_at'), budget)
+                    for video_id in to_fetch
+                }
+                # Results are written from this thread only, in ranking order
+                for video_id, future in futures.items():
+                    try:
+                        comments, pages, disabled = future.result()
+                    except Exception as e:
+                        stats['errors'][video_id] = str(e)
+                        continue
+                    if pages == 0:
+                        # The budget ran out before this video; try again next time
+                        stats['skipped'] += 1
+                        continue
+                    _store(conn, video_id, states.get(video_id), comments, disabled)
+                    stats['fetched'] += 1
+                    stats['new_comments'] += len(comments)
+        stats['quota_used'] = budget.used
+    finally:
+        conn.close()
+    return stats
+
+
+def iter_comments(video_ids):
+    """
+    Stream the stored comments of some videos.
+
+    Yields:
+    tuple: (video ID, text, like count)
+    """
+    if not video_ids:
+        return
+    conn = _connect()
+    try:
+        cursor = conn.execute(
+            f"SELECT video_id, text, like_count FROM comments WHERE video_id IN ({','.join('?' * len(video_ids))})",
+            list(video_ids),
+        )
+        yield from cursor
+    finally:
+        conn.close()
+
+
+def audience_signals(videos, max_videos=DEFAULT_VIDEOS, top_keywords=TOP_KEYWORDS):
+    """
+    Aggregate the stored comments of the top videos per category.
+
+    Each comment is classified on its own; comments that match no category
+    count for the category of their video. Liked comments weigh more
+    (1 + log(1 + likes)).
+
+    Parameters:
+    videos (list): Video dicts with 'video_id' and 'context', best ranked first
+    max_videos (int): Number of top videos to use
+    top_keywords (int): Keywords kept per category
+
+    Returns:
+    list: Dicts with 'category', 'comments', 'likes' and 'keywords', most
+          discussed first
+    """
+    contexts = {}
+    for video in videos:
+        if video.get('video_id') and len(contexts) < max_videos:
+            contexts.setdefault(video['video_id'], video.get('context', GENERAL_CONTEXT))
+
+    stored = list(iter_comments(list(contexts)))
+    categories, _ = classify_texts([text for _, text, _ in stored])
+
+    totals = {}
+    for (video_id, text, like_count), category in zip(stored, categories):
+        if category == GENERAL_CONTEXT:
+            category = contexts.get(video_id, GENERAL_CONTEXT)
+        weight = 1 + math.log1p(like_count)
+        entry = totals.setdefault(category, {'comments': 0, 'likes': 0, 'weight': 0.0, 'keywords': Counter()})
+        entry['comments'] += 1
+        entry['likes'] += like_count
+        entry['weight'] += weight
+        for keyword in extract_keywords(text):
+            entry['keywords'][keyword] += weight
+
+    ranked = sorted(totals.items(), key=lambda item: item[1]['weight'], reverse=True)
+    return [{
+        'category': category,
+        'comments': entry['comments'],
+        'likes': entry['likes'],
+        'keywords': [keyword for keyword, _ in entry['keywords'].most_common(top_keywords)],
+    } for category, entry in ranked]
@@ -0,0 +1,209 @@
+"""
+Gemini context caching for the static prefix of the theme prompt.
+
+The philosophy context and the field instructions are the same for every
+generation call until the context changes, yet they make up most of the
+prompt. With context caching the prefix is registered once with Gemini
+(caching.CachedContent) and later calls only send the short per-call
+request plus the handle of the cached prefix, so Gemini does not process
+the prefix again.
+
+Handles are kept per process, keyed by model and prefix hash, so all
+sessions and age groups share them. The cached content is also given a
+display name derived from the key, so after a restart an existing cache is
+found with CachedContent.list() instead of being created again. A handle
+whose expiry is less than RENEW_FRACTION of the TTL away is renewed
+(CachedContent.update) before use, so a prefix in regular use never
+expires. When caching is disabled, the prefix is too short for the model's
+minimum, or the API refuses (unsupported model, quota, local stand-in
+without the endpoint), the caller falls back to an inline prompt; a refusal
+is remembered for one TTL so the API is not asked again on every call.
+
+Configuration (environment variables):
+    THEMESEEKER_CONTEXT_CACHE             "0" turns context caching off (default: on)
+    THEMESEEKER_CONTEXT_CACHE_TTL         seconds a cached prefix lives after its last renewal (default 3600)
+    THEMESEEKER_CONTEXT_CACHE_MIN_TOKENS  estimated prefix tokens below which no cache is created (default 1024)
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import timedelta, timezone
+
+from google.generativeai import caching
+
+from prompt_builder import estimate_tokens
+from tracing import trace_span, increment_counter
+
+DEFAULT_TTL = 3600
+
+# Gemini refuses to cache less than this (the exact minimum depends on the model)
+DEFAULT_MIN_TOKENS = 1024
+
+# Renew a handle once less than this share of its TTL is left
+RENEW_FRACTION = 0.5
+
+DISPLAY_NAME_PREFIX = "themeseeker-"
+
+_lock = threading.Lock()
+_key_locks = {}
+_handles = {}
+_refused = {}
+
+
+def caching_enabled():
+    return os.environ.get("THEMESEEKER_CONTEXT_CACHE", "1") != "0"
+
+
+def cache_ttl():
+    return int(os.environ.get("THEMESEEKER_CONTEXT_CACHE_TTL", DEFAULT_TTL))
+
+
+def min_tokens():
+    return int(os.environ.get("THEMESEEKER_CONTEXT_CACHE_MIN_TOKENS", DEFAULT_MIN_TOKENS))
+
+
+def prefix_key(model_name, prefix):
+    """Key of a cached prefix: hash of the model and the prefix text."""
+    return hashlib.sha256(f"{model_name}\n{prefix}".encode("utf-8")).hexdigest()
+
+
+def _key_lock(key):
+    with _lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _expire_seconds(cached):
+    """Unix time at which a CachedContent expires."""
+    expire_time = cached.expire_time
+    if expire_time.tzinfo is None:
+        expire_time = expire_time.replace(tzinfo=timezone.utc)
+    return expire_time.timestamp()
+
+
+def _find_existing(display_name):
+    """A live cache with this display name, created by an earlier process."""
+    for cached in caching.CachedContent.list(page_size=100):
+        if cached.display_name == display_name and _expire_seconds(cached) > time.time():
+            return cached
+    return None
+
+
+def _register(model_name, prefix, key):
+    """Find or create the cache of a prefix; returns a handle dict."""
+    display_name = DISPLAY_NAME_PREFIX + key[:32]
+    cached = _find_existing(display_name)
+    result = "found"
+    if cached is None:
+        with trace_span("gemini.cache_create", model=model_name, tokens=estimate_tokens(prefix)):
+            cached = caching.CachedContent.create(
+                model=model_name,
+                display_name=display_name,
+                contents=[prefix],
+                ttl=timedelta(seconds=cache_ttl()),
+            )
+        result = "created"
+    increment_counter("gemini_context_cache", result=result)
+    return {
+        'content': cached,
+        'name': cached.name,
+        'model': model_name,
+        'expires_at': _expire_seconds(cached),
+        'tokens': getattr(cached.usage_metadata, 'total_token_count', None) or estimate_tokens(prefix),
+        'uses': 0,
+    }
+
+
+def _renew(handle):
+    """Push the expiry of a handle one TTL ahead; False when the cache is gone."""
+    try:
+        with trace_span("gemini.cache_renew", model=handle['model']):
+            handle['content'].update(ttl=timedelta(seconds=cache_ttl()))
+    except Exception as e:
+        print(f"Could not renew cached context {handle['name']}: {e}")
+        return False
+    handle['expires_at'] = _expire_seconds(handle['content'])
+    increment_counter("gemini_context_cache", result="renewed")
+    return True
+
+
+def cached_prefix(model_name, prefix):
+    """
+    The cached content holding a prompt prefix, registering or renewing it
+    as needed.
+
+    Parameters:
+    model_name (str): Gemini model name
+    prefix (str): Static prompt prefix
+
+    Returns:
+    caching.CachedContent: The cached prefix, or None when the prompt must
+                           be sent inline
+    """
+    if not caching_enabled() or estimate_tokens(prefix) < min_tokens():
+        return None
+    key = prefix_key(model_name, prefix)
+    with _key_lock(key):
+        if _refused.get(key, 0) > time.time():
+            return None
+        handle = _handles.get(key)
+        if handle is not None and handle['expires_at'] - time.time() < cache_ttl() * RENEW_FRACTION:
+            if not _renew(handle):
+                handle = None
+        if handle is None:
+            try:
+                handle = _register(model_name, prefix, key)
+            except Exception as e:
+                print(f"Context caching unavailable, sending the prompt inline: {e}")
+                increment_counter("gemini_context_cache", result="unavailable")
+                _refused[key] = time.time() + cache_ttl()
+                _handles.pop(key, None)
+                return None
+            _handles[key] = handle
+        else:
+            increment_counter("gemini_context_cache", result="hit")
+        handle['uses'] += 1
+        return handle['content']
+
+
+def forget_handle(name):
+    """
+    Drop a handle that the API no longer accepts (e.g. deleted or expired
+    early), so the next call registers the prefix again.
+    """
+    with _lock:
+        for key, handle in list(_handles.items()):
+            if handle['name'] == name:
+                del _handles[key]
+
+
+def context_cache_stats():
+    """
+    Describe the cached prefixes known to this process.
+
+    Returns:
+    list: Dicts with 'name', 'model', 'tokens', 'uses' and 'expires_in' (seconds)
+    """
+    now = time.time()
+    with _lock:
+        handles = list(_handles.values())
+    return [{
+        'name': handle['name'],
+        'model': handle['model'],
+        'tokens': handle['tokens'],
+        'uses': handle['uses'],
+        'expires_in': max(int(handle['expires_at'] - now), 0),
+    } for handle in handles]
+
+
+def clear_context_caches():
+    """Delete the cached prefixes of this process from Gemini and forget them."""
+    with _lock:
+        handles = list(_handles.values())
+        _handles.clear()
+        _refused.clear()
+    for handle in handles:
+        try:
+            handle['content'].delete()
+        except Exception as e:
+            print(f"Could not delete cached context {handle['name']}: {e}")
@@ -0,0 +1,188 @@
+"""
+On-disk cache of rendered theme documents.
+
+Rendered files are stored under a key derived from everything that
+determines their bytes: the theme content, the language, the output
+format, the title the image was chosen from, the date line and
+TEMPLATE_VERSION (bump it whenever a renderer's layout changes). Repeated
+downloads and ZIP exports of already built themes are then served from
+disk without laying out the document or fetching its image again.
+
+The cache is bounded by total size with least-recently-used eviction
+(a file's modification time is refreshed on every hit). Hits and misses
+are counted for the diagnostics panel and the /metrics endpoint.
+
+Configuration (environment variables):
+    THEMESEEKER_DOCUMENT_CACHE     cache folder (default: data/document_cache/)
+    THEMESEEKER_DOCUMENT_CACHE_MB  maximum total size in MB (default: 200)
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from tracing import increment_counter
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "document_cache")
+
+DEFAULT_MAX_MB = 200
+
+# Part of every key; bump when the layout of any renderer changes
+TEMPLATE_VERSION = 1
+
+_lock = threading.Lock()
+_sizes = None
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def cache_dir():
+    return os.environ.get("THEMESEEKER_DOCUMENT_CACHE", DEFAULT_CACHE_DIR)
+
+
+def max_cache_bytes():
+    return int(float(os.environ.get("THEMESEEKER_DOCUMENT_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+def document_key(theme, language, output_format, date, image_title=None):
+    """
+    Build the cache key of a rendered document.
+
+    Parameters:
+    theme (Theme): The theme
+    language (str): "english" or "portuguese"
+    output_format (str): Renderer name, e.g. "docx"
+    date (str): The document's date line
+    image_title (str): Title the image is chosen from (default: the theme's)
+
+    Returns:
+    str: Hex key
+    """
+    # The PDF font changes the rendered bytes too
+    font = os.environ.get("THEMESEEKER_PDF_FONT", "") if output_format == "pdf" else ""
+    material = json.dumps(
+        [theme.content_dict(), language, output_format, date, image_title or theme.title, font, TEMPLATE_VERSION],
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    return os.path.join(cache_dir(), key[:2], key)
+
+
+def _load_sizes():
+    """Scan the cache folder once per process to learn the stored sizes."""
+    global _sizes
+    if _sizes is None:
+        _sizes = {}
+        for root, _, files in os.walk(cache_dir()):
+            for name in files:
+                if not name.endswith(".tmp"):
+                    try:
+                        _sizes[name] = os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+    return _sizes
+
+
+def get_document(key, record=True):
+    """
+    Return cached document bytes, or None on a miss.
+
+    Parameters:
+    key (str): Output of document_key()
+    record (bool): Count the lookup in the hit/miss statistics
+
+    Returns:
+    bytes: The document, or None
+    """
+    path = _path(key)
+    try:
+        with open(path, "rb") as document_file:
+            data = document_file.read()
+        # Mark as recently used
+        os.utime(path)
+    except OSError:
+        data = None
+    if record:
+        hit = data is not None
+        with _lock:
+            _stats['hits' if hit else 'misses'] += 1
+        increment_counter("document_cache", result="hit" if hit else "miss")
+    return data
+
+
+def _evict(sizes, limit):
+    """Delete least recently used documents until the cache fits in limit."""
+    total = sum(sizes.values())
+    if total <= limit:
+        return
+    entries = []
+    for key in sizes:
+        try:
+            entries.append((os.path.getmtime(_path(key)), key))
+        except OSError:
+            entries.append((0, key))
+    for _, key in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(_path(key))
+        except OSError:
+            pass
+        total -= sizes.pop(key)
+        _stats['evictions'] += 1
+        increment_counter("document_cache", result="eviction")
+
+
+def put_document(key, data):
+    """
+    Store document bytes, evicting the least recently used documents when
+    the cache grows beyond its size limit. Write errors are only logged.
+
+    Parameters:
+    key (str): Output of document_key()
+    data (bytes): The rendered document
+    """
+    path = _path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as document_file:
+            document_file.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not cache document: {str(e)}")
+        return
+    with _lock:
+        sizes = _load_sizes()
+        sizes[key] = len(data)
+        _evict(sizes, max_cache_bytes())
+
+
+def clear_cache():
+    """Delete every cached document and reset the statistics."""
+    global _sizes
+    with _lock:
+        shutil.rmtree(cache_dir(), ignore_errors=True)
+        _sizes = None
+        _stats.update(hits=0, misses=0, evictions=0)
+
+
+def cache_stats():
+    """
+    Hit/miss statistics of this process and the current cache size.
+
+    Returns:
+    dict: hits, misses, hit_rate, evictions, documents and megabytes
+    """
+    with _lock:
+        sizes = _load_sizes()
+        stats = dict(_stats)
+        stats['documents'] = len(sizes)
+        stats['megabytes'] = round(sum(sizes.values()) / (1024 * 1024), 2)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
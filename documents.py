@@ -0,0 +1,329 @@
+"""
+Theme documents.
+
+A theme is laid out once as a ThemeDocument (title, date, teaser,
+paragraphs, image, footer) and then rendered by any of the backends in
+renderers.py (Word, PDF, HTML), so exporting several formats reuses the
+parsed text and the image instead of rebuilding them per format.
+
+Rendered files are kept in the document cache (document_cache.py), so a
+theme that was already built is served from disk without laying it out
+or fetching its image again.
+"""
+import io
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+
+from document_cache import document_key, get_document, put_document
+from images import theme_image
+from locales import SOURCE_LANGUAGE, format_month_year, locale, ui_label
+from renderers import FORMATS
+from tracing import trace_span, traced
+
+FOOTER_TEXT = "ROSACRUZ ÁUREA | LECTORIUM ROSICRUCIANUM"
+
+# Default text if a theme has no full_text
+DEFAULT_FULL_TEXT = {
+    'english': """The algorithm of your soul is the invisible pattern that shapes your thoughts, behaviors, and perceptions. Just as digital algorithms influence what you see online, internal algorithms determine how you experience life.""",
+    'portuguese': """O algoritmo da sua alma é o padrão invisível que molda seus pensamentos, comportamentos e percepções. Assim como os algoritmos digitais influenciam o que você vê online, os algoritmos internos determinam como você experimenta a vida.""",
+}
+
+
+@dataclass
+class ThemeDocument:
+    """Format-independent layout of one theme document."""
+    title: str
+    date: str
+    teaser: str
+    paragraphs: list
+    image: bytes = None
+    footer: str = FOOTER_TEXT
+    language: str = "english"
+
+
+def document_date(language, now=None):
+    """
+    The document date line: current month and year as written in the
+    document's language (see locales.py), uppercase.
+    """
+    return format_month_year(language, now or datetime.now()).upper()
+
+
+def text_paragraphs(full_text):
+    """
+    Split a theme's full text into paragraphs, skipping any that look like
+    outline points.
+    """
+    paragraphs = []
+    for paragraph in re.split(r'\n\s*\n', full_text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if re.match(r'^[-•*]\s', paragraph) or re.match(r'^\d+\.\s', paragraph):
+            continue
+        paragraphs.append(paragraph)
+    return paragraphs
+
+
+@traced("document.build")
+def build_theme_document(theme, language="english", image=None):
+    """
+    Lay out a theme as a ThemeDocument.
+
+    Parameters:
+    theme (Theme): The theme to lay out
+    language (str): Language name, e.g. "english" or "portuguese"
+    image (bytes): Image to use; looked up with theme_image() when None
+
+    Returns:
+    ThemeDocument: The document, ready for any renderer
+    """
+    if image is None:
+        # Same theme, same image: curated library, then download cache, then network
+        try:
+            image = theme_image(theme.title)
+        except Exception as e:
+            # If image acquisition fails, log and continue without an image
+            print(f"Image generation failed: {str(e)}")
+
+    title = theme.title or ui_label(language, 'document_title')
+    full_text = theme.full_text or DEFAULT_FULL_TEXT.get(language, DEFAULT_FULL_TEXT['english'])
+
+    return ThemeDocument(
+        title=title,
+        date=document_date(language),
+        teaser=theme.teaser,
+        paragraphs=text_paragraphs(full_text),
+        image=image,
+        language=language,
+    )
+
+
+def build_multilingual_documents(english_theme, translations):
+    """
+    Lay out a theme in English and its translations with one shared image,
+    looked up from the English title, so all languages need a single image
+    fetch.
+
+    Parameters:
+    english_theme (Theme): The theme in English
+    translations (list): (language, translated Theme) tuples
+
+    Returns:
+    list: ThemeDocuments, English first, then one per translation
+    """
+    english = build_theme_document(english_theme, SOURCE_LANGUAGE)
+    # b"" (no image) keeps a failed lookup from being retried for the translations
+    return [english] + [build_theme_document(theme, language, image=english.image or b"")
+                        for language, theme in translations]
+
+
+def cached_documents(theme, language, formats=("docx",), image_title=None, layout=None):
+    """
+    Render a theme in several formats, serving each file from the document
+    cache when possible. The theme is laid out (and its image looked up)
+    only if some format is missing from the cache. Documents without an
+    image (the lookup failed) are rendered but not cached.
+
+    Parameters:
+    theme (Theme): The theme to render
+    language (str): Language name, e.g. "english" or "portuguese"
+    formats (tuple): Names of the output formats
+    image_title (str): Title the image is chosen from (default: the theme's
+                       own), part of the cache key
+    layout (callable): Optional layout() -> ThemeDocument used on a miss
+                       (default: build_theme_document(theme, language))
+
+    Returns:
+    list: (output format, cache key, bytes) tuples, in the order of formats
+    """
+    date = document_date(language)
+    # An English document exported alone or with its translations is one entry
+    image_title = image_title or theme.title
+    keys = {output_format: document_key(theme, language, output_format, date, image_title) for output_format in formats}
+    files = {output_format: get_document(key) for output_format, key in keys.items()}
+
+    missing = [output_format for output_format, data in files.items() if data is None]
+    if missing:
+        document = layout() if layout else build_theme_document(theme, language)
+        for output_format in missing:
+            files[output_format] = render_document(document, output_format)
+            # A document whose image lookup failed is not cached, so the image is tried again next time
+            if document.image:
+                put_document(keys[output_format], files[output_format])
+
+    return [(output_format, keys[output_format], files[output_format]) for output_format in formats]
+
+
+def cached_multilingual_documents(english_theme, translations, formats=("docx",)):
+    """
+    Render a theme in English and its translations through the document
+    cache. Like build_multilingual_documents(), all languages use the image
+    of the English title, which is looked up at most once.
+
+    Parameters:
+    english_theme (Theme): The theme in English
+    translations (list): (language, translated Theme) tuples
+    formats (tuple): Names of the output formats
+
+    Returns:
+    list: (language, output format, cache key, bytes) tuples
+    """
+    built = {}
+
+    def english_layout():
+        built['english'] = build_theme_document(english_theme, SOURCE_LANGUAGE)
+        return built['english']
+
+    def translated_layout(theme, language):
+        def layout():
+            english = built.get('english') or english_layout()
+            return build_theme_document(theme, language, image=english.image or b"")
+        return layout
+
+    files = []
+    layouts = [(SOURCE_LANGUAGE, english_theme, english_layout)] + [
+        (language, theme, translated_layout(theme, language)) for language, theme in translations]
+    for language, theme, layout in layouts:
+        for output_format, key, data in cached_documents(theme, language, formats, english_theme.title, layout):
+            files.append((language, output_format, key, data))
+    return files
+
+
+def render_document(document, output_format="docx"):
+    """
+    Render a ThemeDocument in one of the FORMATS.
+
+    Parameters:
+    document (ThemeDocument): The document
+    output_format (str): Name of the backend, e.g. "docx", "pdf" or "html"
+
+    Returns:
+    bytes: The rendered file
+    """
+    with trace_span("document.render", format=output_format):
+        return FORMATS[output_format]['render'](document)
+
+
+@traced("create_document")
+def create_theme_document_with_language_option(theme, gemini_api_key, language="english"):
+    """
+    Creates a formatted Word document with the theme content in the selected language.
+
+    Parameters:
+    theme (Theme): The theme to render
+    gemini_api_key (str): API key for Gemini used for image generation
+    language (str): Language name, e.g. "english" or "portuguese"
+
+    Returns:
+    BytesIO: A BytesIO object containing the generated Word document
+    """
+    [(_, _, data)] = cached_documents(theme, language, ("docx",))
+    return io.BytesIO(data)
+
+
+def zip_filename(language):
+    """File name of the ZIP with the documents of one language, or of all ("all")."""
+    return f"lecture_themes_{language}_{datetime.now().strftime('%Y%m%d')}.zip"
+
+
+def document_filename(title, language, output_format="docx"):
+    """
+    Build a safe file name from a theme title.
+
+    Parameters:
+    title (str): Theme title as shown to the user
+    language (str): Language name, which sets the suffix (none for English)
+    output_format (str): Name of the backend, which sets the extension
+
+    Returns:
+    str: File name with language suffix and date
+    """
+    safe_title = re.sub(r'[^\w\-_\. ]', '', title)
+    safe_title = safe_title.replace(' ', '_')
+    lang_suffix = locale(language)['suffix']
+    extension = FORMATS[output_format]['extension']
+    return f"{safe_title}{lang_suffix}_{datetime.now().strftime('%Y%m%d')}.{extension}"
+
+
+@traced("create_zip")
+def create_multilingual_zip(selected_themes, gemini_api_key, progress=None, formats=("docx",), output=None):
+    """
+    Create the English and translated documents of several themes in one
+    pass and pack them in a single ZIP file. All documents of a theme share
+    one image, come from the document cache when already built and are
+    named after the English title, with a language suffix (e.g. "_pt") for
+    the translations.
+
+    Parameters:
+    selected_themes (list): (title, English Theme, [(language, translated Theme), ...]) tuples
+    gemini_api_key (str): API key for Gemini
+    progress (callable): Optional progress(done, total) called after each theme
+    formats (tuple): Names of the output formats
+    output (str): Path of the ZIP file to write (default: an in-memory BytesIO)
+
+    Returns:
+    tuple: (output path or BytesIO with the ZIP, number of themes exported, titles that failed)
+    """
+    zip_buffer = output or io.BytesIO()
+    success_count = 0
+    error_docs = []
+
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for selected_option, english_theme, translations in selected_themes:
+            try:
+                for language, output_format, _, data in cached_multilingual_documents(
+                        english_theme, translations, formats):
+                    zip_file.writestr(document_filename(selected_option, language, output_format), data)
+                success_count += 1
+            except Exception as e:
+                print(f"Error creating documents for '{selected_option}': {str(e)}")
+                error_docs.append(selected_option)
+            if progress:
+                progress(success_count + len(error_docs), len(selected_themes))
+
+    if not output:
+        zip_buffer.seek(0)
+    return zip_buffer, success_count, error_docs
+
+
+@traced("create_zip")
+def create_documents_zip(selected_themes, gemini_api_key, language="english", progress=None, formats=("docx",),
+                         output=None):
+    """
+    Create the documents of several themes and pack them in a ZIP file.
+    Each theme is laid out once and rendered in every requested format;
+    files already in the document cache are reused.
+
+    Parameters:
+    selected_themes (list): (title, Theme) tuples
+    gemini_api_key (str): API key for Gemini
+    language (str): "english" or "portuguese"
+    progress (callable): Optional progress(done, total) called after each theme
+    formats (tuple): Names of the output formats
+    output (str): Path of the ZIP file to write (default: an in-memory BytesIO)
+
+    Returns:
+    tuple: (output path or BytesIO with the ZIP, number of themes exported, titles that failed)
+    """
+    zip_buffer = output or io.BytesIO()
+    success_count = 0
+    error_docs = []
+
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for selected_option, selected_theme in selected_themes:
+            try:
+                for output_format, _, data in cached_documents(selected_theme, language, formats):
+                    zip_file.writestr(document_filename(selected_option, language, output_format), data)
+                success_count += 1
+            except Exception as e:
+                print(f"Error creating document for '{selected_option}': {str(e)}")
+                error_docs.append(selected_option)
+            if progress:
+                progress(success_count + len(error_docs), len(selected_themes))
+
+    if not output:
+        zip_buffer.seek(0)
+    return zip_buffer, success_count, error_docs
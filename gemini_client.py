@@ -0,0 +1,99 @@
+"""
+Gemini client setup shared by theme generation and translation.
+"""
+import os
+
+import google.generativeai as genai
+
+from themes import THEME_RESPONSE_SCHEMA
+from tracing import traced
+
+
+def configure_gemini(api_key):
+    """
+    Configure the Gemini SDK. When GEMINI_API_ENDPOINT is set (e.g. to a
+    local stand-in server for benchmarks), the REST transport is pointed at it.
+
+    Parameters:
+    api_key (str): Gemini API key
+    """
+    endpoint = os.environ.get("GEMINI_API_ENDPOINT")
+    if endpoint:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+    else:
+        genai.configure(api_key=api_key)
+
+
+@traced("gemini.list_models")
+def select_gemini_model():
+    try:
+        models = genai.list_models()
+        # Try to find gemini-2.0-flash or the best available model
+        gemini_model = None
+        for model_name in [m.name for m in models]:
+            if 'gemini-2.0-flash' in model_name:
+                gemini_model = model_name
+                break
+        if not gemini_model:
+            for model_name in [m.name for m in models]:
+                if 'gemini' in model_name:
+                    gemini_model = model_name
+                    break
+        if not gemini_model:
+            gemini_model = 'gemini-2.0-flash'  # Default fallback
+    except:
+        gemini_model = 'gemini-2.0-flash'  # Default if we can't list models
+    return gemini_model
+
+
+def theme_generation_config():
+    """Generation settings that constrain responses to a JSON array of theme objects."""
+    return genai.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=THEME_RESPONSE_SCHEMA
+    )
+
+
+def theme_json_model(model_name, cached_content=None):
+    """
+    Create a model whose responses are constrained to a JSON array of
+    theme objects.
+
+    Parameters:
+    model_name (str): Gemini model name
+    cached_content (caching.CachedContent): Optional cached prompt prefix
+                                            (see context_cache.py) that
+                                            every request continues
+
+    Returns:
+    genai.GenerativeModel: The configured model
+    """
+    if cached_content:
+        return genai.GenerativeModel.from_cached_content(
+            cached_content=cached_content,
+            generation_config=theme_generation_config()
+        )
+    return genai.GenerativeModel(
+        model_name,
+        generation_config=theme_generation_config()
+    )
+
+
+def translation_json_model(model_name):
+    """
+    Create a model whose responses are constrained to a JSON array of
+    strings, one translated segment each (see translation.py).
+
+    Parameters:
+    model_name (str): Gemini model name
+
+    Returns:
+    genai.GenerativeModel: The configured model
+    """
+    return genai.GenerativeModel(
+        model_name,
+        generation_config=genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema={"type": "ARRAY", "items": {"type": "STRING"}}
+        )
+    )
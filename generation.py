@@ -0,0 +1,82 @@
+"""
+Lecture theme generation with Gemini. Translation is in translation.py.
+"""
+from context_cache import cached_prefix, forget_handle
+from gemini_client import configure_gemini, select_gemini_model, theme_json_model
+from json_extract import parse_themes_response
+from prompt_builder import (build_theme_prompt, build_prefixed_theme_prompt, log_token_usage, DEFAULT_TOKEN_BUDGET,
+                            THEME_COUNT)
+from themes import themes_from_dicts, assign_theme_ids
+from tracing import trace_span, traced
+
+
+@traced("generate_themes")
+def generate_themes(api_key, video_data, age_group, philosophy_context="", token_budget=DEFAULT_TOKEN_BUDGET,
+                    audience_signals=None, theme_count=THEME_COUNT, avoid_titles=None, channel_summary=None):
+    """
+    Generate lecture themes using Gemini API with structured JSON output.
+    With a philosophy context, the static prompt prefix is sent as Gemini
+    cached content when possible (see context_cache.py) and inline
+    otherwise. API errors are raised to the caller.
+    
+    Parameters:
+    api_key (str): Gemini API key
+    video_data (list): List of dicts containing video title and context
+    age_group (str): Target age group (e.g., "20-30", "30-40", etc.)
+    philosophy_context (str): Cleaned philosophy text, may be empty
+    token_budget (int): Maximum estimated prompt tokens
+    audience_signals (list): Optional comment signals per category (see comments.py)
+    theme_count (int): Number of themes to ask for
+    avoid_titles (list): Optional titles of earlier themes not to repeat
+    channel_summary (list): Optional channel shares per category (see channels.py)
+    
+    Returns:
+    tuple: (list of Theme objects, raw response text, prompt stats)
+    """
+    # Configure the Gemini API
+    configure_gemini(api_key)
+    
+    # Initialize with the appropriate model
+    gemini_model = select_gemini_model()
+    
+    # Reuse the cached philosophy context and instructions when Gemini allows it
+    response = None
+    prefix_cached = False
+    if philosophy_context:
+        with trace_span("prompt.build"):
+            prefix, request, prompt_stats = build_prefixed_theme_prompt(
+                video_data, age_group, philosophy_context, token_budget, audience_signals, theme_count, avoid_titles,
+                channel_summary)
+        cached = cached_prefix(gemini_model, prefix)
+        if cached is not None:
+            try:
+                with trace_span("gemini.generate", model=gemini_model, cached_prefix=True):
+                    response = theme_json_model(gemini_model, cached).generate_content(request)
+                prefix_cached = True
+            except Exception as e:
+                # The cache may have been deleted or expired early; retry inline
+                print(f"Generation with cached context failed, sending the prompt inline: {e}")
+                forget_handle(cached.name)
+    
+    if response is None:
+        # Build a deduplicated, category-grouped prompt within the token budget
+        with trace_span("prompt.build"):
+            prompt, prompt_stats = build_theme_prompt(video_data, age_group, philosophy_context, token_budget,
+                                                      audience_signals, theme_count, avoid_titles, channel_summary)
+        
+        # Constrain the response to a JSON array of theme objects
+        with trace_span("gemini.generate", model=gemini_model, cached_prefix=False):
+            response = theme_json_model(gemini_model).generate_content(prompt)
+    
+    prompt_stats['cached_prefix'] = prefix_cached
+    prompt_stats.update(log_token_usage("generate_themes", response, prompt_stats['estimated_tokens']))
+    
+    # Extract the text from the response
+    raw_response = response.text
+    
+    # The schema guarantees valid JSON; the extractor is kept as a safety net
+    with trace_span("themes.parse"):
+        themes = assign_theme_ids(themes_from_dicts(parse_themes_response(raw_response)))
+    
+    return themes, raw_response, prompt_stats
+
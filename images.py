@@ -0,0 +1,322 @@
+"""
+Image selection for theme documents.
+
+The image query is derived deterministically from the theme title, so the
+same theme always asks for the same image. Images are then looked up in
+three tiers:
+
+1. the curated local library (image_library/), indexed by keyword, so
+   documents can be built offline and without waiting on the network;
+2. the disk cache of previously downloaded images (data/image_cache/);
+3. the image search endpoint, whose result is stored in the disk cache.
+
+The download cache is bounded by total size with least-recently-used
+eviction (a file's modification time is refreshed on every hit), like the
+document cache.
+
+Configuration (environment variables):
+    THEMESEEKER_IMAGE_LIBRARY   curated library folder (default: image_library/)
+    THEMESEEKER_IMAGE_CACHE     download cache folder (default: data/image_cache/)
+    THEMESEEKER_IMAGE_CACHE_MB  maximum total size of the download cache in MB (default: 100)
+    THEMESEEKER_IMAGE_URL       image search URL with a {query} placeholder
+
+Usage (fill the library with one image per spiritual keyword while online):
+    python images.py --build-library [images_per_keyword]
+"""
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from io import BytesIO
+
+import requests
+from PIL import Image
+
+from tracing import trace_span, increment_counter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LIBRARY_DIR = os.path.join(BASE_DIR, "image_library")
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, "data", "image_cache")
+
+DEFAULT_CACHE_MB = 100
+
+# Image search URL; THEMESEEKER_IMAGE_URL overrides it (e.g. a local stand-in)
+IMAGE_SOURCE_URL = "https://source.unsplash.com/1200x600/?{query}"
+
+# Formats python-docx can embed as they are
+LIBRARY_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp")
+
+# Seconds before the library folder is scanned again for added images
+LIBRARY_RESCAN_INTERVAL = 60
+
+FETCH_TIMEOUT = 15
+JPEG_QUALITY = 85
+
+STOP_WORDS = {'the', 'and', 'of', 'in', 'to', 'a', 'is', 'that', 'it', 'with', 'as', 'for',
+              'o', 'os', 'de', 'da', 'do', 'das', 'dos', 'em', 'no', 'na', 'um', 'uma'}
+
+# Spiritual keywords added to the query for better image results
+SPIRITUAL_KEYWORDS = [
+    "spiritual", "meditation", "abstract", "enlightenment", "mindfulness", "consciousness",
+    "sacred", "divine", "cosmic", "transcendence", "wisdom", "harmony", "balance",
+    "serenity", "energy", "light", "nature", "universe", "soul", "spirit"
+]
+
+_library_lock = threading.Lock()
+_library_index = {}
+_library_scanned = (None, 0.0)
+
+_cache_lock = threading.Lock()
+_cache_sizes = None
+
+
+def _seed(text):
+    return int.from_bytes(hashlib.sha1(text.strip().lower().encode("utf-8")).digest()[:8], "big")
+
+
+def image_keywords(title):
+    """
+    Derive the image keywords for a theme title: up to two meaningful words
+    of the title followed by spiritual keywords picked with a seed taken
+    from the title, so the result is the same on every call.
+
+    Parameters:
+    title (str): Theme title
+
+    Returns:
+    list: Keywords, most specific first
+    """
+    title_words = title.lower().replace('-', ' ').split()
+    key_words = [word.strip(".,:;!?\"'()") for word in title_words]
+    key_words = [word for word in key_words if word not in STOP_WORDS and len(word) > 3]
+
+    selected = random.Random(_seed(title)).sample(SPIRITUAL_KEYWORDS, 3)
+    if key_words:
+        # Prioritize the title and add just two spiritual keywords
+        return key_words[:2] + selected[:2]
+    return selected
+
+
+def image_query(keywords):
+    """Format keywords as an image search query ('+' separated)."""
+    words = " ".join(keywords + ["abstract", "art"]).split()
+    return "+".join(dict.fromkeys(words))
+
+
+def _library_dir():
+    return os.environ.get("THEMESEEKER_IMAGE_LIBRARY", DEFAULT_LIBRARY_DIR)
+
+
+def _cache_dir():
+    return os.environ.get("THEMESEEKER_IMAGE_CACHE", DEFAULT_CACHE_DIR)
+
+
+def _max_cache_bytes():
+    return int(float(os.environ.get("THEMESEEKER_IMAGE_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 * 1024)
+
+
+def _scan_library(library_dir):
+    """
+    Index the library by keyword. An image belongs to a keyword when it
+    sits in a folder named after it (library/meditation/*.jpg) or when the
+    file name starts with it (library/meditation-2.jpg).
+    """
+    index = {}
+    for root, _, files in os.walk(library_dir):
+        folder = os.path.relpath(root, library_dir)
+        for name in files:
+            stem, extension = os.path.splitext(name)
+            if extension.lower() not in LIBRARY_EXTENSIONS:
+                continue
+            keyword = folder.split(os.sep)[0] if folder != "." else stem.split("-")[0]
+            index.setdefault(keyword.lower(), []).append(os.path.join(root, name))
+    for paths in index.values():
+        paths.sort()
+    return index
+
+
+def library_index():
+    """
+    Return the keyword index of the curated library, rescanned at most
+    every LIBRARY_RESCAN_INTERVAL seconds.
+
+    Returns:
+    dict: keyword -> sorted list of image paths
+    """
+    global _library_index, _library_scanned
+    library_dir = _library_dir()
+    with _library_lock:
+        scanned_dir, scanned_at = _library_scanned
+        if scanned_dir != library_dir or time.time() - scanned_at > LIBRARY_RESCAN_INTERVAL:
+            _library_index = _scan_library(library_dir) if os.path.isdir(library_dir) else {}
+            _library_scanned = (library_dir, time.time())
+        return _library_index
+
+
+def _from_library(keywords, title):
+    index = library_index()
+    for keyword in keywords:
+        paths = index.get(keyword)
+        if paths:
+            # Same title, same picture
+            path = paths[_seed(title) % len(paths)]
+            with open(path, "rb") as image_file:
+                return image_file.read()
+    return None
+
+
+def _cache_path(query):
+    return os.path.join(_cache_dir(), hashlib.sha1(query.encode("utf-8")).hexdigest() + ".jpg")
+
+
+def _from_cache(query):
+    path = _cache_path(query)
+    try:
+        with open(path, "rb") as image_file:
+            image = image_file.read()
+        # Mark as recently used
+        os.utime(path)
+        return image
+    except OSError:
+        return None
+
+
+def _load_cache_sizes():
+    """Scan the cache folder once per process to learn the stored sizes."""
+    global _cache_sizes
+    if _cache_sizes is None:
+        _cache_sizes = {}
+        try:
+            entries = list(os.scandir(_cache_dir()))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if entry.name.endswith(".jpg"):
+                try:
+                    _cache_sizes[entry.name] = entry.stat().st_size
+                except OSError:
+                    pass
+    return _cache_sizes
+
+
+def _evict_cache(sizes, limit):
+    """Delete least recently used images until the cache fits in limit."""
+    total = sum(sizes.values())
+    if total <= limit:
+        return
+    entries = []
+    for name in sizes:
+        try:
+            entries.append((os.path.getmtime(os.path.join(_cache_dir(), name)), name))
+        except OSError:
+            entries.append((0, name))
+    for _, name in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(os.path.join(_cache_dir(), name))
+        except OSError:
+            pass
+        total -= sizes.pop(name)
+        increment_counter("image_cache", result="eviction")
+
+
+def _store_in_cache(query, image):
+    """Store a downloaded image, evicting the least recently used ones beyond the size limit."""
+    path = _cache_path(query)
+    try:
+        _write_atomic(path, image)
+    except OSError as e:
+        print(f"Could not cache image: {str(e)}")
+        return
+    with _cache_lock:
+        sizes = _load_cache_sizes()
+        sizes[os.path.basename(path)] = len(image)
+        _evict_cache(sizes, _max_cache_bytes())
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so a concurrent reader never sees a partial file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as image_file:
+        image_file.write(data)
+    os.replace(tmp_path, path)
+
+
+def fetch_image(query):
+    """
+    Download an image for a query and return it re-encoded as JPEG.
+    Errors are raised to the caller.
+    """
+    image_url = os.environ.get("THEMESEEKER_IMAGE_URL", IMAGE_SOURCE_URL).format(query=query)
+    response = requests.get(image_url, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    img = Image.open(BytesIO(response.content)).convert("RGB")
+    buffer = BytesIO()
+    img.save(buffer, "JPEG", quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+def theme_image(title):
+    """
+    Find the image for a theme: curated library first, then the download
+    cache, then the network (the download is cached for next time).
+    Download errors are raised to the caller.
+
+    Parameters:
+    title (str): Theme title
+
+    Returns:
+    bytes: Image data
+    """
+    keywords = image_keywords(title)
+
+    with trace_span("image.library"):
+        image = _from_library(keywords, title)
+    if image is not None:
+        increment_counter("image_lookups", tier="library")
+        return image
+
+    query = image_query(keywords)
+    image = _from_cache(query)
+    if image is not None:
+        increment_counter("image_lookups", tier="cache")
+        return image
+
+    increment_counter("image_lookups", tier="fetch")
+    with trace_span("image.fetch"):
+        image = fetch_image(query)
+    _store_in_cache(query, image)
+    return image
+
+
+def build_library(per_keyword=1):
+    """
+    Download images for every spiritual keyword into the curated library,
+    so documents can be built offline afterwards. Existing files are kept.
+
+    Parameters:
+    per_keyword (int): Images to keep per keyword
+    """
+    library_dir = _library_dir()
+    for keyword in SPIRITUAL_KEYWORDS:
+        for i in range(1, per_keyword + 1):
+            path = os.path.join(library_dir, keyword, f"{keyword}-{i}.jpg")
+            if os.path.exists(path):
+                continue
+            try:
+                # A different query per slot so the images of a keyword differ
+                _write_atomic(path, fetch_image(image_query([keyword] + ([str(i)] if i > 1 else []))))
+                print(f"Added {path}")
+            except Exception as e:
+                print(f"Could not fetch an image for '{keyword}': {str(e)}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--build-library":
+        build_library(int(sys.argv[2]) if len(sys.argv) > 2 else 1)
+    else:
+        print(__doc__)
@@ -0,0 +1,450 @@
+"""
+Background job queue for long-running work (theme generation, ZIP export).
+
+Jobs are rows in a SQLite table, so their status, progress and results
+survive Streamlit reruns, browser refreshes and new sessions, and can be
+looked up by job ID. A small pool of worker threads in the server process
+claims queued jobs and runs the registered handler for their kind. The
+work is dominated by waiting on Gemini and image downloads, so threads
+keep the pool saturated without the cost of separate processes.
+
+Artifacts (e.g. ZIP files) are stored as files by artifacts.py, under the
+job ID, and only their file name is kept in the table.
+
+API keys are never written to the database: they are passed to
+submit_job() as secrets and kept in memory only. A job therefore records
+the process that submitted it (host and process ID) and is only claimed by
+that process's workers, so several processes can share the database. A
+job interrupted by a server restart cannot be resumed: when the workers
+start, unfinished jobs owned by this process (same host and process ID,
+as after a container restart) or idle for longer than JOB_LEASE (no
+progress report while running, or still queued) are marked failed. Jobs
+of another live process are left alone.
+
+A job may be parked under a cache key (e.g. themes generated speculatively
+before the user asks for them). The first claim_cached_job() with that key
+takes it over, so a result is handed out once and a later identical
+request runs anew. cancel_job() stops a queued job at once and a running
+one at its next progress report.
+
+Configuration (environment variables):
+    THEMESEEKER_JOBS_DB      path of the SQLite database (default: data/jobs.sqlite3)
+    THEMESEEKER_JOB_WORKERS  number of worker threads (default: 4)
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from artifacts import artifact_path, delete_artifact, prune_artifacts, store_artifact
+from tracing import trace_span
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jobs.sqlite3")
+
+DEFAULT_WORKERS = 4
+
+# Seconds an idle worker waits before checking the table again
+POLL_INTERVAL = 1.0
+
+# Finished jobs older than this are deleted when the workers start
+JOB_RETENTION = 7 * 24 * 60 * 60
+
+# Parked jobs older than this are no longer handed out or reused
+PARKED_MAX_AGE = 60 * 60
+
+# Jobs queued, or running without a progress report, for this long are taken for dead
+JOB_LEASE = 15 * 60
+
+# Recorded on the jobs this process submits; only its workers claim them
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+INTERRUPTED_ERROR = "The job was interrupted by a server restart; please submit it again"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    params TEXT NOT NULL,
+    result TEXT,
+    artifact_name TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    cache_key TEXT,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# Columns added after the first release, created on older databases
+_MIGRATIONS = {
+    'cache_key': "ALTER TABLE jobs ADD COLUMN cache_key TEXT",
+    'owner': "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    'heartbeat_at': "ALTER TABLE jobs ADD COLUMN heartbeat_at REAL",
+}
+
+_handlers = {}
+_secrets = {}
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_workers = []
+
+
+class JobCancelled(Exception):
+    """Raised from progress() inside a handler once its job is cancelled."""
+
+
+class JobResult:
+    """
+    What a handler returns: a JSON-serializable result and, optionally, an
+    artifact (e.g. a ZIP file) with its file name. The artifact is given as
+    bytes, or as the path of a file written with artifacts.new_artifact_file(),
+    which is moved into place without loading it.
+    """
+
+    def __init__(self, result=None, artifact=None, artifact_name=None, artifact_path=None):
+        self.result = result
+        self.artifact = artifact
+        self.artifact_name = artifact_name
+        self.artifact_path = artifact_path
+
+
+def db_path():
+    return os.environ.get("THEMESEEKER_JOBS_DB", DEFAULT_DB_PATH)
+
+
+def _connect():
+    path = db_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column, statement in _MIGRATIONS.items():
+        if column not in columns:
+            conn.execute(statement)
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_kind_cache_key ON jobs (kind, cache_key)")
+    return conn
+
+
+def register_job_type(kind, handler):
+    """
+    Register the function that runs jobs of a kind.
+
+    Parameters:
+    kind (str): Job kind, e.g. "generate_themes"
+    handler (callable): handler(params, secrets, progress) -> JobResult,
+                        where progress(fraction, message) reports progress
+    """
+    _handlers[kind] = handler
+
+
+def _parked_job(conn, kind, cache_key):
+    """ID of the newest recent job parked under a cache key that has not failed or been cancelled."""
+    oldest = time.time() - PARKED_MAX_AGE
+    row = conn.execute(
+        "SELECT id FROM jobs WHERE kind = ? AND cache_key = ? AND status IN (?, ?, ?) AND created_at >= ? "
+        "ORDER BY created_at DESC LIMIT 1",
+        (kind, cache_key, QUEUED, RUNNING, DONE, oldest),
+    ).fetchone()
+    return row['id'] if row else None
+
+
+def submit_job(kind, params, secrets=None, cache_key=None):
+    """
+    Queue a job and wake a worker.
+
+    Parameters:
+    kind (str): Registered job kind
+    params (dict): JSON-serializable job parameters (stored)
+    secrets (dict): API keys and other values kept in memory only
+    cache_key (str): Optional key to park the job under until it is taken
+                     over with claim_cached_job(); when a job is already
+                     parked under the key, its ID is returned instead
+
+    Returns:
+    str: The job ID
+    """
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job_id = uuid.uuid4().hex
+    conn = _connect()
+    try:
+        with _lock:
+            if cache_key is not None:
+                parked = _parked_job(conn, kind, cache_key)
+                if parked is not None:
+                    return parked
+            _secrets[job_id] = dict(secrets or {})
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, created_at, cache_key, owner) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params, ensure_ascii=False), time.time(), cache_key, OWNER),
+            )
+    finally:
+        conn.close()
+    start_workers()
+    _wakeup.set()
+    return job_id
+
+
+def claim_cached_job(kind, cache_key):
+    """
+    Take over the job parked under a cache key, whether it is still queued,
+    running or already done (within PARKED_MAX_AGE). The job is no longer
+parked afterwards.
+
+    Parameters:
+    kind (str): Job kind
+    cache_key (str): Key the job was submitted with
+
+    Returns:
+    str: The job ID, or None if no usable job is parked under the key
+    """
+    conn = _connect()
+    try:
+        with _lock:
+            job_id = _parked_job(conn, kind, cache_key)
+            if job_id is not None:
+                _update(conn, job_id, cache_key=None)
+    finally:
+        conn.close()
+    return job_id
+
+
+def cancel_job(job_id, cache_key=None):
+    """
+    Cancel a queued or running job. A queued job never starts; a running
+    one stops at its next progress report and its result is discarded.
+
+    Parameters:
+    job_id (str): Job ID
+    cache_key (str): When given, only cancel the job if it is still parked
+                     under this key, i.e. nobody has claimed it
+
+    Returns:
+    bool: True if the job was cancelled
+    """
+    condition, args = "id = ? AND status IN (?, ?)", [job_id, QUEUED, RUNNING]
+    if cache_key is not None:
+        condition += " AND cache_key = ?"
+        args.append(cache_key)
+    conn = _connect()
+    try:
+        with _lock:
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = ?, message = 'Cancelled', finished_at = ?, cache_key = NULL "
+                f"WHERE {condition}",
+                (CANCELLED, time.time(), *args),
+            )
+            cancelled = cursor.rowcount > 0
+            if cancelled:
+                _secrets.pop(job_id, None)
+    finally:
+        conn.close()
+    return cancelled
+
+
+def _row_to_job(row):
+    path = artifact_path(row['id'], row['artifact_name']) if row['artifact_name'] else None
+    return {
+        'id': row['id'],
+        'kind': row['kind'],
+        'status': row['status'],
+        'progress': row['progress'],
+        'message': row['message'],
+        'params': json.loads(row['params']),
+        'result': json.loads(row['result']) if row['result'] else None,
+        'artifact_name': row['artifact_name'],
+        'artifact_path': path if path and os.path.exists(path) else None,
+        'error': row['error'],
+        'created_at': row['created_at'],
+        'started_at': row['started_at'],
+        'finished_at': row['finished_at'],
+    }
+
+
+def get_job(job_id):
+    """
+    Look up a job by ID.
+
+    Parameters:
+    job_id (str): Job ID
+
+    Returns:
+    dict: The job, with the path of its artifact file (or None), or None
+          if there is no such job
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row) if row else None
+
+
+def list_jobs(limit=50):
+    """
+    The most recent jobs, newest first, without parameters or results.
+
+    Returns:
+    list: Job dicts
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT id, kind, status, progress, message, error, artifact_name, created_at, finished_at "
+            "FROM jobs ORDER BY created_at DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+def _update(conn, job_id, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _update_running(conn, job_id, **fields):
+    """Update a running job; raises JobCancelled if it was cancelled meanwhile."""
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    cursor = conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ? AND status = ?",
+                          (*fields.values(), job_id, RUNNING))
+    if cursor.rowcount == 0:
+        raise JobCancelled(job_id)
+
+
+def _claim_next(conn):
+    """Atomically move the oldest job queued by this process to running and return it."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Jobs of other processes are left to them: only they hold the secrets
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = ? AND owner = ? ORDER BY created_at LIMIT 1", (QUEUED, OWNER)
+        ).fetchone()
+        if row is not None:
+            now = time.time()
+            _update(conn, row['id'], status=RUNNING, started_at=now, heartbeat_at=now, message="Started")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def _run_job(conn, row):
+    job_id = row['id']
+    with _lock:
+        secrets = _secrets.pop(job_id, None)
+
+    def progress(fraction, message=""):
+        _update_running(conn, job_id, progress=max(0.0, min(1.0, fraction)), message=message,
+                        heartbeat_at=time.time())
+
+    outcome, stored = None, False
+    try:
+        if secrets is None:
+            raise RuntimeError(INTERRUPTED_ERROR)
+        handler = _handlers.get(row['kind'])
+        if handler is None:
+            raise RuntimeError(f"No handler registered for job kind '{row['kind']}'")
+        with trace_span("job.run", kind=row['kind']):
+            outcome = handler(json.loads(row['params']), secrets, progress)
+        if outcome.artifact_name and (outcome.artifact is not None or outcome.artifact_path):
+            # A job cancelled by now stores nothing
+            _update_running(conn, job_id, message="Storing the result", heartbeat_at=time.time())
+            store_artifact(job_id, outcome.artifact_name, outcome.artifact, outcome.artifact_path)
+            stored = True
+        _update_running(
+            conn, job_id,
+            status=DONE, progress=1.0, message="Finished", finished_at=time.time(),
+            result=json.dumps(outcome.result, ensure_ascii=False),
+            artifact_name=outcome.artifact_name,
+        )
+    except JobCancelled:
+        # cancel_job() already marked the job; the partial work is dropped, with the artifact
+        # if it was cancelled between storing it and finishing
+        if stored:
+            delete_artifact(job_id)
+        elif outcome is not None and outcome.artifact_path and os.path.exists(outcome.artifact_path):
+            os.remove(outcome.artifact_path)
+        print(f"Job {job_id} ({row['kind']}) cancelled")
+    except Exception as e:
+        print(f"Job {job_id} ({row['kind']}) failed: {str(e)}")
+        conn.execute(
+            "UPDATE jobs SET status = ?, message = 'Failed', error = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (FAILED, str(e), time.time(), job_id, RUNNING),
+        )
+
+
+def _worker_loop():
+    conn = _connect()
+    while True:
+        try:
+            row = _claim_next(conn)
+        except sqlite3.Error as e:
+            print(f"Job queue error: {str(e)}")
+            row = None
+        if row is None:
+            _wakeup.wait(POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+        _run_job(conn, row)
+
+
+def _recover(conn):
+    """
+    Fail jobs left queued or running by an earlier run of this process or
+    past their lease, and drop old jobs with their artifacts. Their secrets
+    are gone, so running them again could only fail.
+    """
+    now = time.time()
+    conn.execute(
+        "UPDATE jobs SET status = ?, message = 'Failed', error = ?, finished_at = ?, cache_key = NULL "
+        "WHERE status IN (?, ?) AND (owner = ? OR COALESCE(heartbeat_at, created_at) < ?)",
+        (FAILED, INTERRUPTED_ERROR, now, QUEUED, RUNNING, OWNER, now - JOB_LEASE),
+    )
+    conn.execute(
+        "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+        (DONE, FAILED, CANCELLED, now - JOB_RETENTION),
+    )
+    prune_artifacts(JOB_RETENTION)
+
+
+def start_workers(count=None):
+    """
+    Start the worker threads. Called on every rerun; only the first call
+    per process starts them.
+
+    Parameters:
+    count (int): Number of workers (default: THEMESEEKER_JOB_WORKERS or 4)
+    """
+    with _lock:
+        if _workers:
+            return
+        count = count or int(os.environ.get("THEMESEEKER_JOB_WORKERS", DEFAULT_WORKERS))
+        conn = _connect()
+        try:
+            _recover(conn)
+        finally:
+            conn.close()
+        for i in range(count):
+            worker = threading.Thread(target=_worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            _workers.append(worker)
@@ -0,0 +1,274 @@
+"""
+Extraction of JSON arrays from free-form LLM responses.
+
+Gemini frequently wraps the requested JSON in prose or code fences, leaves
+trailing commas, uses smart quotes as delimiters, puts raw newlines inside
+strings or stops mid-object when it runs out of output tokens. Instead of a
+chain of regular expressions (which truncate at the first ']' inside a text
+field), the response is scanned once, character by character, while the
+bracket/string state is tracked and the defects above are repaired on the fly.
+"""
+import json
+
+from themes import THEME_FIELDS
+
+_OPEN_QUOTES = '"“”'
+_SMART_QUOTES = '“”'
+_VALID_ESCAPES = '"\\/bfnrtu'
+_CLOSERS = {'[': ']', '{': '}'}
+_LITERALS = ('true', 'false', 'null')
+
+
+def _next_significant(text, pos):
+    """
+    Return the index of the first non-whitespace character at or after pos
+    (len(text) if there is none).
+    """
+    n = len(text)
+    while pos < n and text[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+
+def _closes_string(text, pos):
+    """
+    Decide whether the quote at text[pos] closes the current string or is an
+    unescaped quote that belongs to the string content.
+    """
+    nxt = _next_significant(text, pos + 1)
+    if nxt >= len(text):
+        return True
+    char = text[nxt]
+    if char in ':}]':
+        return True
+    if char == ',':
+        # A comma only ends the value if another JSON token follows it
+        after = _next_significant(text, nxt + 1)
+        if after >= len(text):
+            return True
+        follower = text[after]
+        if follower in '"{[]}-' or follower in _SMART_QUOTES or follower.isdigit():
+            return True
+        return any(text.startswith(literal, after) for literal in _LITERALS)
+    # Two strings separated only by a line break are most likely a missing comma
+    if char in _OPEN_QUOTES and '\n' in text[pos + 1:nxt]:
+        return True
+    return False
+
+
+def _strip_trailing_comma(out):
+    """Remove a dangling comma (and whitespace after it) from the output buffer."""
+    i = len(out) - 1
+    while i >= 0 and out[i] in ' \t\r\n':
+        i -= 1
+    if i >= 0 and out[i] == ',':
+        del out[i:]
+
+
+def _last_significant(out):
+    """Return the last non-whitespace character written to the output buffer."""
+    i = len(out) - 1
+    while i >= 0 and out[i] in ' \t\r\n':
+        i -= 1
+    return out[i] if i >= 0 else ''
+
+
+def scan_json_candidates(text):
+    """
+    Scan text once and return every top-level JSON array/object found in it,
+    repaired so that it has a good chance of being accepted by json.loads.
+
+    Parameters:
+    text (str): Raw model response
+
+    Returns:
+    list: Repaired JSON strings, in the order they appear in the text
+    """
+    candidates = []
+    out = []
+    stack = []
+    in_string = False
+    # Length of the output and open containers right after the last complete
+    # element of an array, used to cut back to a consistent state on truncation
+    safe_point = None
+
+    i = 0
+    n = len(text)
+    while i < n:
+        char = text[i]
+
+        if not stack:
+            # Outside any structure: only look for the start of a candidate
+            if char in '[{':
+                stack.append(char)
+                out = [char]
+                safe_point = None
+            i += 1
+            continue
+
+        if in_string:
+            if char == '\\':
+                if i + 1 < n and text[i + 1] in _VALID_ESCAPES:
+                    out.append(text[i:i + 2])
+                    i += 2
+                else:
+                    # Stray backslash: escape it so the content survives
+                    out.append('\\\\')
+                    i += 1
+                continue
+            if (char == '"' or (in_string == 'smart' and char in _SMART_QUOTES)) and _closes_string(text, i):
+                out.append('"')
+                in_string = False
+            elif char == '"':
+                out.append('\\"')
+            elif char == '\n':
+                out.append('\\n')
+            elif char == '\r':
+                out.append('\\r')
+            elif char == '\t':
+                out.append('\\t')
+            elif ord(char) < 0x20:
+                out.append('\\u%04x' % ord(char))
+            else:
+                out.append(char)
+            i += 1
+            continue
+
+        if char in _OPEN_QUOTES or char in '[{':
+            # Insert a missing comma between two consecutive values
+            if _last_significant(out) in '"}]':
+                out.append(',')
+            if char in _OPEN_QUOTES:
+                in_string = 'smart' if char in _SMART_QUOTES else 'plain'
+                out.append('"')
+            else:
+                stack.append(char)
+                out.append(char)
+        elif char in ']}':
+            _strip_trailing_comma(out)
+            # Tolerate mismatched closers by closing whatever is open
+            out.append(_CLOSERS[stack.pop()])
+            if not stack:
+                candidates.append(''.join(out))
+                out = []
+            elif stack[-1] == '[':
+                safe_point = (len(out), list(stack))
+        else:
+            out.append(char)
+        i += 1
+
+    # Truncated response: fall back to the last complete array element
+    if stack:
+        if safe_point is not None:
+            length, open_containers = safe_point
+            out = out[:length]
+        else:
+            if in_string:
+                out.append('"')
+            _strip_trailing_comma(out)
+            if _last_significant(out) == ':':
+                out.append('null')
+            open_containers = stack
+        _strip_trailing_comma(out)
+        out.extend(_CLOSERS[c] for c in reversed(open_containers))
+        candidates.append(''.join(out))
+
+    return candidates
+
+
+def _as_item_list(value):
+    """
+    Normalize a decoded JSON value into a list of objects, unwrapping
+    {"themes": [...]}-style envelopes and single objects.
+    """
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, dict)]
+    if isinstance(value, dict):
+        for inner in value.values():
+            if isinstance(inner, list) and inner and all(isinstance(item, dict) for item in inner):
+                return inner
+        return [value]
+    return []
+
+
+def extract_json_array(text):
+    """
+    Find and decode the outermost JSON array of objects in an LLM response.
+
+    Parameters:
+    text (str): Raw model response
+
+    Returns:
+    list: Decoded list of dictionaries, or None if nothing could be salvaged
+    """
+    if not text:
+        return None
+
+    # Fast path: the response is already clean JSON
+    try:
+        items = _as_item_list(json.loads(text))
+        if items:
+            return items
+    except ValueError:
+        pass
+
+    # Try the longest candidate first; prose like "[1]" produces short ones
+    for candidate in sorted(scan_json_candidates(text), key=len, reverse=True):
+        try:
+            items = _as_item_list(json.loads(candidate))
+        except ValueError:
+            continue
+        if items:
+            return items
+
+    return None
+
+
+def _as_text(value):
+    """Coerce a field value (sometimes returned as a list or object) to text."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return "\n".join(_as_text(item) for item in value if item not in (None, ""))
+    if isinstance(value, dict):
+        return "\n".join(f"{key}: {_as_text(item)}" for key, item in value.items())
+    return str(value)
+
+
+def validate_themes(items, fields=THEME_FIELDS):
+    """
+    Validate decoded theme objects against the theme schema.
+
+    Every expected field is coerced to a string (missing ones become empty),
+    unknown fields are dropped and objects without a title are discarded.
+
+    Parameters:
+    items (list): Decoded theme dictionaries
+    fields (list): Field names of the schema
+
+    Returns:
+    list: Clean theme dictionaries
+    """
+    themes = []
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        theme = {field: _as_text(item.get(field)) for field in fields}
+        if theme.get("title"):
+            themes.append(theme)
+    return themes
+
+
+def parse_themes_response(text):
+    """
+    Extract and validate the themes contained in a Gemini response.
+
+    Parameters:
+    text (str): Raw model response
+
+    Returns:
+    list: Validated theme dictionaries (empty if nothing could be salvaged)
+    """
+    return validate_themes(extract_json_array(text))
@@ -0,0 +1,150 @@
+"""
+Languages the themes are written in and translated to.
+
+Themes are generated in English and translated to any of the other
+languages. Each language has the label shown in the app, its ISO code (for
+the HTML lang attribute and the translation prompt), the suffix of its
+document file names, the labels of the theme view and the parts of the
+document date line: month names and how month and year are combined.
+"""
+SOURCE_LANGUAGE = "english"
+
+# Languages translated to when none are chosen
+DEFAULT_TRANSLATIONS = ["portuguese"]
+
+LANGUAGES = {
+    "english": {
+        'label': "English",
+        'code': "en",
+        'suffix': "",
+        'months': ["January", "February", "March", "April", "May", "June",
+                   "July", "August", "September", "October", "November", "December"],
+        'date_format': "{month} {year}",
+        'labels': {
+            'theme': "Theme",
+            'untitled': "Untitled Theme",
+            'document_title': "Theme Title",
+            'description': "Description",
+            'teaser': "Teaser",
+            'details': "View Full Details",
+            'age_resonance': "Age Group Resonance",
+            'philosophical_connection': "Philosophical Connection",
+            'lecture_outline': "Lecture Outline",
+            'full_text': "Full Text",
+        },
+    },
+    "portuguese": {
+        'label': "Portuguese",
+        'code': "pt",
+        'suffix': "_pt",
+        'months': ["janeiro", "fevereiro", "março", "abril", "maio", "junho",
+                   "julho", "agosto", "setembro", "outubro", "novembro", "dezembro"],
+        'date_format': "{month} de {year}",
+        'labels': {
+            'theme': "Tema",
+            'untitled': "Tema Sem Título",
+            'document_title': "Título do Tema",
+            'description': "Descrição",
+            'teaser': "Chamada",
+            'details': "Ver Detalhes Completos",
+            'age_resonance': "Ressonância com a Faixa Etária",
+            'philosophical_connection': "Conexão Filosófica",
+            'lecture_outline': "Estrutura da Palestra",
+            'full_text': "Texto Completo",
+        },
+    },
+    "spanish": {
+        'label': "Spanish",
+        'code': "es",
+        'suffix': "_es",
+        'months': ["enero", "febrero", "marzo", "abril", "mayo", "junio",
+                   "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"],
+        'date_format': "{month} de {year}",
+        'labels': {
+            'theme': "Tema",
+            'untitled': "Tema Sin Título",
+            'document_title': "Título del Tema",
+            'description': "Descripción",
+            'teaser': "Avance",
+            'details': "Ver Detalles Completos",
+            'age_resonance': "Resonancia con el Grupo de Edad",
+            'philosophical_connection': "Conexión Filosófica",
+            'lecture_outline': "Esquema de la Conferencia",
+            'full_text': "Texto Completo",
+        },
+    },
+    "french": {
+        'label': "French",
+        'code': "fr",
+        'suffix': "_fr",
+        'months': ["janvier", "février", "mars", "avril", "mai", "juin",
+                   "juillet", "août", "septembre", "octobre", "novembre", "décembre"],
+        'date_format': "{month} {year}",
+        'labels': {
+            'theme': "Thème",
+            'untitled': "Thème Sans Titre",
+            'document_title': "Titre du Thème",
+            'description': "Description",
+            'teaser': "Accroche",
+            'details': "Voir Tous les Détails",
+            'age_resonance': "Résonance avec la Tranche d'Âge",
+            'philosophical_connection': "Lien Philosophique",
+            'lecture_outline': "Plan de la Conférence",
+            'full_text': "Texte Complet",
+        },
+    },
+    "german": {
+        'label': "German",
+        'code': "de",
+        'suffix': "_de",
+        'months': ["Januar", "Februar", "März", "April", "Mai", "Juni",
+                   "Juli", "August", "September", "Oktober", "November", "Dezember"],
+        'date_format': "{month} {year}",
+        'labels': {
+            'theme': "Thema",
+            'untitled': "Thema Ohne Titel",
+            'document_title': "Titel des Themas",
+            'description': "Beschreibung",
+            'teaser': "Anreißer",
+            'details': "Alle Details Anzeigen",
+            'age_resonance': "Resonanz in der Altersgruppe",
+            'philosophical_connection': "Philosophische Verbindung",
+            'lecture_outline': "Vortragsgliederung",
+            'full_text': "Volltext",
+        },
+    },
+}
+
+# Languages the English themes can be translated to
+TRANSLATION_LANGUAGES = [language for language in LANGUAGES if language != SOURCE_LANGUAGE]
+
+
+def locale(language):
+    """The locale data of a language; unknown languages use English."""
+    return LANGUAGES.get(language, LANGUAGES[SOURCE_LANGUAGE])
+
+
+def language_label(language):
+    """Name of a language as shown in the app, e.g. "Portuguese"."""
+    return locale(language)['label']
+
+
+def ui_label(language, key):
+    """A label of the theme view in a language, e.g. ui_label("spanish", "teaser")."""
+    return locale(language)['labels'][key]
+
+
+def format_month_year(language, date):
+    """
+    Month and year of a date as written in a language, e.g. "October 2026"
+    or "outubro de 2026".
+
+    Parameters:
+    language (str): Language name, e.g. "portuguese"
+    date (datetime): The date
+
+    Returns:
+    str: The formatted month and year
+    """
+    data = locale(language)
+    return data['date_format'].format(month=data['months'][date.month - 1], year=date.year)
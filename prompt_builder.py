@@ -0,0 +1,476 @@
+"""
+Prompt construction for lecture theme generation.
+
+Builds the Gemini prompt from the mined videos while keeping it inside a
+token budget: titles are normalized and deduplicated, grouped under their
+context category (so each label is written once) and added in popularity
+order until the budget is spent. Audience signals sampled from viewer
+comments (see comments.py), when given, follow the titles within their own
+share of the budget. A channel summary (see channels.py), when given,
+comes first, within its own share: a line per category with its share of
+the views and the channels behind it says who drives a topic in fewer
+tokens than the title lines it displaces. The philosophy context gets its
+share of the budget plus whatever the titles did not use.
+
+build_prefixed_theme_prompt() splits the same prompt into a static prefix
+(instructions, philosophy context and field schema), which only changes
+with the philosophy context and can be cached by Gemini (see
+context_cache.py), and the per-call request with the titles and age group.
+"""
+import logging
+import math
+
+from clustering import normalize_title
+from tracing import increment_counter
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English/Portuguese text with Gemini
+CHARS_PER_TOKEN = 4
+
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Maximum share of the budget reserved for the philosophy context
+PHILOSOPHY_SHARE = 0.5
+
+# Maximum share of the budget reserved for audience signals from comments
+AUDIENCE_SHARE = 0.15
+
+# Maximum share of the budget reserved for the channel summary
+CHANNEL_SHARE = 0.1
+
+# Hard cap kept from the original prompt
+MAX_PHILOSOPHY_CHARS = 10000
+
+# Number of themes asked for in one call
+THEME_COUNT = 10
+
+AGE_CHARACTERISTICS = {
+    "20-30": "digital natives, social media focused, seeking authenticity, concerned about climate crisis, mental health aware",
+    "30-40": "career-focused, starting families, balancing work-life, health conscious, pragmatic spirituality",
+    "40-50": "mid-life reflection, established careers, parenting teens, seeking deeper meaning, stress management",
+    "50-60": "empty nest transitions, career peak or change, caring for aging parents, legacy considerations",
+    "60+": "retirement planning/living, health challenges, grandparenting, mortality awareness, wisdom sharing"
+}
+
+THEME_FIELDS_INSTRUCTIONS = """{{
+  "title": "The catchy title that reflects both current trends and philosophical approach",
+  "description": "A short description (2-3 sentences)",
+  "age_resonance": "Explanation of why this theme resonates with this specific age group",
+  "philosophical_connection": "Brief note on how it connects to {connection_target}",
+  "lecture_outline": "An outline for a 30-minute lecture based on the theme",
+  "teaser": "A 50-60 word teaser that would be compelling for marketing purposes",
+  "full_text": "A 500-word text that expands on the theme for a document/flyer"
+}}"""
+
+PROMPT_WITH_PHILOSOPHY = """
+As a spiritual content creator for a philosophical school of thought, analyze these trending YouTube video titles related to spirituality, grouped by topic:
+
+{titles_context}
+{avoid_context}
+The philosophical school has the following context, which should guide your suggestions:
+----
+{philosophy_context}
+----
+
+Based on these trends and the philosophical context, create {theme_count} compelling lecture themes that would resonate specifically with people aged {age_group} years.
+Consider that this age group typically has these characteristics: {age_characteristics}.
+
+Make sure your suggested themes align with the philosophical approach described in the context.
+
+IMPORTANT: Return your response in a valid JSON format with an array of {theme_count} theme objects. Each theme object must have these exact fields:
+{fields}
+
+Make sure all fields are properly escaped for valid JSON and that the entire response is a valid JSON array.
+"""
+
+PROMPT_WITHOUT_PHILOSOPHY = """
+As a spiritual content creator, analyze these trending YouTube video titles related to spirituality, grouped by topic:
+
+{titles_context}
+{avoid_context}
+Based on these trends, create {theme_count} compelling lecture themes that would resonate specifically with people aged {age_group} years.
+Consider that this age group typically has these characteristics: {age_characteristics}.
+
+IMPORTANT: Return your response in a valid JSON format with an array of {theme_count} theme objects. Each theme object must have these exact fields:
+{fields}
+
+Make sure all fields are properly escaped for valid JSON and that the entire response is a valid JSON array.
+"""
+
+# Static part of the prompt, shared by every call with the same philosophy context
+PROMPT_PREFIX = """
+As a spiritual content creator for a philosophical school of thought, you create lecture themes inspired by trending YouTube video titles related to spirituality.
+
+The philosophical school has the following context, which should guide your suggestions:
+----
+{philosophy_context}
+----
+
+Make sure your suggested themes align with the philosophical approach described in the context.
+
+IMPORTANT: Return your response in a valid JSON format with an array of theme objects. Each theme object must have these exact fields:
+{fields}
+
+Make sure all fields are properly escaped for valid JSON and that the entire response is a valid JSON array.
+"""
+
+PROMPT_REQUEST = """
+Analyze these trending YouTube video titles related to spirituality, grouped by topic:
+
+{titles_context}
+{avoid_context}
+Based on these trends and the philosophical context, create {theme_count} compelling lecture themes that would resonate specifically with people aged {age_group} years.
+Consider that this age group typically has these characteristics: {age_characteristics}.
+"""
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens in text without calling the API.
+
+    Parameters:
+    text (str): Text to measure
+
+    Returns:
+    int: Estimated token count
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def count_tokens(text, model=None):
+    """
+    Count tokens with the model's count_tokens endpoint when a model is
+    given, falling back to the local estimate if the call fails.
+
+    Parameters:
+    text (str): Text to measure
+    model: Optional genai.GenerativeModel
+
+    Returns:
+    int: Token count
+    """
+    if model is not None:
+        try:
+            return model.count_tokens(text).total_tokens
+        except Exception as e:
+            logger.warning("count_tokens failed, using local estimate: %s", e)
+    return estimate_tokens(text)
+
+
+def dedupe_titles(videos):
+    """
+    Collapse videos whose normalized titles are identical. Videos that are
+    cluster representatives (see clustering.cluster_videos) count with their
+    whole cluster.
+
+    Parameters:
+    videos (list): Video dicts with 'title', 'context' and 'view_count'
+
+    Returns:
+    list: One dict per distinct title with 'title', 'context', 'view_count'
+          (summed), 'count' (number of videos merged) and 'score' (best
+          'engagement_score', see ranking.py), highest score first, then
+          most viewed
+    """
+    merged = {}
+    for video in videos:
+        key = normalize_title(video['title']) or video['title']
+        view_count = video.get('cluster_view_count', video.get('view_count', 0))
+        count = video.get('cluster_size', 1)
+        entry = merged.get(key)
+        if entry is None:
+            merged[key] = {
+                'title': video['title'].strip(),
+                'context': video.get('context', 'General spiritual content'),
+                'view_count': view_count,
+                'count': count,
+                'score': video.get('engagement_score'),
+            }
+        else:
+            entry['view_count'] += view_count
+            entry['count'] += count
+            if video.get('engagement_score') is not None:
+                entry['score'] = max(entry['score'] if entry['score'] is not None else float('-inf'),
+                                     video['engagement_score'])
+    # Unranked videos fall back to views
+    return sorted(merged.values(), reverse=True, key=lambda entry: (
+        entry['score'] if entry['score'] is not None else float('-inf'), entry['view_count']))
+
+
+def format_titles_by_context(entries):
+    """
+    Render deduplicated titles grouped under their context label. Groups are
+    ordered by total views, titles keep the order they were given in.
+
+    Parameters:
+    entries (list): Output of dedupe_titles (or a prefix of it)
+
+    Returns:
+    str: The titles block for the prompt
+    """
+    groups = {}
+    totals = {}
+    for entry in entries:
+        groups.setdefault(entry['context'], []).append(entry)
+        totals[entry['context']] = totals.get(entry['context'], 0) + entry['view_count']
+
+    lines = []
+    for context in sorted(groups, key=lambda c: totals[c], reverse=True):
+        lines.append(f"{context}:")
+        for entry in groups[context]:
+            suffix = f" (x{entry['count']})" if entry['count'] > 1 else ""
+            lines.append(f"- {entry['title']}{suffix}")
+    return "\n".join(lines)
+
+
+def format_audience_signals(signals):
+    """
+    Render audience signals (output of comments.audience_signals) as a
+    block for the prompt, one line per category.
+    """
+    lines = ["What viewers discuss in the comments of the top videos:"]
+    for signal in signals:
+        keywords = ", ".join(signal['keywords'])
+        lines.append(f"- {signal['category']} ({signal['comments']} comments): {keywords}")
+    return "\n".join(lines)
+
+
+def _short_count(count):
+    for limit, suffix in ((1_000_000_000, "B"), (1_000_000, "M"), (1_000, "K")):
+        if count >= limit:
+            return f"{count / limit:.1f}".rstrip("0").rstrip(".") + suffix
+    return str(count)
+
+
+def format_channel_summary(summary):
+    """
+    Render a channel summary (output of channels.category_channels) as a
+    block for the prompt, one line per category.
+    """
+    lines = ["Channels behind these trends (share of views):"]
+    for entry in summary:
+        channels = []
+        for channel in entry['top_channels']:
+            subscribers = f", {_short_count(channel['subscribers'])} subscribers" if channel['subscribers'] else ""
+            channels.append(f"{channel['channel']} {channel['view_share']:.0%}{subscribers}")
+        lines.append(f"- {entry['category']} ({entry['view_share']:.0%} of views, {entry['channels']} channels): "
+                     f"{'; '.join(channels)}")
+    return "\n".join(lines)
+
+
+def format_avoid_titles(titles):
+    """
+    Render the titles of themes the response must not repeat, or an empty
+    string when there are none.
+    """
+    if not titles:
+        return ""
+    lines = ["", "These themes were already suggested recently; do not repeat them or close variations of them:"]
+    lines.extend(f"- {title}" for title in titles)
+    return "\n".join(lines) + "\n"
+
+
+def build_theme_prompt(videos, age_group, philosophy_context="", token_budget=DEFAULT_TOKEN_BUDGET,
+                       audience_signals=None, theme_count=THEME_COUNT, avoid_titles=None, channel_summary=None):
+    """
+    Build the theme generation prompt within a token budget.
+
+    Parameters:
+    videos (list): Video dicts with 'title', 'context' and 'view_count'
+    age_group (str): Target age group (e.g., "20-30")
+    philosophy_context (str): Cleaned philosophy text, may be empty
+    token_budget (int): Maximum estimated tokens for the whole prompt
+    audience_signals (list): Optional per-category comment signals, most
+                             discussed first (see comments.audience_signals)
+    theme_count (int): Number of themes to ask for
+    avoid_titles (list): Optional titles of earlier themes not to repeat
+    channel_summary (list): Optional per-category channel shares, most
+                            viewed first (see channels.category_channels)
+
+    Returns:
+    tuple: (prompt, stats) where stats holds token and title counts
+    """
+    template = PROMPT_WITH_PHILOSOPHY if philosophy_context else PROMPT_WITHOUT_PHILOSOPHY
+    fields = THEME_FIELDS_INSTRUCTIONS.format(
+        connection_target="the philosophical context" if philosophy_context else "current spiritual trends"
+    )
+    age_characteristics = AGE_CHARACTERISTICS.get(age_group, "")
+    avoid_context = format_avoid_titles(avoid_titles)
+
+    # Tokens taken by the fixed instructions
+    fixed_tokens = estimate_tokens(template.format(
+        titles_context="", avoid_context=avoid_context, philosophy_context="", age_group=age_group,
+        age_characteristics=age_characteristics, fields=fields, theme_count=theme_count
+    ))
+    available = max(token_budget - fixed_tokens, 0)
+
+    philosophy_context = philosophy_context[:MAX_PHILOSOPHY_CHARS]
+    philosophy_reserve = min(estimate_tokens(philosophy_context), int(available * PHILOSOPHY_SHARE))
+
+    titles_context, selection = _select_titles(videos, audience_signals, available - philosophy_reserve,
+                                               int(available * AUDIENCE_SHARE), channel_summary,
+                                               int(available * CHANNEL_SHARE))
+
+    # Give the philosophy context whatever the titles left over
+    if philosophy_context:
+        philosophy_budget = available - estimate_tokens(titles_context)
+        max_chars = max(philosophy_budget, 0) * CHARS_PER_TOKEN
+        if len(philosophy_context) > max_chars:
+            philosophy_context = philosophy_context[:max(max_chars - 3, 0)] + "..."
+
+    prompt = template.format(
+        titles_context=titles_context,
+        avoid_context=avoid_context,
+        philosophy_context=philosophy_context,
+        age_group=age_group,
+        age_characteristics=age_characteristics,
+        fields=fields,
+        theme_count=theme_count
+    )
+
+    stats = dict(selection, estimated_tokens=estimate_tokens(prompt), token_budget=token_budget,
+                 videos=len(videos), philosophy_chars=len(philosophy_context))
+    logger.info(
+        "Theme prompt: ~%d tokens (budget %d), %d/%d distinct titles from %d videos",
+        stats['estimated_tokens'], token_budget, stats['titles_included'], stats['distinct_titles'], len(videos)
+    )
+    return prompt, stats
+
+
+def build_prefixed_theme_prompt(videos, age_group, philosophy_context, token_budget=DEFAULT_TOKEN_BUDGET,
+                                audience_signals=None, theme_count=THEME_COUNT, avoid_titles=None,
+                                channel_summary=None):
+    """
+    Build the theme generation prompt as a static prefix and a per-call
+    request. The prefix depends only on the philosophy context and the
+    token budget (the context is cut to its share of it), never on the
+    titles, the theme count or the titles to avoid, so it stays the same
+    across age groups, mining runs and replacement calls.
+
+    Parameters:
+    videos (list): Video dicts with 'title', 'context' and 'view_count'
+    age_group (str): Target age group (e.g., "20-30")
+    philosophy_context (str): Cleaned philosophy text
+    token_budget (int): Maximum estimated tokens for prefix and request together
+    audience_signals (list): Optional per-category comment signals
+    theme_count (int): Number of themes to ask for (in the request only)
+    avoid_titles (list): Optional titles of earlier themes not to repeat
+    channel_summary (list): Optional per-category channel shares
+
+    Returns:
+    tuple: (prefix, request, stats) where stats also holds 'prefix_tokens'
+    """
+    fields = THEME_FIELDS_INSTRUCTIONS.format(connection_target="the philosophical context")
+    age_characteristics = AGE_CHARACTERISTICS.get(age_group, "")
+    avoid_context = format_avoid_titles(avoid_titles)
+
+    # The prefix is cut from the budget and its own template only, so the
+    # request (titles, theme count, titles to avoid) never changes it
+    prefix_available = max(token_budget - estimate_tokens(PROMPT_PREFIX.format(philosophy_context="", fields=fields)), 0)
+    philosophy_context = philosophy_context[:MAX_PHILOSOPHY_CHARS]
+    max_chars = int(prefix_available * PHILOSOPHY_SHARE) * CHARS_PER_TOKEN
+    if len(philosophy_context) > max_chars:
+        philosophy_context = philosophy_context[:max(max_chars - 3, 0)] + "..."
+    prefix = PROMPT_PREFIX.format(philosophy_context=philosophy_context, fields=fields)
+
+    # The titles get what the prefix and the fixed part of the request leave
+    request_tokens = estimate_tokens(PROMPT_REQUEST.format(
+        titles_context="", avoid_context=avoid_context, age_group=age_group,
+        age_characteristics=age_characteristics, theme_count=theme_count))
+    available = max(token_budget - estimate_tokens(prefix) - request_tokens, 0)
+    titles_context, selection = _select_titles(videos, audience_signals, available,
+                                               int(prefix_available * AUDIENCE_SHARE), channel_summary,
+                                               int(prefix_available * CHANNEL_SHARE))
+    request = PROMPT_REQUEST.format(titles_context=titles_context, avoid_context=avoid_context, age_group=age_group,
+                                    age_characteristics=age_characteristics, theme_count=theme_count)
+
+    stats = dict(selection, estimated_tokens=estimate_tokens(prefix) + estimate_tokens(request),
+                 prefix_tokens=estimate_tokens(prefix), token_budget=token_budget, videos=len(videos),
+                 philosophy_chars=len(philosophy_context))
+    logger.info(
+        "Theme prompt: ~%d tokens (prefix ~%d, budget %d), %d/%d distinct titles from %d videos",
+        stats['estimated_tokens'], stats['prefix_tokens'], token_budget, stats['titles_included'],
+        stats['distinct_titles'], len(videos)
+    )
+    return prefix, request, stats
+
+
+def _select_titles(videos, audience_signals, budget, audience_share, channel_summary=None, channel_share=0):
+    """
+    Render the channel summary, the audience signals and the best-ranked
+    titles that fit in a token budget; the summary takes at most
+    channel_share tokens of it and the signals at most audience_share.
+
+    Returns:
+    tuple: (titles block, dict with 'distinct_titles', 'titles_included',
+           'audience_categories' and 'channel_categories')
+    """
+    # Add the most viewed categories while they fit in their share
+    channels = []
+    for entry in channel_summary or []:
+        if estimate_tokens(format_channel_summary(channels + [entry])) > channel_share:
+            break
+        channels.append(entry)
+    channel_context = format_channel_summary(channels) if channels else ""
+
+    # Add the most discussed categories while they fit in their share
+    signals = []
+    audience_budget = audience_share if audience_signals else 0
+    for signal in audience_signals or []:
+        if estimate_tokens(format_audience_signals(signals + [signal])) > audience_budget:
+            break
+        signals.append(signal)
+    audience_context = format_audience_signals(signals) if signals else ""
+
+    # Add titles, best ranked first, while they fit in the remaining budget
+    entries = dedupe_titles(videos)
+    title_budget = budget - estimate_tokens(audience_context) - estimate_tokens(channel_context)
+    included = []
+    used = 0
+    for entry in entries:
+        # Each title line plus, at worst, a new group header
+        cost = estimate_tokens(f"- {entry['title']} (x{entry['count']})\n{entry['context']}:\n")
+        if used + cost > title_budget:
+            break
+        included.append(entry)
+        used += cost
+    titles_context = format_titles_by_context(included)
+    if channel_context:
+        titles_context = channel_context + "\n\n" + titles_context
+    if audience_context:
+        titles_context += "\n\n" + audience_context
+    return titles_context, {
+        'distinct_titles': len(entries),
+        'titles_included': len(included),
+        'audience_categories': len(signals),
+        'channel_categories': len(channels),
+    }
+
+
+def log_token_usage(call_name, response, estimated_tokens_in=None):
+    """
+    Log the tokens sent and received by a Gemini call, using the response's
+    usage metadata when present and the local estimate otherwise.
+
+    Parameters:
+    call_name (str): Label for the log line (e.g., "generate_themes")
+    response: genai response object
+    estimated_tokens_in (int): Local estimate of the prompt size
+
+    Returns:
+    dict: {'tokens_in': int, 'tokens_out': int, 'tokens_cached': int}, where
+          tokens_cached is the part of tokens_in read from cached content
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    tokens_in = getattr(usage, 'prompt_token_count', None) or estimated_tokens_in or 0
+    tokens_out = getattr(usage, 'candidates_token_count', None)
+    if tokens_out is None:
+        tokens_out = estimate_tokens(getattr(response, 'text', '') or '')
+    tokens_cached = getattr(usage, 'cached_content_token_count', None) or 0
+    logger.info("%s: %d tokens in (%d cached), %d tokens out", call_name, tokens_in, tokens_cached, tokens_out)
+    increment_counter("gemini_tokens", tokens_in, direction="in", call=call_name)
+    increment_counter("gemini_tokens", tokens_out, direction="out", call=call_name)
+    if tokens_cached:
+        increment_counter("gemini_tokens", tokens_cached, direction="cached", call=call_name)
+    return {'tokens_in': tokens_in, 'tokens_out': tokens_out, 'tokens_cached': tokens_cached}
@@ -0,0 +1,252 @@
+"""
+Output backends for theme documents.
+
+Each backend turns a ThemeDocument (see documents.py) into the bytes of
+one file format. Backends are looked up in FORMATS by name; more can be
+added with register_format().
+
+Configuration (environment variables):
+    THEMESEEKER_PDF_FONT  path of a TrueType font for PDFs (default: the
+                          built-in Helvetica, limited to Latin-1 text)
+"""
+import base64
+import html
+import os
+from io import BytesIO
+
+import docx
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Pt, Inches
+from fpdf import FPDF
+
+from locales import locale
+from tracing import trace_span
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Typographic characters outside Latin-1 that the built-in PDF fonts lack
+_LATIN1_REPLACEMENTS = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "–": "-", "—": "-", "…": "...", "•": "-", " ": " ",
+})
+
+
+def render_docx(document):
+    """
+    Render a document as a Word file.
+
+    Parameters:
+    document (ThemeDocument): The document to render
+
+    Returns:
+    bytes: The .docx file
+    """
+    doc = docx.Document()
+
+    # Set document margins
+    for section in doc.sections:
+        section.top_margin = Inches(1)
+        section.bottom_margin = Inches(1)
+        section.left_margin = Inches(1)
+        section.right_margin = Inches(1)
+
+    if document.image:
+        # Add the image to the document straight from memory
+        doc.add_picture(BytesIO(document.image), width=Inches(6))
+
+        # Add some space after the image
+        doc.add_paragraph()
+
+    # Add the theme title
+    title_paragraph = doc.add_paragraph()
+    title_run = title_paragraph.add_run(document.title)
+    title_run.bold = True
+    title_run.font.size = Pt(24)
+    title_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Add the date
+    date_paragraph = doc.add_paragraph()
+    date_run = date_paragraph.add_run(document.date)
+    date_run.bold = True
+    date_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Add the teaser
+    if document.teaser:
+        doc.add_paragraph()
+        teaser_paragraph = doc.add_paragraph()
+        teaser_run = teaser_paragraph.add_run(document.teaser)
+        teaser_run.italic = True
+        teaser_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Add the main text
+    doc.add_paragraph()  # Add space
+    for paragraph in document.paragraphs:
+        p = doc.add_paragraph()
+        p.add_run(paragraph)
+
+    # Add footer with branding
+    footer_paragraph = doc.sections[0].footer.paragraphs[0]
+    footer_run = footer_paragraph.add_run(document.footer)
+    footer_run.font.size = Pt(8)
+    footer_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc_bytes = BytesIO()
+    with trace_span("docx.serialize"):
+        doc.save(doc_bytes)
+    return doc_bytes.getvalue()
+
+
+class _ThemePDF(FPDF):
+    """FPDF with the branding footer on every page."""
+
+    footer_text = ""
+    footer_font = "Helvetica"
+
+    def __init__(self):
+        super().__init__(format="A4", unit="mm")
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font(self.footer_font, size=8)
+        self.cell(0, 10, self.footer_text, align="C")
+
+
+def _pdf_font(pdf):
+    """Register the configured TrueType font, or fall back to Helvetica."""
+    font_path = os.environ.get("THEMESEEKER_PDF_FONT")
+    if font_path:
+        try:
+            pdf.add_font("ThemeFont", "", font_path)
+            pdf.add_font("ThemeFont", "B", font_path)
+            pdf.add_font("ThemeFont", "I", font_path)
+            return "ThemeFont", False
+        except Exception as e:
+            print(f"Could not load PDF font {font_path}: {str(e)}")
+    return "Helvetica", True
+
+
+def render_pdf(document):
+    """
+    Render a document as a PDF with the same layout as the Word file
+    (A4, one-inch margins, centered title block, six-inch image).
+
+    Parameters:
+    document (ThemeDocument): The document to render
+
+    Returns:
+    bytes: The .pdf file
+    """
+    pdf = _ThemePDF()
+    font, latin1_only = _pdf_font(pdf)
+
+    def text(value):
+        if not latin1_only:
+            return value
+        return value.translate(_LATIN1_REPLACEMENTS).encode("latin-1", "replace").decode("latin-1")
+
+    pdf.footer_font = font
+    pdf.footer_text = text(document.footer)
+    pdf.set_margins(25.4, 25.4, 25.4)
+    pdf.set_auto_page_break(True, margin=25.4)
+    pdf.add_page()
+
+    if document.image:
+        image_width = 152.4
+        pdf.image(BytesIO(document.image), x=(pdf.w - image_width) / 2, w=image_width)
+        pdf.ln(6)
+
+    pdf.set_font(font, "B", 24)
+    pdf.multi_cell(0, 11, text(document.title), align="C", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(2)
+    pdf.set_font(font, "B", 11)
+    pdf.multi_cell(0, 6, text(document.date), align="C", new_x="LMARGIN", new_y="NEXT")
+
+    if document.teaser:
+        pdf.ln(6)
+        pdf.set_font(font, "I", 11)
+        pdf.multi_cell(0, 6, text(document.teaser), align="C", new_x="LMARGIN", new_y="NEXT")
+
+    pdf.ln(6)
+    pdf.set_font(font, "", 11)
+    for paragraph in document.paragraphs:
+        pdf.multi_cell(0, 6, text(paragraph), new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(3)
+
+    with trace_span("pdf.serialize"):
+        return bytes(pdf.output())
+
+
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="{lang}">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>
+body {{ max-width: 40em; margin: 2em auto; padding: 0 1em; font-family: Georgia, serif; line-height: 1.5; color: #222; }}
+img {{ width: 100%; height: auto; }}
+h1, .date, .teaser, footer {{ text-align: center; }}
+.date {{ font-weight: bold; }}
+.teaser {{ font-style: italic; }}
+footer {{ font-size: 0.7em; margin-top: 3em; }}
+</style>
+</head>
+<body>
+{image}<h1>{title}</h1>
+<p class="date">{date}</p>
+{teaser}{paragraphs}
+<footer>{footer}</footer>
+</body>
+</html>
+"""
+
+
+def render_html(document):
+    """
+    Render a document as a single self-contained HTML page (the image is
+    embedded as a data URI).
+
+    Parameters:
+    document (ThemeDocument): The document to render
+
+    Returns:
+    bytes: The .html file, UTF-8 encoded
+    """
+    image = ""
+    if document.image:
+        encoded = base64.b64encode(document.image).decode("ascii")
+        mime = "image/png" if document.image.startswith(b"\x89PNG") else "image/jpeg"
+        image = f'<img src="data:{mime};base64,{encoded}" alt="">\n'
+    teaser = f'<p class="teaser">{html.escape(document.teaser)}</p>\n' if document.teaser else ""
+    paragraphs = "".join(f"<p>{html.escape(paragraph)}</p>\n" for paragraph in document.paragraphs)
+    page = _HTML_TEMPLATE.format(
+        lang=locale(document.language)['code'],
+        title=html.escape(document.title),
+        image=image,
+        date=html.escape(document.date),
+        teaser=teaser,
+        paragraphs=paragraphs,
+        footer=html.escape(document.footer),
+    )
+    return page.encode("utf-8")
+
+
+# name -> render function, file extension and MIME type
+FORMATS = {
+    'docx': {'render': render_docx, 'extension': "docx", 'mime': DOCX_MIME},
+    'pdf': {'render': render_pdf, 'extension': "pdf", 'mime': "application/pdf"},
+    'html': {'render': render_html, 'extension': "html", 'mime': "text/html"},
+}
+
+
+def register_format(name, render, extension, mime):
+    """
+    Add an output backend.
+
+    Parameters:
+    name (str): Format name shown to the user
+    render (callable): render(ThemeDocument) -> bytes
+    extension (str): File extension without the dot
+    mime (str): MIME type of the output
+    """
+    FORMATS[name] = {'render': render, 'extension': extension, 'mime': mime}
@@ -0,0 +1,276 @@
+"""
+Process-level stores shared by all sessions, so session state only holds
+compact references.
+
+Without them every Streamlit session keeps its own copy of the mined
+videos of three periods (with full descriptions), the philosophy context
+and the generated themes in every language, and nothing is ever evicted.
+They are kept here once per process instead, and the session keeps IDs:
+
+    videos   one record per video ID with the fields that do not depend on
+             the mining run (title, channel, thumbnails, trimmed
+             description), shared across sessions and periods
+    results  mined results: the per-run fields of each video (counts,
+             category, cluster, scores) as one tuple per video, in order,
+             under a content hash
+    texts    long texts such as the philosophy context, under their hash
+    themes   generated themes and their translations, under the job ID
+
+Each store is bounded and drops its least recently used entries. An
+evicted entry looks missing to the sessions that referred to it: mined
+videos have to be mined again (served by the query cache for a few hours)
+and themes are reloaded from their job.
+
+session_memory_report() estimates what one session holds and
+store_stats() what the stores hold, for the diagnostics panel.
+
+Configuration (environment variables):
+    THEMESEEKER_STORE_VIDEOS      maximum video records (default: 20000)
+    THEMESEEKER_STORE_RESULTS     maximum mined results (default: 300)
+    THEMESEEKER_STORE_THEME_SETS  maximum theme sets (default: 200)
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from tracing import increment_counter
+
+# Video fields that are the same in every mining run
+SHARED_VIDEO_FIELDS = ('title', 'channel', 'channel_id', 'published_at', 'thumbnail', 'thumbnail_small', 'description')
+
+# Descriptions are only needed in full for categorization, before storing
+DESCRIPTION_CHARS = 300
+
+DEFAULT_LIMITS = {'videos': 20000, 'results': 300, 'texts': 50, 'themes': 200}
+
+_LIMIT_VARIABLES = {
+    'videos': "THEMESEEKER_STORE_VIDEOS",
+    'results': "THEMESEEKER_STORE_RESULTS",
+    'themes': "THEMESEEKER_STORE_THEME_SETS",
+}
+
+# Marks a field one video of a result does not have
+_MISSING = object()
+
+_lock = threading.Lock()
+_entries = {store: OrderedDict() for store in DEFAULT_LIMITS}
+_sizes = {store: {} for store in DEFAULT_LIMITS}
+
+
+def store_limit(store):
+    variable = _LIMIT_VARIABLES.get(store)
+    return int(os.environ.get(variable, DEFAULT_LIMITS[store])) if variable else DEFAULT_LIMITS[store]
+
+
+def deep_size(obj):
+    """
+    Estimate the memory of an object and of everything it references,
+    counting shared objects once.
+
+    Parameters:
+    obj: Any Python object
+
+    Returns:
+    int: Estimated bytes
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__slots__'):
+            stack.extend(getattr(item, slot) for slot in item.__slots__ if hasattr(item, slot))
+        elif hasattr(item, '__dict__') and not isinstance(item, type):
+            stack.append(item.__dict__)
+    return total
+
+
+def _content_id(value):
+    material = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def _put(store, key, value):
+    size = deep_size(value)
+    limit = store_limit(store)
+    with _lock:
+        entries = _entries[store]
+        entries[key] = value
+        entries.move_to_end(key)
+        _sizes[store][key] = size
+        while len(entries) > limit:
+            evicted, _ = entries.popitem(last=False)
+            _sizes[store].pop(evicted, None)
+            increment_counter("session_store_evictions", store=store)
+
+
+def _get(store, key):
+    if key is None:
+        return None
+    with _lock:
+        value = _entries[store].get(key)
+        if value is not None:
+            _entries[store].move_to_end(key)
+        return value
+
+
+def _compact(value):
+    # Category names and IDs repeat in every result; keep one copy of each
+    return sys.intern(str(value)) if isinstance(value, str) else value
+
+
+def put_videos(videos):
+    """
+    Store a mined result: the shared fields once per video ID, the per-run
+    fields under the ID of the result.
+
+    Parameters:
+    videos (list): Categorized and ranked video dicts
+
+    Returns:
+    str: Result ID for get_videos()
+    """
+    columns = tuple(field for field in dict.fromkeys(field for video in videos for field in video)
+                    if field not in SHARED_VIDEO_FIELDS)
+    rows = []
+    for video in videos:
+        shared = {field: video[field] for field in SHARED_VIDEO_FIELDS if field in video}
+        if 'description' in shared:
+            shared['description'] = shared['description'][:DESCRIPTION_CHARS]
+        _put('videos', video['video_id'], shared)
+        rows.append(tuple(_compact(video.get(column, _MISSING)) for column in columns))
+    result_id = _content_id([columns, [[None if value is _MISSING else value for value in row] for row in rows]])
+    _put('results', result_id, (columns, tuple(rows)))
+    return result_id
+
+
+def get_videos(result_id):
+    """
+    Rebuild the video dicts of a stored result. The dicts are new on every
+    call, so callers may change them.
+
+    Parameters:
+    result_id (str): ID returned by put_videos()
+
+    Returns:
+    list: Video dicts, or None when the result (or one of its videos) was evicted
+    """
+    stored = _get('results', result_id)
+    if stored is None:
+        return None
+    columns, rows = stored
+    videos = []
+    for row in rows:
+        record = {column: value for column, value in zip(columns, row) if value is not _MISSING}
+        shared = _get('videos', record['video_id'])
+        if shared is None:
+            return None
+        videos.append(dict(shared, **record))
+    return videos
+
+
+def put_text(text):
+    """Store a text once, whatever the number of sessions using it; returns its ID."""
+    text_id = _content_id(text)
+    _put('texts', text_id, text)
+    return text_id
+
+
+def get_text(text_id):
+    """The text stored under an ID, or None."""
+    return _get('texts', text_id)
+
+
+def put_themes(themes, translations=None, key=None):
+    """
+    Store generated themes and their translations.
+
+    Parameters:
+    themes (list): English Theme objects
+    translations (dict): Language -> translated Theme objects
+    key (str): ID of the theme set, e.g. the generation job ID
+               (default: a hash of the themes)
+
+    Returns:
+    str: ID for get_themes()
+    """
+    translations = translations or {}
+    if key is None:
+        key = _content_id([[theme.to_dict() for theme in themes],
+                           {language: [theme.to_dict() for theme in translated]
+                            for language, translated in translations.items()}])
+    _put('themes', key, (tuple(themes), {language: tuple(translated)
+                                         for language, translated in translations.items()}))
+    return key
+
+
+def get_themes(key):
+    """
+    The themes stored under a key.
+
+    Returns:
+    tuple: (list of Theme objects, dict language -> list of Theme objects),
+           or None when the set was evicted
+    """
+    stored = _get('themes', key)
+    if stored is None:
+        return None
+    themes, translations = stored
+    return list(themes), {language: list(translated) for language, translated in translations.items()}
+
+
+def store_stats():
+    """
+    Entries and estimated size of each store.
+
+    Returns:
+    list: Dicts with 'store', 'entries', 'limit' and 'megabytes'
+    """
+    with _lock:
+        return [{
+            'store': store,
+            'entries': len(_entries[store]),
+            'limit': store_limit(store),
+            'megabytes': round(sum(_sizes[store].values()) / (1024 * 1024), 2),
+        } for store in _entries]
+
+
+def session_memory_report(state):
+    """
+    Estimate the memory held by one session's state. Values that are IDs
+    of stored entries are reported with the shared size they refer to.
+
+    Parameters:
+    state (Mapping): The session state (e.g. st.session_state)
+
+    Returns:
+    list: Dicts with 'key', 'bytes' held by the session itself and
+          'shared_bytes' referenced in the stores, largest first
+    """
+    report = []
+    for key, value in list(state.items()):
+        shared = 0
+        if isinstance(value, str):
+            with _lock:
+                shared = sum(sizes.get(value, 0) for sizes in _sizes.values())
+                stored = _entries['results'].get(value)
+                if stored:
+                    # A mined result also refers to its video records
+                    columns, video_rows = stored
+                    position = columns.index('video_id')
+                    shared += sum(_sizes['videos'].get(row[position], 0) for row in video_rows)
+        report.append({'key': str(key), 'bytes': deep_size(value), 'shared_bytes': shared})
+    report.sort(key=lambda row: row['bytes'], reverse=True)
+    return report
@@ -0,0 +1,324 @@
+"""
+Job handlers for the background queue (see jobs.py).
+
+Importing this module registers the job kinds the app submits:
+    generate_themes  optional viewer comment sampling, theme generation and the
+                     translations (Portuguese by default)
+    export_zip       documents of the selected themes (Word, PDF and/or HTML) in a
+                     ZIP, in one language or in English and all translations
+
+Theme generation can also be started speculatively, right after mining and
+before the user asks for it (speculate_generation()). The jobs are parked
+under a key derived from their parameters, so a click on "Generate" with
+the same videos and settings takes over the parked job, which is often
+already done, instead of starting a new one.
+
+With channel_context, the statistics of the videos' channels are fetched
+(channels.py, cached for days) and a per-category summary of the channels
+behind the views is added to the prompt.
+
+Generated themes are checked against the themes of earlier runs
+(theme_history.py) before they are translated. Depending on the job's
+novelty settings, repeats are flagged, dropped, or dropped and replaced by
+asking Gemini for just as many new themes. The themes a job returns are
+added to the history by the page once they are shown, so themes
+pre-generated speculatively and never claimed are not.
+"""
+import hashlib
+import json
+import os
+
+from artifacts import new_artifact_file
+from channels import category_channels, channel_statistics
+from comments import sample_comments, audience_signals
+from documents import create_documents_zip, create_multilingual_zip, zip_filename
+from generation import generate_themes
+from jobs import JobResult, cancel_job, register_job_type, submit_job
+from locales import DEFAULT_TRANSLATIONS, language_label
+from prompt_builder import DEFAULT_TOKEN_BUDGET
+from theme_history import DEFAULT_THRESHOLD, DEFAULT_WEEKS, find_repeats
+from themes import Theme, assign_theme_ids, themes_from_dicts
+from translation import translate_themes
+
+GENERATE_THEMES = "generate_themes"
+EXPORT_ZIP = "export_zip"
+
+# What to do with themes that repeat recent ones
+NOVELTY_MODES = ("flag", "filter", "replace")
+
+# Video fields the theme prompt uses; the rest is not stored with the job
+VIDEO_FIELDS = ('video_id', 'title', 'context', 'view_count', 'cluster_size', 'cluster_view_count',
+                'engagement_score', 'channel', 'channel_id')
+
+
+def generation_params(videos, age_group, philosophy_context="", token_budget=DEFAULT_TOKEN_BUDGET,
+                      comment_sampling=None, languages=None, novelty=None, channel_context=False):
+    """
+    Build the stored parameters of a generate_themes job.
+
+    Parameters:
+    videos (list): Mined video dicts, best ranked first
+    age_group (str): Target age group
+    philosophy_context (str): Cleaned philosophy text, may be empty
+    token_budget (int): Maximum estimated prompt tokens
+    comment_sampling (dict): Optional {'videos': top videos to sample,
+                             'quota_budget': YouTube units} to add audience
+                             signals from viewer comments
+    languages (list): Languages to translate the themes to (default: DEFAULT_TRANSLATIONS)
+    novelty (dict): Optional {'mode': one of NOVELTY_MODES, 'weeks': how far
+                    back to look, 'threshold': similarity of a repeat} to
+                    check the themes against earlier runs
+    channel_context (bool): Add a summary of the channels behind each
+                            category to the prompt
+
+    Returns:
+    dict: Job parameters
+    """
+    return {
+        'videos': [{field: video[field] for field in VIDEO_FIELDS if field in video} for video in videos],
+        'age_group': age_group,
+        'philosophy_context': philosophy_context,
+        'token_budget': token_budget,
+        'comment_sampling': comment_sampling,
+        'languages': list(DEFAULT_TRANSLATIONS if languages is None else languages),
+        'novelty': novelty,
+        'channel_context': channel_context,
+    }
+
+
+def generation_key(params):
+    """
+    Cache key of a generate_themes job: a hash of its canonical parameters.
+
+    Parameters:
+    params (dict): Parameters built by generation_params()
+
+    Returns:
+    str: Hex digest
+    """
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def speculate_generation(videos, age_groups, philosophy_context, token_budget, comment_sampling, languages,
+                         secrets, previous=None, novelty=None, channel_context=False):
+    """
+    Start generation and translation for several age groups ahead of the
+    user's click, parking each job under its generation_key(). Jobs of an
+    earlier speculation that nobody claimed and that no longer match (the
+    video set or the settings changed) are cancelled.
+
+    Parameters:
+    videos (list): Mined video dicts, best ranked first
+    age_groups (list): Age groups to generate for
+    philosophy_context (str): Cleaned philosophy text, may be empty
+    token_budget (int): Maximum estimated prompt tokens
+    comment_sampling (dict): Optional comment sampling settings (see generation_params)
+    languages (list): Languages to translate the themes to
+    secrets (dict): API keys for the jobs
+    previous (dict): Cache key -> job ID returned by the earlier speculation, if any
+    novelty (dict): Optional novelty settings (see generation_params)
+    channel_context (bool): Add the channel summary to the prompt
+
+    Returns:
+    dict: Cache key -> job ID of the speculative jobs
+    """
+    speculative = {}
+    for age_group in age_groups:
+        params = generation_params(videos, age_group, philosophy_context, token_budget, comment_sampling,
+                                   languages, novelty, channel_context)
+        key = generation_key(params)
+        speculative[key] = submit_job(GENERATE_THEMES, params, secrets, cache_key=key)
+    for key, job_id in (previous or {}).items():
+        if key not in speculative:
+            cancel_job(job_id, cache_key=key)
+    return speculative
+
+
+def _comment_signals(params, secrets, progress):
+    """Sample viewer comments when requested; failures only drop the signals."""
+    sampling = params.get('comment_sampling')
+    if not sampling or not secrets.get('youtube_api_key'):
+        return None, None
+    progress(0.02, "Sampling viewer comments")
+    try:
+        comment_stats = sample_comments(secrets['youtube_api_key'], params['videos'],
+                                        sampling['videos'], sampling['quota_budget'])
+        return audience_signals(params['videos'], sampling['videos']), comment_stats
+    except Exception as e:
+        print(f"Comment sampling failed: {str(e)}")
+        return None, {'errors': {'all': str(e)}}
+
+
+def _channel_summary(params, secrets, progress):
+    """Summarize the channels behind each category when requested; without statistics, subscribers are left out."""
+    if not params.get('channel_context'):
+        return None, None
+    progress(0.03, "Summarizing channels")
+    statistics, channel_stats = {}, None
+    if secrets.get('youtube_api_key'):
+        try:
+            statistics, channel_stats = channel_statistics(
+                secrets['youtube_api_key'], [video.get('channel_id') for video in params['videos']])
+        except Exception as e:
+            print(f"Fetching channel statistics failed: {str(e)}")
+            channel_stats = {'errors': [str(e)]}
+    return category_channels(params['videos'], statistics), channel_stats
+
+
+def _novel_themes(themes, params, secrets, signals, progress, channels=None):
+    """
+    Check themes against the history and flag, drop or replace the repeats.
+    A history failure leaves the themes unchecked.
+
+    Returns:
+    tuple: (themes, {theme ID: earlier theme} of flagged repeats, stats)
+    """
+    novelty = params['novelty']
+    weeks = novelty.get('weeks', DEFAULT_WEEKS)
+    threshold = novelty.get('threshold', DEFAULT_THRESHOLD)
+    progress(0.5, "Checking themes against earlier runs")
+    try:
+        repeats = find_repeats(themes, weeks, threshold)
+    except Exception as e:
+        print(f"Theme history check failed: {str(e)}")
+        return themes, {}, {'error': str(e)}
+
+    stats = {'checked': len(themes), 'repeats': sum(repeat is not None for repeat in repeats), 'dropped': 0,
+             'replaced': 0}
+    if novelty['mode'] == "flag":
+        flagged = {theme.theme_id: repeat for theme, repeat in zip(themes, repeats) if repeat}
+        return themes, flagged, stats
+
+    kept = [theme for theme, repeat in zip(themes, repeats) if repeat is None]
+    if novelty['mode'] == "replace" and stats['repeats']:
+        # Ask only for the missing themes, naming the repeated ones to avoid
+        avoid_titles = []
+        for theme, repeat in zip(themes, repeats):
+            if repeat:
+                avoid_titles.extend([theme.title, repeat['title']])
+        progress(0.55, f"Replacing {stats['repeats']} repeated themes")
+        try:
+            replacements, _, _ = generate_themes(
+                secrets['gemini_api_key'], params['videos'], params['age_group'], params['philosophy_context'],
+                params['token_budget'], signals, theme_count=stats['repeats'],
+                avoid_titles=list(dict.fromkeys(avoid_titles)), channel_summary=channels,
+            )
+            # Replacements that still repeat earlier themes are dropped, not retried
+            replacements = [theme for theme, repeat in zip(replacements, find_repeats(replacements, weeks, threshold))
+                            if repeat is None][:stats['repeats']]
+        except Exception as e:
+            print(f"Generating replacement themes failed: {str(e)}")
+            replacements = []
+        stats['replaced'] = len(replacements)
+        kept = assign_theme_ids(kept + replacements)
+    stats['dropped'] = len(themes) - len(kept) + stats['replaced']
+    return kept, {}, stats
+
+
+def run_generation_job(params, secrets, progress):
+    signals, comment_stats = _comment_signals(params, secrets, progress)
+    channels, channel_stats = _channel_summary(params, secrets, progress)
+
+    progress(0.05, "Generating themes")
+    themes, _, prompt_stats = generate_themes(
+        secrets['gemini_api_key'],
+        params['videos'],
+        params['age_group'],
+        params['philosophy_context'],
+        params['token_budget'],
+        signals,
+        channel_summary=channels,
+    )
+    if not themes:
+        raise RuntimeError("Could not find any themes in the model response.")
+
+    repeats, novelty_stats = {}, None
+    if params['novelty']:
+        themes, repeats, novelty_stats = _novel_themes(themes, params, secrets, signals, progress, channels)
+        if not themes:
+            raise RuntimeError("All generated themes repeat recent ones.")
+
+    languages = params['languages']
+    translations, translation_stats = {}, None
+    if languages:
+        progress(0.6, f"Translating themes to {', '.join(language_label(language) for language in languages)}")
+        translations, translation_stats = translate_themes(secrets['gemini_api_key'], themes, languages)
+
+    return JobResult({
+        'themes': [theme.to_dict() for theme in themes],
+        'translations': {language: [theme.to_dict() for theme in translated]
+                         for language, translated in translations.items()},
+        'translation_stats': translation_stats,
+        'prompt_stats': prompt_stats,
+        'repeats': repeats,
+        'novelty_stats': novelty_stats,
+        'audience_signals': signals,
+        'comment_stats': comment_stats,
+        'channel_summary': channels,
+        'channel_stats': channel_stats,
+    })
+
+
+def export_params(selected_themes, language, formats=("docx",)):
+    """
+    Build the stored parameters of an export_zip job.
+
+    Parameters:
+    selected_themes (list): (title, Theme) tuples, or (title, English Theme,
+                            [(language, translated Theme), ...]) tuples when
+                            language is "all"
+    language (str): Language name, or "all" for English and the translations
+    formats (tuple): Names of the output formats
+
+    Returns:
+    dict: Job parameters
+    """
+    params = {
+        'titles': [selected[0] for selected in selected_themes],
+        'themes': [selected[1].to_dict() for selected in selected_themes],
+        'language': language,
+        'formats': list(formats),
+    }
+    if language == "all":
+        params['translations'] = [[[translated_language, theme.to_dict()] for translated_language, theme in selected[2]]
+                                  for selected in selected_themes]
+    return params
+
+
+def run_export_job(params, secrets, progress):
+    titles = params['titles']
+    themes = themes_from_dicts(params['themes'])
+    formats = params['formats']
+    progress(0.0, f"0 of {len(titles)} themes")
+    # The ZIP is written straight to the artifact folder, never held in memory
+    zip_path = new_artifact_file(".zip")
+
+    def theme_done(done, total):
+        progress(done / total, f"{done} of {total} themes")
+
+    if params['language'] == "all":
+        # English and translated documents in one pass, one image per theme
+        translations = [[(language, Theme.from_dict(theme)) for language, theme in translated]
+                        for translated in params['translations']]
+        _, success_count, error_docs = create_multilingual_zip(
+            list(zip(titles, themes, translations)), secrets['gemini_api_key'], progress=theme_done,
+            formats=formats, output=zip_path
+        )
+    else:
+        _, success_count, error_docs = create_documents_zip(
+            list(zip(titles, themes)), secrets['gemini_api_key'], params['language'],
+            progress=theme_done, formats=formats, output=zip_path
+        )
+    if success_count == 0:
+        os.remove(zip_path)
+        raise RuntimeError(f"Failed to generate {len(error_docs)} documents")
+    return JobResult(
+        {'success_count': success_count, 'error_docs': error_docs},
+        artifact_name=zip_filename(params['language']),
+        artifact_path=zip_path,
+    )
+
+
+register_job_type(GENERATE_THEMES, run_generation_job)
+register_job_type(EXPORT_ZIP, run_export_job)
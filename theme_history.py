@@ -0,0 +1,234 @@
+"""
+History of generated themes, to catch themes that repeat earlier ones.
+
+Every generated theme is stored in a SQLite table with the MinHash
+signature (clustering.py) of its normalized title and description. Similar
+weekly trends tend to bring back near-identical themes; find_repeats()
+compares new themes with the ones generated in the last weeks, so repeats
+can be flagged, dropped, or replaced before they are translated and turned
+into documents.
+
+Lookups go through a MinHash LSH index kept in memory per process: the
+band keys of all stored signatures, sorted per band, so the candidates of a
+theme are found with a binary search per band instead of a scan of the
+whole history. Candidates are confirmed by their estimated Jaccard
+similarity. The index is loaded from the table on first use and extended
+with rows added since, also by other processes.
+
+Configuration (environment variables):
+    THEMESEEKER_THEME_HISTORY  path of the SQLite database (default: data/theme_history.sqlite3)
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from clustering import BANDS, NUM_PERM, band_keys, minhash_signatures, normalize_title
+from tracing import trace_span, increment_counter
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "theme_history.sqlite3")
+
+# Themes generated within this many weeks count as recent
+DEFAULT_WEEKS = 8
+
+# Estimated Jaccard similarity from which a theme repeats an earlier one
+DEFAULT_THRESHOLD = 0.6
+
+WEEK = 7 * 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS themes (
+    theme_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    age_group TEXT,
+    created_at REAL NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS themes_created ON themes (created_at);
+"""
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def db_path():
+    return os.environ.get("THEMESEEKER_THEME_HISTORY", DEFAULT_DB_PATH)
+
+
+def _connect():
+    path = db_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def theme_text(title, description=""):
+    """Comparison text of a theme: normalized title and description."""
+    return f"{normalize_title(title or '')} {normalize_title(description or '')}".strip()
+
+
+def theme_signatures(themes):
+    """MinHash signatures of themes, one row per theme."""
+    return minhash_signatures([theme_text(theme.title, theme.description) for theme in themes], NUM_PERM)
+
+
+def _empty_index():
+    return {
+        'last_rowid': 0,
+        'rowids': np.empty(0, dtype=np.int64),
+        'created': np.empty(0, dtype=np.float64),
+        'signatures': np.empty((0, NUM_PERM), dtype=np.uint32),
+        'order': np.empty((BANDS, 0), dtype=np.int64),
+        'sorted_keys': np.empty((BANDS, 0), dtype=np.uint64),
+    }
+
+
+def _load_index(conn):
+    """The LSH index of the database, extended with the rows added since it was last read."""
+    path = db_path()
+    index = _indexes.get(path) or _empty_index()
+    rows = conn.execute(
+        "SELECT rowid, created_at, signature FROM themes WHERE rowid > ? ORDER BY rowid", (index['last_rowid'],)
+    ).fetchall()
+    if not rows:
+        _indexes[path] = index
+        return index
+
+    with trace_span("theme_history.index", rows=len(rows)):
+        rowids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        created = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        signatures = np.frombuffer(b"".join(row[2] for row in rows), dtype=np.uint32).reshape(len(rows), NUM_PERM)
+        index = {
+            'last_rowid': int(rowids[-1]),
+            'rowids': np.concatenate([index['rowids'], rowids]),
+            'created': np.concatenate([index['created'], created]),
+            'signatures': np.concatenate([index['signatures'], signatures]),
+        }
+        keys = band_keys(index['signatures']).T
+        index['order'] = np.argsort(keys, axis=1, kind='stable')
+        index['sorted_keys'] = np.take_along_axis(keys, index['order'], axis=1)
+    _indexes[path] = index
+    return index
+
+
+def _candidates(index, keys):
+    """Positions in the index sharing at least one band key with a query signature."""
+    found = []
+    for band in range(BANDS):
+        sorted_keys = index['sorted_keys'][band]
+        start = np.searchsorted(sorted_keys, keys[band], side='left')
+        end = np.searchsorted(sorted_keys, keys[band], side='right')
+        if end > start:
+            found.append(index['order'][band][start:end])
+    return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+
+def find_repeats(themes, weeks=DEFAULT_WEEKS, threshold=DEFAULT_THRESHOLD, now=None):
+    """
+    Find, for each theme, the most similar theme of the last weeks.
+
+    Parameters:
+    themes (list): Theme objects
+    weeks (float): How far back to look
+    threshold (float): Minimum estimated Jaccard similarity of a repeat
+    now (float): Current Unix time (default: time.time())
+
+    Returns:
+    list: One entry per theme: None, or a dict with the earlier theme's
+          'theme_id', 'title', 'created_at' and the 'similarity'
+    """
+    if not themes:
+        return []
+    cutoff = (now or time.time()) - weeks * WEEK
+    signatures = theme_signatures(themes)
+    query_keys = band_keys(signatures)
+    conn = _connect()
+    try:
+        with _lock:
+            index = _load_index(conn)
+        best = []
+        with trace_span("theme_history.lookup", themes=len(themes), history=len(index['rowids'])):
+            for signature, keys in zip(signatures, query_keys):
+                positions = _candidates(index, keys)
+                positions = positions[index['created'][positions] >= cutoff]
+                if len(positions) == 0:
+                    best.append(None)
+                    continue
+                similarity = (index['signatures'][positions] == signature).mean(axis=1)
+                top = int(np.argmax(similarity))
+                best.append((int(index['rowids'][positions[top]]), float(similarity[top]))
+                            if similarity[top] >= threshold else None)
+
+        repeats = []
+        for match in best:
+            row = None
+            if match:
+                row = conn.execute("SELECT theme_id, title, created_at FROM themes WHERE rowid = ?",
+                                   (match[0],)).fetchone()
+            if row is None:
+                repeats.append(None)
+                continue
+            repeats.append({'theme_id': row[0], 'title': row[1], 'created_at': row[2], 'similarity': match[1]})
+    finally:
+        conn.close()
+    increment_counter("theme_repeats", sum(repeat is not None for repeat in repeats))
+    return repeats
+
+
+def record_themes(themes, age_group=None, now=None):
+    """
+    Add themes to the history. Themes already stored (same ID) are kept
+    with their original date.
+
+    Parameters:
+    themes (list): Theme objects
+    age_group (str): Age group they were generated for
+    now (float): Unix time to record (default: time.time())
+    """
+    if not themes:
+        return
+    created_at = now or time.time()
+    signatures = theme_signatures(themes)
+    conn = _connect()
+    try:
+        conn.executemany(
+            "INSERT OR IGNORE INTO themes (theme_id, title, description, age_group, created_at, signature) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(theme.theme_id, theme.title, theme.description, age_group, created_at, signature.tobytes())
+             for theme, signature in zip(themes, signatures)],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def history_stats():
+    """
+    Size and time span of the theme history.
+
+    Returns:
+    dict: 'themes', and 'oldest'/'newest' Unix times (None when empty)
+    """
+    conn = _connect()
+    try:
+        count, oldest, newest = conn.execute("SELECT COUNT(*), MIN(created_at), MAX(created_at) FROM themes").fetchone()
+    finally:
+        conn.close()
+    return {'themes': count, 'oldest': oldest, 'newest': newest}
+
+
+def clear_history():
+    """Forget all stored themes."""
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM themes")
+        conn.commit()
+    finally:
+        conn.close()
+    with _lock:
+        _indexes.pop(db_path(), None)
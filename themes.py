@@ -0,0 +1,164 @@
+"""
+Typed lecture theme objects and the schema Gemini is asked to fill in.
+
+Every theme carries a stable ID derived from a hash of its content when it
+is generated. A translation inherits the ID of the theme it translates, so
+one ID names the same theme in every language and can key selections,
+pairings and caches.
+"""
+import hashlib
+from dataclasses import dataclass, asdict
+
+# Fields every theme object carries, in the order they are generated
+THEME_FIELDS = [
+    "title",
+    "description",
+    "age_resonance",
+    "philosophical_connection",
+    "lecture_outline",
+    "teaser",
+    "full_text",
+]
+
+# Length of the hex content hash used as theme ID
+THEME_ID_LENGTH = 12
+
+# Response schema for Gemini structured output: an array of theme objects
+# whose fields are all required strings
+THEME_RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {field: {"type": "STRING"} for field in THEME_FIELDS},
+        "required": THEME_FIELDS,
+    },
+}
+
+
+@dataclass
+class Theme:
+    """
+    A single lecture theme, in whatever language it was generated or
+    translated to. Slots keep the many themes held in session state small.
+    """
+    __slots__ = tuple(THEME_FIELDS) + ("theme_id",)
+
+    title: str
+    description: str
+    age_resonance: str
+    philosophical_connection: str
+    lecture_outline: str
+    teaser: str
+    full_text: str
+    theme_id: str
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a theme from a dictionary, filling missing fields with "".
+        Without a 'theme_id' key, the ID is the hash of the content.
+
+        Parameters:
+        data (dict): Theme data using the THEME_FIELDS keys
+
+        Returns:
+        Theme: The typed theme
+        """
+        content = {field: str(data.get(field) or "") for field in THEME_FIELDS}
+        return cls(**content, theme_id=str(data.get('theme_id') or content_hash(content)))
+
+    def to_dict(self):
+        """Return the theme, including its ID, as a plain dictionary."""
+        return asdict(self)
+
+    def content_dict(self):
+        """Return only the generated fields (e.g. for JSON prompts)."""
+        return {field: getattr(self, field) for field in THEME_FIELDS}
+
+
+def content_hash(content):
+    """
+    Hash the generated fields of a theme into a short hex ID.
+
+    Parameters:
+    content (dict): Theme data using the THEME_FIELDS keys
+
+    Returns:
+    str: THEME_ID_LENGTH hex characters
+    """
+    digest = hashlib.sha1("\x1f".join(content.get(field, "") for field in THEME_FIELDS).encode("utf-8"))
+    return digest.hexdigest()[:THEME_ID_LENGTH]
+
+
+def themes_from_dicts(items):
+    """
+    Convert a list of theme dictionaries into Theme objects.
+
+    Parameters:
+    items (list): Theme dictionaries (e.g. from json_extract)
+
+    Returns:
+    list: Theme objects
+    """
+    return [Theme.from_dict(item) for item in items]
+
+
+def assign_theme_ids(themes):
+    """
+    Give generated themes their content-hash IDs, making IDs unique within
+    the list (identical themes get "-2", "-3", ... suffixes).
+
+    Parameters:
+    themes (list): Theme objects, updated in place
+
+    Returns:
+    list: The same themes
+    """
+    seen = {}
+    for theme in themes:
+        base = content_hash(theme.content_dict())
+        seen[base] = seen.get(base, 0) + 1
+        theme.theme_id = base if seen[base] == 1 else f"{base}-{seen[base]}"
+    return themes
+
+
+def inherit_theme_ids(translated_themes, original_themes):
+    """
+    Give each translated theme the ID of the theme it translates. The
+    translation keeps the order of the themes, so this is the one place
+    where they are matched by position.
+
+    Parameters:
+    translated_themes (list): Theme objects returned by the translation
+    original_themes (list): The themes that were translated
+    """
+    for translated, original in zip(translated_themes, original_themes):
+        translated.theme_id = original.theme_id
+
+
+def index_themes(themes):
+    """
+    Index themes by ID.
+
+    Parameters:
+    themes (list): Theme objects
+
+    Returns:
+    dict: theme_id -> Theme, in list order
+    """
+    return {theme.theme_id: theme for theme in themes}
+
+
+def pair_themes(english_themes, portuguese_themes):
+    """
+    Pair each English theme with its Portuguese translation by theme ID.
+
+    Parameters:
+    english_themes (list): Theme objects in English
+    portuguese_themes (list): The translated Theme objects
+
+    Returns:
+    list: (English Theme, Portuguese Theme or None) tuples
+    """
+    portuguese_index = index_themes(portuguese_themes)
+    return [(theme, portuguese_index.get(theme.theme_id)) for theme in english_themes]
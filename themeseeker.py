@@ -1,25 +1,46 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-import googleapiclient.discovery
-import googleapiclient.errors
-import google.generativeai as genai
 import os
-from googleapiclient.discovery import build
 import re
 from bs4 import BeautifulSoup
 import html
-import io
-import docx
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from PIL import Image
-import requests
-from io import BytesIO
 import hashlib
-import base64
 import json
-import zipfile
+import logging
+from themes import Theme, themes_from_dicts, index_themes
+from category_index import categorize_videos
+from documents import cached_documents, cached_multilingual_documents, document_filename, FORMATS
+from document_cache import get_document, cache_stats, clear_cache
+from context_cache import context_cache_stats, clear_context_caches
+from translation import translation_memory_stats, clear_translation_memory
+from session_store import (put_videos, get_videos, put_text, get_text, put_themes, get_themes, store_stats,
+                           session_memory_report)
+from theme_history import history_stats, clear_history, record_themes, DEFAULT_WEEKS, DEFAULT_THRESHOLD as REPEAT_THRESHOLD
+from locales import TRANSLATION_LANGUAGES, DEFAULT_TRANSLATIONS, SOURCE_LANGUAGE, language_label, ui_label
+from artifacts import artifact_url, start_artifact_server
+from jobs import submit_job, claim_cached_job, get_job, list_jobs, start_workers, QUEUED, RUNNING, FAILED
+from tasks import GENERATE_THEMES, EXPORT_ZIP, NOVELTY_MODES, generation_params, generation_key, speculate_generation, export_params
+from youtube_mining import mine_period, DEFAULT_QUERIES, DEFAULT_QUOTA_BUDGET, QUERY_QUOTA_COST
+from thumbnails import proxied_thumbnail_urls
+from tracing import stage_summary, counter_summary, recent_spans, metrics_text, start_metrics_server
+from clustering import cluster_videos, DEFAULT_THRESHOLD
+from ranking import rank_videos, SCORING_FORMULAS, DEFAULT_FORMULA
+from prompt_builder import DEFAULT_TOKEN_BUDGET, AGE_CHARACTERISTICS
+from comments import DEFAULT_VIDEOS, DEFAULT_COMMENT_QUOTA
+from channels import channel_statistics, channel_table
+
+# Log prompt sizes and token usage to the console
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+# Expose /metrics when THEMESEEKER_METRICS_PORT is set
+start_metrics_server()
+
+# Run theme generation and ZIP exports on background workers
+start_workers()
+
+# Stream job artifacts from disk when THEMESEEKER_ARTIFACT_PORT is set
+start_artifact_server()
 
 # Set page config
 st.set_page_config(
@@ -35,11 +56,7 @@ This application mines popular YouTube videos related to spirituality from diffe
 and uses Gemini AI to suggest thematic content for lectures targeting various age groups.
 """)
 
-# Initialize session state for philosophy context and themes
-if 'philosophy_context' not in st.session_state:
-    st.session_state['philosophy_context'] = ""
-if 'generated_themes' not in st.session_state:
-    st.session_state['generated_themes'] = []
+# Initialize session state; videos, texts and themes are kept in session_store.py and referenced by ID
 if 'selected_theme_index' not in st.session_state:
     st.session_state['selected_theme_index'] = None
 
@@ -55,8 +72,81 @@ with st.sidebar:
         gemini_api_key = os.environ.get("GEMINI_API_KEY", "")
     
     st.header("Search Parameters")
-    search_query = st.text_input("Search Query", value="spirituality philosophy meaning of life")
-    max_results = st.slider("Maximum Videos per Time Period", 5, 50, 20)
+    search_queries_text = st.text_area(
+        "Search Queries (one per line)",
+        value="\n".join(DEFAULT_QUERIES),
+        help="Each query is mined separately for every period; results are merged and re-ranked"
+    )
+    search_queries = [line.strip() for line in search_queries_text.splitlines() if line.strip()]
+    max_results = st.slider("Maximum Videos per Query", 5, 50, 20)
+    quota_budget = st.number_input(
+        "YouTube Quota Budget per Period (units)", min_value=QUERY_QUOTA_COST, max_value=10000,
+        value=DEFAULT_QUOTA_BUDGET, step=QUERY_QUOTA_COST,
+        help=f"Each uncached query costs {QUERY_QUOTA_COST} units; cached queries are free"
+    )
+    token_budget = st.slider("Prompt Token Budget", 1000, 16000, DEFAULT_TOKEN_BUDGET, step=500,
+                             help="Upper bound on the estimated size of the theme generation prompt")
+    similarity_threshold = st.slider("Duplicate Similarity Threshold", 0.4, 0.95, DEFAULT_THRESHOLD, step=0.05,
+                                     help="Titles at least this similar are treated as re-uploads of the same video")
+    ranking_formula = st.selectbox(
+        "Ranking", list(SCORING_FORMULAS), index=list(SCORING_FORMULAS).index(DEFAULT_FORMULA),
+        help="trending: views per day, reach, likes and comments per view, compared within each period; "
+             "engagement: likes and comments per view first; views: total views only"
+    )
+    
+    st.header("Viewer Comments")
+    sample_viewer_comments = st.checkbox(
+        "Add audience signals from comments", value=False,
+        help="Samples the top comment threads of the best ranked videos and tells the model what viewers discuss"
+    )
+    comment_videos = st.slider("Videos to sample", 5, 50, DEFAULT_VIDEOS, disabled=not sample_viewer_comments)
+    comment_quota = st.number_input(
+        "Comment Quota Budget (units)", min_value=1, max_value=1000, value=DEFAULT_COMMENT_QUOTA,
+        disabled=not sample_viewer_comments,
+        help="One unit per page of comment threads; comments already sampled are reused"
+    )
+    comment_sampling = {'videos': comment_videos, 'quota_budget': comment_quota} if sample_viewer_comments else None
+    
+    st.header("Channels")
+    channel_context = st.checkbox(
+        "Add channel summary to the prompt", value=False,
+        help="Tells the model which channels account for the views of each category, with their subscribers; "
+             "channel statistics cost one quota unit per 50 channels and are reused for a week"
+    )
+    
+    st.header("Translation")
+    translation_languages = st.multiselect(
+        "Translate themes to", TRANSLATION_LANGUAGES, default=DEFAULT_TRANSLATIONS, format_func=language_label,
+        help="All languages are translated at once; sentences and terms translated before are reused"
+    )
+    
+    st.header("Theme Novelty")
+    novelty_mode = st.selectbox(
+        "Themes similar to recent ones", ("off",) + NOVELTY_MODES,
+        format_func={'off': "Keep (no check)", 'flag': "Flag", 'filter': "Remove",
+                     'replace': "Replace with new themes"}.get,
+        help="Compares new themes with the themes generated in the last weeks; replacing asks the model only "
+             "for as many new themes as were removed"
+    )
+    novelty_weeks = st.slider("Weeks to look back", 1, 52, DEFAULT_WEEKS, disabled=novelty_mode == "off")
+    novelty_threshold = st.slider(
+        "Similarity threshold", 0.3, 0.95, REPEAT_THRESHOLD, step=0.05, disabled=novelty_mode == "off",
+        help="Estimated word overlap of title and description from which a theme counts as a repeat"
+    )
+    novelty = None if novelty_mode == "off" else {
+        'mode': novelty_mode, 'weeks': novelty_weeks, 'threshold': novelty_threshold
+    }
+    
+    st.header("Pre-generation")
+    speculative_generation = st.checkbox(
+        "Pre-generate themes after mining", value=False,
+        help="Generates and translates themes in the background as soon as a period is mined, so they are "
+             "usually ready when you click Generate. Uses Gemini quota even if the themes are never requested"
+    )
+    speculative_age_groups = st.multiselect(
+        "Age groups to pre-generate", list(AGE_CHARACTERISTICS), default=list(AGE_CHARACTERISTICS)[:1],
+        disabled=not speculative_generation
+    )
     
     # Instead of file upload, we'll load the HTML content from the provided file
     st.header("Philosophy Context")
@@ -87,9 +177,6 @@ with st.sidebar:
 </html>
         """
         
-        # Store the raw HTML content
-        st.session_state['philosophy_context'] = content
-        
         # Extract text from HTML using BeautifulSoup
         soup = BeautifulSoup(content, 'html.parser')
         
@@ -105,8 +192,8 @@ with st.sidebar:
         chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
         cleaned_text = '\n'.join(chunk for chunk in chunks if chunk)
         
-        # Store cleaned text
-        st.session_state['philosophy_context_cleaned'] = cleaned_text
+        # Store the cleaned text once per process; the session keeps its ID
+        st.session_state['philosophy_context_id'] = put_text(cleaned_text)
         
         # Show a sample of the extracted text
         with st.expander("Preview extracted text"):
@@ -132,272 +219,217 @@ def get_date_for_period(period):
         
     return past_date.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-# Function to get popular videos from YouTube
-def get_popular_videos(api_key, query, max_results, published_after):
-    try:
-        youtube = build("youtube", "v3", developerKey=api_key)
-        
-        # First get video IDs from search
-        search_request = youtube.search().list(
-            part="id,snippet",
-            q=query,
-            type="video",
-            order="viewCount",
-            publishedAfter=published_after,
-            maxResults=max_results
-        )
-        search_response = search_request.execute()
-        
-        # Extract video IDs
-        video_ids = [item['id']['videoId'] for item in search_response['items']]
-        
-        # Get detailed video statistics
-        videos_request = youtube.videos().list(
-            part="snippet,statistics",
-            id=','.join(video_ids)
-        )
-        videos_response = videos_request.execute()
-        
-        # Process and return the results
-        results = []
-        for item in videos_response['items']:
-            results.append({
-                'title': item['snippet']['title'],
-                'channel': item['snippet']['channelTitle'],
-                'published_at': item['snippet']['publishedAt'],
-                'view_count': int(item['statistics'].get('viewCount', 0)),
-                'like_count': int(item['statistics'].get('likeCount', 0)),
-                'comment_count': int(item['statistics'].get('commentCount', 0)),
-                'video_id': item['id'],
-                'thumbnail': item['snippet']['thumbnails']['high']['url'],
-                'description': item['snippet']['description']
-            })
-        
-        # Sort by view count
-        results.sort(key=lambda x: x['view_count'], reverse=True)
-        return results
-    
-    except Exception as e:
-        st.error(f"Error fetching YouTube data: {str(e)}")
+# Function to report what a multi-query mining run cost
+def show_mining_stats(stats):
+    st.caption(
+        f"{stats['queries_run']} queries run, {stats['queries_cached']} from cache | "
+        f"{stats['quota_used']} quota units used"
+    )
+    if stats['queries_skipped']:
+        st.warning(f"Quota budget reached, skipped: {', '.join(stats['queries_skipped'])}")
+    for query, error in stats['errors'].items():
+        st.error(f"Error fetching YouTube data for '{query}': {error}")
+
+# Function to get the mined videos of a period; a result evicted from the shared store counts as not mined
+def session_videos(session_key):
+    videos = get_videos(st.session_state.get(session_key))
+    if videos is None:
+        st.session_state.pop(session_key, None)
         return []
+    return videos
+
+# Function to get the generated themes and their translations
+def session_themes():
+    return get_themes(st.session_state.get('theme_set')) or ([], {})
 
-# Function to generate brief context for each video
-def generate_video_context(title, description):
-    # Extract first 200 characters of description or less
-    brief_desc = description[:200] + "..." if len(description) > 200 else description
+# Function to get the cleaned philosophy context
+def session_philosophy_context():
+    return get_text(st.session_state.get('philosophy_context_id')) or ""
+
+# Function to remember a job in the session and in the page URL, so it survives a browser refresh
+def track_job(session_key, job_id):
+    st.session_state[session_key] = job_id
+    st.query_params[session_key] = job_id
+
+# Function to look up the job tracked under a key, from the session or the page URL
+def tracked_job(session_key):
+    job_id = st.session_state.get(session_key) or st.query_params.get(session_key)
+    if not job_id:
+        return None
+    st.session_state[session_key] = job_id
+    return get_job(job_id)
+
+# Function to show the progress of a queued or running job, refreshing until it finishes
+@st.fragment(run_every=1)
+def show_job_progress(job_id, label):
+    job = get_job(job_id)
+    if job is None or job['status'] not in (QUEUED, RUNNING):
+        # Rerun the whole page so the result is shown
+        st.rerun()
+    st.progress(job['progress'], text=f"{label} {job['message'] or job['status']}...")
+
+# Function to display generated themes in English and every translation
+def show_generated_themes(themes, translations, prompt_stats=None, audience_signals=None, repeats=None,
+                          novelty_stats=None, channel_summary=None):
+    st.markdown("## Generated Themes")
     
-    # Simple rule-based contextualizing (could be replaced with more sophisticated NLP)
-    context = ""
+    # Show what the check against earlier runs removed or replaced
+    if novelty_stats and novelty_stats.get('dropped'):
+        replaced_note = f", {novelty_stats['replaced']} replaced" if novelty_stats['replaced'] else ""
+        st.caption(
+            f"{novelty_stats['dropped']} of {novelty_stats['checked']} themes repeated recent ones and were "
+            f"removed{replaced_note}"
+        )
     
-    if re.search(r'meditation|mindfulness', title.lower() + brief_desc.lower()):
-        context = "Meditation/Mindfulness practice"
-    elif re.search(r'buddhis|zen|tao', title.lower() + brief_desc.lower()):
-        context = "Eastern philosophy"
-    elif re.search(r'christian|jesus|bible|faith', title.lower() + brief_desc.lower()):
-        context = "Christian spirituality"
-    elif re.search(r'islam|muslim|quran', title.lower() + brief_desc.lower()):
-        context = "Islamic spirituality"
-    elif re.search(r'judaism|jewish|torah', title.lower() + brief_desc.lower()):
-        context = "Jewish spirituality"
-    elif re.search(r'hindu|vedanta|yoga', title.lower() + brief_desc.lower()):
-        context = "Hindu spirituality"
-    elif re.search(r'consciousness|awareness', title.lower() + brief_desc.lower()):
-        context = "Consciousness exploration"
-    elif re.search(r'psychedelic|plant medicine|ayahuasca|dmt', title.lower() + brief_desc.lower()):
-        context = "Psychedelic spirituality"
-    elif re.search(r'near death|afterlife|heaven', title.lower() + brief_desc.lower()):
-        context = "Afterlife exploration"
-    elif re.search(r'science|physics|quantum', title.lower() + brief_desc.lower()):
-        context = "Science and spirituality"
-    elif re.search(r'gnosticism|gnostic|consciousness|awareness', title.lower() + brief_desc.lower()):
-        context = "Gnosticism"
-    else:
-        context = "General spiritual content"
+    # Show what viewers discuss, as given to the model
+    if audience_signals:
+        with st.expander("Audience signals from viewer comments"):
+            st.dataframe(pd.DataFrame([{
+                'Category': signal['category'],
+                'Comments': signal['comments'],
+                'Likes': signal['likes'],
+                'Keywords': ", ".join(signal['keywords']),
+            } for signal in audience_signals]), hide_index=True)
     
-    return context
-
-# NEW JSON-based function to generate lecture themes
-def generate_lecture_themes_json(api_key, video_data, age_group):
-    """
-    Generate lecture themes using Gemini API with structured JSON output
-    to avoid parsing issues later.
+    # Show who drives each category, as given to the model
+    if channel_summary:
+        with st.expander("Channels behind the trends"):
+            st.dataframe(pd.DataFrame([{
+                'Category': entry['category'],
+                'Share of Views': entry['view_share'],
+                'Channels': entry['channels'],
+                'Top Channels': "; ".join(f"{channel['channel']} ({channel['view_share']:.0%})"
+                                          for channel in entry['top_channels']),
+            } for entry in channel_summary]), hide_index=True)
     
-    Parameters:
-    api_key (str): Gemini API key
-    video_data (list): List of dicts containing video title and context
-    age_group (str): Target age group (e.g., "20-30", "30-40", etc.)
+    # Show how much of the prompt budget was used
+    if prompt_stats:
+        cached_note = f" ({prompt_stats['tokens_cached']:,} from cached context)" if prompt_stats.get('tokens_cached') else ""
+        st.caption(
+            f"Prompt: {prompt_stats['tokens_in']:,} tokens in{cached_note} / {prompt_stats['tokens_out']:,} tokens out | "
+            f"{prompt_stats['titles_included']} of {prompt_stats['distinct_titles']} distinct titles "
+            f"({prompt_stats['videos']} videos)"
+        )
     
-    Returns:
-    list: A list of theme dictionaries with structured data
+    # Display the parsed themes, one tab per language with labels in that language
+    languages = [(SOURCE_LANGUAGE, themes)] + list(translations.items())
+    tabs = st.tabs([language_label(language) for language, _ in languages])
+    
+    for tab, (language, language_themes) in zip(tabs, languages):
+        with tab:
+            for i, theme in enumerate(language_themes):
+                st.markdown(f"### {i+1}. {theme.title or ui_label(language, 'untitled')}")
+                
+                # Translations share the ID of their English theme, so flags show in every tab
+                repeat = (repeats or {}).get(theme.theme_id)
+                if repeat:
+                    generated_on = datetime.fromtimestamp(repeat['created_at']).strftime("%Y-%m-%d")
+                    st.warning(f"Similar to \"{repeat['title']}\", generated on {generated_on} "
+                               f"(similarity {repeat['similarity']:.0%})")
+                
+                if theme.description:
+                    st.markdown(f"**{ui_label(language, 'description')}:** {theme.description}")
+                
+                if theme.teaser:
+                    st.markdown(f"**{ui_label(language, 'teaser')}:** *{theme.teaser}*")
+                
+                with st.expander(ui_label(language, 'details')):
+                    if theme.age_resonance:
+                        st.markdown(f"**{ui_label(language, 'age_resonance')}:** {theme.age_resonance}")
+                    
+                    if theme.philosophical_connection:
+                        st.markdown(f"**{ui_label(language, 'philosophical_connection')}:** {theme.philosophical_connection}")
+                    
+                    if theme.lecture_outline:
+                        st.markdown(f"**{ui_label(language, 'lecture_outline')}:**\n{theme.lecture_outline}")
+                    
+                    if theme.full_text:
+                        st.markdown(f"**{ui_label(language, 'full_text')}:**\n{theme.full_text}")
+
+# Function to label themes for selection; repeated titles are numbered so file names stay unique
+def theme_option_labels(themes, english=True):
+    labels = {}
+    seen = {}
+    for i, theme in enumerate(themes):
+        # Remove any markdown formatting
+        title = theme.title.replace('*', '').replace('#', '').strip()
+        if not title:
+            title = f"Theme {i+1}" if english else f"Tema {i+1}"
+        seen[title] = seen.get(title, 0) + 1
+        labels[theme.theme_id] = title if seen[title] == 1 else f"{title} ({seen[title]})"
+    return labels
+
+
+# Function to show download buttons for documents kept in the document cache
+def show_individual_documents(entries):
     """
-    try:
-        # Configure the Gemini API
-        genai.configure(api_key=api_key)
-        
-        # Initialize with the appropriate model
-        try:
-            models = genai.list_models()
-            # Try to find gemini-2.0-flash or the best available model
-            gemini_model = None
-            for model_name in [m.name for m in models]:
-                if 'gemini-2.0-flash' in model_name:
-                    gemini_model = model_name
-                    break
-            if not gemini_model:
-                for model_name in [m.name for m in models]:
-                    if 'gemini' in model_name:
-                        gemini_model = model_name
-                        break
-            if not gemini_model:
-                gemini_model = 'gemini-2.0-flash'  # Default fallback
-        except:
-            gemini_model = 'gemini-2.0-flash'  # Default if we can't list models
-        
-        model = genai.GenerativeModel(gemini_model)
-        
-        # Prepare prompt with video titles and contexts
-        titles_context = "\n".join([f"- {video['title']} ({video['context']})" for video in video_data])
-        
-        # Define age group characteristics
-        age_characteristics = {
-            "20-30": "digital natives, social media focused, seeking authenticity, concerned about climate crisis, mental health aware",
-            "30-40": "career-focused, starting families, balancing work-life, health conscious, pragmatic spirituality",
-            "40-50": "mid-life reflection, established careers, parenting teens, seeking deeper meaning, stress management",
-            "50-60": "empty nest transitions, career peak or change, caring for aging parents, legacy considerations",
-            "60+": "retirement planning/living, health challenges, grandparenting, mortality awareness, wisdom sharing"
-        }
-        
-        # Get philosophical context if available
-        philosophy_context = ""
-        if 'philosophy_context_cleaned' in st.session_state and st.session_state['philosophy_context_cleaned']:
-            full_context = st.session_state['philosophy_context_cleaned']
-            # Limit context length to avoid token limits
-            if len(full_context) > 10000:
-                philosophy_context = full_context[:10000] + "..."
-            else:
-                philosophy_context = full_context
-        
-        # New prompt that requests JSON output
-        if philosophy_context:
-            prompt = f"""
-As a spiritual content creator for a philosophical school of thought, analyze these trending YouTube video titles related to spirituality:
-
-{titles_context}
-
-The philosophical school has the following context, which should guide your suggestions:
-----
-{philosophy_context}
-----
-
-Based on these trends and the philosophical context, create 10 compelling lecture themes that would resonate specifically with people aged {age_group} years. 
-Consider that this age group typically has these characteristics: {age_characteristics.get(age_group, "")}.
-
-Make sure your suggested themes align with the philosophical approach described in the context.
+    Show one download button per built document, reading the files from the
+    document cache.
 
-IMPORTANT: Return your response in a valid JSON format with an array of 10 theme objects. Each theme object must have these exact fields:
-{{
-  "title": "The catchy title that reflects both current trends and philosophical approach",
-  "description": "A short description (2-3 sentences)",
-  "age_resonance": "Explanation of why this theme resonates with this specific age group",
-  "philosophical_connection": "Brief note on how it connects to the philosophical context",
-  "lecture_outline": "An outline for a 30-minute lecture based on the theme",
-  "teaser": "A 50-60 word teaser that would be compelling for marketing purposes",
-  "full_text": "A 500-word text that expands on the theme for a document/flyer"
-}}
-
-Make sure all fields are properly escaped for valid JSON and that the entire response is a valid JSON array.
-"""
-        else:
-            # JSON prompt without philosophical context
-            prompt = f"""
-As a spiritual content creator, analyze these trending YouTube video titles related to spirituality:
-
-{titles_context}
-
-Based on these trends, create 10 compelling lecture themes that would resonate specifically with people aged {age_group} years. 
-Consider that this age group typically has these characteristics: {age_characteristics.get(age_group, "")}.
-
-IMPORTANT: Return your response in a valid JSON format with an array of 10 theme objects. Each theme object must have these exact fields:
-{{
-  "title": "The catchy title that reflects both current trends and philosophical approach",
-  "description": "A short description (2-3 sentences)",
-  "age_resonance": "Explanation of why this theme resonates with this specific age group",
-  "philosophical_connection": "Brief note on how it connects to current spiritual trends",
-  "lecture_outline": "An outline for a 30-minute lecture based on the theme",
-  "teaser": "A 50-60 word teaser that would be compelling for marketing purposes",
-  "full_text": "A 500-word text that expands on the theme for a document/flyer"
-}}
-
-Make sure all fields are properly escaped for valid JSON and that the entire response is a valid JSON array.
-"""
+    Parameters:
+    entries (list): Dicts with label, file_name, format and cache_key
+    """
+    for entry in entries:
+        data = get_document(entry['cache_key'], record=False)
+        if data is None:
+            # Evicted since it was built; the next "Generate" rebuilds it
+            continue
+        st.download_button(
+            label=entry['label'],
+            data=data,
+            file_name=entry['file_name'],
+            mime=FORMATS[entry['format']]['mime'],
+            key=f"download_{entry['file_name']}"  # Unique key for each button
+        )
 
-        # Generate the response
-        response = model.generate_content(prompt)
-        
-        # Extract the text from the response
-        raw_response = response.text
+# Function to show the state of the ZIP export job and its download button
+def show_export_job(job):
+    language = job['params']['language']
+    english = language != "portuguese"
+    if job['status'] in (QUEUED, RUNNING):
+        label = "Creating all documents and preparing ZIP file:" if english else "Criando todos os documentos e preparando arquivo ZIP:"
+        show_job_progress(job['id'], label)
+    elif job['status'] == FAILED:
+        error_msg = f"Error creating the ZIP file: {job['error']}" if english else f"Erro ao criar o arquivo ZIP: {job['error']}"
+        st.error(error_msg)
+    else:
+        result = job['result']
+        # Show errors if any
+        if result['error_docs']:
+            error_msg = f"Failed to generate {len(result['error_docs'])} documents" if english else f"Falha ao gerar {len(result['error_docs'])} documentos"
+            st.error(error_msg)
         
-        # Store the raw response for display
-        result_text = raw_response
+        success_msg = f"{result['success_count']} documents created successfully!" if english else f"{result['success_count']} documentos criados com sucesso!"
+        st.success(success_msg)
         
-        # Sanitize and parse JSON response
-        try:
-            # First, find JSON array in the response (in case there's explanatory text)
-            json_match = re.search(r'\[(.*?)\]', raw_response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-            else:
-                json_str = raw_response
-            
-            # Parse the JSON
-            themes = json.loads(json_str)
-            
-            # Store in session state
-            st.session_state['generated_themes'] = themes
-            
-            return themes, result_text
-            
-        except json.JSONDecodeError:
-            # If JSON parsing fails, try to fix common issues
-            st.warning("JSON parsing failed, attempting to fix formatting...")
-            
-            # Try to extract content between triple backticks if present
-            code_block_match = re.search(r'```(?:json)?(.*?)```', raw_response, re.DOTALL)
-            if code_block_match:
-                json_str = code_block_match.group(1).strip()
-            else:
-                json_str = raw_response
-            
-            # Try manual extraction if still not valid JSON
-            try:
-                themes = json.loads(json_str)
-            except:
-                # Fall back to manual extraction if JSON parsing fails
-                st.error("JSON parsing failed. Creating basic theme structure manually.")
-                
-                # Attempt to manually extract themes
-                themes = []
-                theme_matches = re.finditer(r'(?:"title"|{)\s*:\s*"([^"]+)"', json_str)
-                
-                for i, match in enumerate(theme_matches, 1):
-                    if i > 10:  # Limit to 10 themes
-                        break
-                    
-                    theme_title = match.group(1)
-                    themes.append({
-                        "title": theme_title,
-                        "description": f"Description for '{theme_title}'",
-                        "teaser": f"Teaser for '{theme_title}'",
-                        "full_text": f"This is a placeholder for the full text about '{theme_title}'."
-                    })
-            
-            # Store in session state
-            st.session_state['generated_themes'] = themes
-            return themes, result_text
-    
-    except Exception as e:
-        st.error(f"Error generating lecture themes: {str(e)}")
-        return [], str(e)
+        # Create a download button for the zip file
+        zip_label = "Download All Documents (ZIP)" if english else "Baixar Todos os Documentos (ZIP)"
+        show_artifact_download(job, zip_label, f"download_zip_{job['id']}", english)
+
+# Function to offer a job's artifact file for download
+def show_artifact_download(job, label, key, english=True):
+    """
+    Show the download of a job artifact: a signed, short-lived link to the
+    streaming endpoint when it runs, otherwise a download button.
+
+    Parameters:
+    job (dict): Finished job with an artifact
+    label (str): Button label
+    key (str): Unique widget key
+    english (bool): Language of the messages
+    """
+    if not job['artifact_path']:
+        st.warning("The file of this job is no longer available." if english else "O arquivo desta tarefa não está mais disponível.")
+        return
+    url = artifact_url(job['id'], job['artifact_name'])
+    if url:
+        # Streamed from disk, outside Streamlit's websocket
+        st.link_button(label, url)
+        st.caption("The link expires after a few minutes; reload the page for a new one." if english
+                   else "O link expira após alguns minutos; recarregue a página para obter um novo.")
+    else:
+        with open(job['artifact_path'], "rb") as artifact_file:
+            st.download_button(label, artifact_file, file_name=job['artifact_name'], mime="application/zip", key=key)
 
 # Function to parse themes from text (keep for backward compatibility)
 def parse_themes_from_text(themes_text):
@@ -475,278 +507,6 @@ Break free from the digital matrix. Discover your true potential."""
     
     return themes
 
-# Older function for legacy support
-def generate_lecture_themes(api_key, video_data, age_group):
-    # Call the JSON version and convert result
-    themes, raw_text = generate_lecture_themes_json(api_key, video_data, age_group)
-    return raw_text
-
-
-def translate_themes_to_portuguese(api_key, themes):
-    """
-    Translate the generated themes from English to Portuguese using Gemini API.
-    
-    Parameters:
-    api_key (str): Gemini API key
-    themes (list): List of theme dictionaries in English
-    
-    Returns:
-    tuple: (portuguese_themes, raw_json_text)
-    """
-    try:
-        # Configure the Gemini API
-        genai.configure(api_key=api_key)
-        
-        # Initialize with the appropriate model
-        try:
-            models = genai.list_models()
-            # Try to find a suitable model for translation
-            gemini_model = None
-            for model_name in [m.name for m in models]:
-                if 'gemini-2.0-flash' in model_name:
-                    gemini_model = model_name
-                    break
-            if not gemini_model:
-                for model_name in [m.name for m in models]:
-                    if 'gemini' in model_name:
-                        gemini_model = model_name
-                        break
-            if not gemini_model:
-                gemini_model = 'gemini-2.0-flash'  # Default fallback
-        except:
-            gemini_model = 'gemini-2.0-flash'  # Default if we can't list models
-        
-        model = genai.GenerativeModel(gemini_model)
-        
-        # Convert the themes to JSON for the translation prompt
-        english_json = json.dumps(themes, ensure_ascii=False, indent=2)
-        
-        # Create a prompt for translation
-        prompt = f"""
-You are a professional translator with expertise in spirituality, philosophy, and psychology.
-
-Translate the following JSON data containing lecture themes from English to Portuguese. Maintain the exact same JSON structure and field names, but translate all content values.
-
-Pay special attention to properly translating spiritual and philosophical terms. Ensure the Portuguese translation maintains the spiritual essence and nuance of the original.
-
-The translation should sound natural and idiomatic in Portuguese while preserving the meaning.
-
-JSON to translate:
-```json
-{english_json}
-```
-
-IMPORTANT: Return ONLY the translated JSON array with NO additional text or explanation. The result must be valid JSON that can be parsed programmatically.
-"""
-
-        # Generate the translation
-        response = model.generate_content(prompt)
-        
-        # Extract the text from the response
-        raw_response = response.text
-        
-        # Try to extract JSON from the response
-        try:
-            # First, find JSON array in the response (in case there's explanatory text)
-            json_match = re.search(r'\[(.*?)\]', raw_response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-            else:
-                json_str = raw_response
-            
-            # Look for JSON content between code blocks
-            code_block_match = re.search(r'```(?:json)?(.*?)```', raw_response, re.DOTALL)
-            if code_block_match:
-                json_str = code_block_match.group(1).strip()
-            
-            # Parse the JSON
-            portuguese_themes = json.loads(json_str)
-            
-            return portuguese_themes, raw_response
-            
-        except json.JSONDecodeError:
-            # If JSON parsing fails, log error and return the original themes
-            print(f"Failed to parse translated JSON: {raw_response[:500]}...")
-            return themes, raw_response
-    
-    except Exception as e:
-        print(f"Error translating themes: {str(e)}")
-        return themes, str(e)
-
-
-
-
-
-
-
-
-
-def create_theme_document_with_language_option(theme, gemini_api_key, language="english"):
-    """
-    Creates a formatted Word document with the theme content in the selected language.
-    
-    Parameters:
-    theme (dict): Dictionary containing theme data with consistent keys
-    gemini_api_key (str): API key for Gemini used for image generation
-    language (str): "english" or "portuguese"
-    
-    Returns:
-    BytesIO: A BytesIO object containing the generated Word document
-    """
-    # Create a new Word document
-    doc = docx.Document()
-    
-    # Set document margins
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
-    
-    # Generate a query based on the theme title and add some spiritual keywords
-    try:
-        # Extract meaningful information from the theme
-        clean_title = theme.get('title', '').lower()
-        description = theme.get('description', '').lower()
-        
-        # Extract key concepts
-        key_words = []
-        
-        # Extract nouns and adjectives from title
-        title_words = clean_title.replace('-', ' ').split()
-        # Filter out common stop words
-        stop_words = ['the', 'and', 'of', 'in', 'to', 'a', 'is', 'that', 'it', 'with', 'as', 'for',
-                     'o', 'a', 'os', 'as', 'de', 'da', 'do', 'das', 'dos', 'em', 'no', 'na', 'um', 'uma']
-        key_words.extend([word for word in title_words if word not in stop_words and len(word) > 3])
-        
-        # Create a list of spiritual keywords for better image results
-        spiritual_keywords = [
-            "spiritual", "meditation", "abstract", "enlightenment", "mindfulness", "consciousness",
-            "sacred", "divine", "cosmic", "transcendence", "wisdom", "harmony", "balance",
-            "serenity", "energy", "light", "nature", "universe", "soul", "spirit"
-        ]
-        
-        # Select 2-3 random keywords to add variety
-        import random
-        selected_keywords = random.sample(spiritual_keywords, min(3, len(spiritual_keywords)))
-        
-        # If we have key words from the title, prioritize those and add just 1-2 spiritual keywords
-        if key_words:
-            # Combine up to 2 key words from title with 1-2 spiritual keywords
-            image_query = " ".join(key_words[:2] + selected_keywords[:2])
-        else:
-            # If no good key words from title, use more spiritual keywords
-            image_query = " ".join(selected_keywords[:3])
-        
-        # Add "abstract art" to get more artistic images
-        image_query += " abstract art"
-        
-        # Format for Unsplash API
-        formatted_query = image_query.replace(' ', '+')
-        
-        # Use a more targeted Unsplash query
-        image_url = f"https://source.unsplash.com/1200x600/?{formatted_query}"
-        
-        # Get the image
-        img_response = requests.get(image_url)
-        img = Image.open(BytesIO(img_response.content))
-        
-        # Save the image to a temporary file
-        img_path = "temp_theme_image.jpg"
-        img.save(img_path)
-        
-        # Add the image to the document
-        doc.add_picture(img_path, width=Inches(6))
-        os.remove(img_path)  # Clean up temp file
-        
-        # Add some space after the image
-        doc.add_paragraph()
-    except Exception as e:
-        # If image acquisition fails, log and continue without an image
-        print(f"Image generation failed: {str(e)}")
-    
-    # Add the theme title
-    title_paragraph = doc.add_paragraph()
-    clean_title = theme.get('title', 'Theme Title' if language == "english" else "Título do Tema")
-    title_run = title_paragraph.add_run(clean_title)
-    title_run.bold = True
-    title_run.font.size = Pt(24)
-    title_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Get month names in Portuguese if needed
-    pt_months = {
-        "January": "Janeiro", "February": "Fevereiro", "March": "Março", 
-        "April": "Abril", "May": "Maio", "June": "Junho",
-        "July": "Julho", "August": "Agosto", "September": "Setembro",
-        "October": "Outubro", "November": "Novembro", "December": "Dezembro"
-    }
-    
-    # Add the date (current month and year)
-    date_paragraph = doc.add_paragraph()
-    date_str = datetime.now().strftime("%B %Y")
-    
-    # Translate month if using Portuguese
-    if language == "portuguese":
-        month_name = datetime.now().strftime("%B")
-        if month_name in pt_months:
-            date_str = date_str.replace(month_name, pt_months[month_name])
-    
-    date_run = date_paragraph.add_run(date_str.upper())
-    date_run.bold = True
-    date_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Add the teaser
-    teaser_content = theme.get('teaser', '')
-    if teaser_content:
-        doc.add_paragraph()
-        teaser_paragraph = doc.add_paragraph()
-        teaser_run = teaser_paragraph.add_run(teaser_content)
-        teaser_run.italic = True
-        teaser_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Add the full text
-    full_text = theme.get('full_text', '')
-    if not full_text:
-        # Default text if no full_text is found
-        if language == "english":
-            full_text = """The algorithm of your soul is the invisible pattern that shapes your thoughts, behaviors, and perceptions. Just as digital algorithms influence what you see online, internal algorithms determine how you experience life."""
-        else:
-            full_text = """O algoritmo da sua alma é o padrão invisível que molda seus pensamentos, comportamentos e percepções. Assim como os algoritmos digitais influenciam o que você vê online, os algoritmos internos determinam como você experimenta a vida."""
-    
-    # Add the main text
-    doc.add_paragraph()  # Add space
-    
-    # Split into paragraphs and add them
-    paragraphs = re.split(r'\n\s*\n', full_text)
-    for paragraph in paragraphs:
-        paragraph = paragraph.strip()
-        if not paragraph:
-            continue
-            
-        # Skip any lines that look like outline points
-        if re.match(r'^[-•*]\s', paragraph) or re.match(r'^\d+\.\s', paragraph):
-            continue
-            
-        # Add as regular paragraph
-        p = doc.add_paragraph()
-        p.add_run(paragraph.strip())
-    
-    # Add footer with Rosacruz Áurea branding
-    footer_section = doc.sections[0]
-    footer = footer_section.footer
-    footer_paragraph = footer.paragraphs[0]
-    footer_run = footer_paragraph.add_run("ROSACRUZ ÁUREA | LECTORIUM ROSICRUCIANUM")
-    footer_run.font.size = Pt(8)
-    footer_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Save the document to a BytesIO object
-    doc_bytes = io.BytesIO()
-    doc.save(doc_bytes)
-    doc_bytes.seek(0)
-    
-    return doc_bytes
-
 # Keep original function for backward compatibility
 def create_theme_document(theme):
     """
@@ -755,115 +515,154 @@ def create_theme_document(theme):
     """
     return create_theme_document_from_json(theme)
 
-# Function to download a document
-def get_binary_file_downloader_html(bin_data, file_label='Document', file_name='theme.docx'):
-    b64_data = base64.b64encode(bin_data.read()).decode()
-    return f'<a href="data:application/vnd.openxmlformats-officedocument.wordprocessingml.document;base64,{b64_data}" download="{file_name}">{file_label}</a>'
+# Function to show one page of mined videos as a compact grid
+def render_video_results(videos, key):
+    page_size = st.selectbox("Videos per page", [10, 25, 50], key=f"{key}_page_size")
+    page_count = max(1, -(-len(videos) // page_size))
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count,
+                           value=1, step=1, key=f"{key}_page")
+    page_videos = videos[(page - 1) * page_size:page * page_size]
+    
+    # Only the thumbnails of the visible page are fetched and downscaled
+    rows = []
+    for video, thumbnail in zip(page_videos, proxied_thumbnail_urls(page_videos)):
+        rows.append({
+            'Thumbnail': thumbnail,
+            'Title': video['title'],
+            'Context': video['context'],
+            'Confidence': video.get('context_confidence'),
+            'Views': video['view_count'],
+            'Views/Day': video.get('views_per_day'),
+            'Score': video.get('engagement_score'),
+            'Similar': video['cluster_size'] - 1,
+            'Total Views': video['cluster_view_count'],
+            'Channel': video['channel'],
+            'Link': f"https://www.youtube.com/watch?v={video['video_id']}",
+        })
+    
+    st.dataframe(
+        pd.DataFrame(rows),
+        hide_index=True,
+        column_config={
+            'Thumbnail': st.column_config.ImageColumn("Thumbnail", width="small"),
+            'Confidence': st.column_config.NumberColumn("Confidence", format="%.2f", help="Similarity of the video to its category (low values are categorized by keyword rules)"),
+            'Views': st.column_config.NumberColumn("Views", format="%d"),
+            'Views/Day': st.column_config.NumberColumn("Views/Day", format="%.0f"),
+            'Score': st.column_config.NumberColumn("Score", format="%.2f", help="Engagement score of the selected ranking"),
+            'Similar': st.column_config.NumberColumn("Similar", help="Near-duplicate uploads merged into this row"),
+            'Total Views': st.column_config.NumberColumn("Total Views", format="%d"),
+            'Link': st.column_config.LinkColumn("Link", display_text="Watch"),
+        },
+    )
+
+# Function to show which channels account for the views of mined videos
+def show_channel_table(videos, statistics):
+    with st.expander("Channels"):
+        table = channel_table(videos, statistics).drop(columns=['channel_id'])
+        table['view_share'] *= 100
+        st.dataframe(
+            table.rename(columns={
+                'channel': 'Channel', 'videos': 'Videos', 'views': 'Views', 'view_share': 'Share of Views',
+                'categories': 'Categories', 'subscribers': 'Subscribers', 'views_per_subscriber': 'Views/Subscriber',
+            }),
+            hide_index=True,
+            column_config={
+                'Share of Views': st.column_config.NumberColumn("Share of Views", format="%.1f%%"),
+                'Subscribers': st.column_config.NumberColumn("Subscribers", format="%d"),
+                'Views/Subscriber': st.column_config.NumberColumn("Views/Subscriber", format="%.2f",
+                                                                  help="Views of these videos per channel subscriber"),
+            },
+        )
+
+# Function to pre-generate themes for a freshly mined period, cancelling unclaimed jobs for its previous videos
+def speculate_themes(session_key, videos):
+    speculative_jobs = st.session_state.setdefault('speculative_jobs', {})
+    speculative_jobs[session_key] = speculate_generation(
+        videos, speculative_age_groups, session_philosophy_context(), token_budget,
+        comment_sampling, translation_languages,
+        {'gemini_api_key': gemini_api_key, 'youtube_api_key': youtube_api_key}, speculative_jobs.get(session_key),
+        novelty, channel_context
+    )
+    st.caption(f"Pre-generating themes for {', '.join(speculative_age_groups)} in the background")
+
+# Function to mine one period and keep its results on screen across reruns
+def mining_column(subheader, period, session_key, button_label, spinner_text):
+    st.subheader(subheader)
+    if st.button(button_label):
+        if youtube_api_key:
+            with st.spinner(spinner_text):
+                published_after = get_date_for_period(period)
+                videos, mining_stats = mine_period(youtube_api_key, search_queries, max_results, published_after, quota_budget)
+                show_mining_stats(mining_stats)
+                
+                if videos:
+                    # Collapse re-uploads and clips of the same video
+                    videos = cluster_videos(videos, similarity_threshold)
+                    
+                    # Add context to each video, the whole batch at once
+                    categorize_videos(videos)
+                    
+                    # Rank by engagement instead of raw views
+                    videos = rank_videos(videos, ranking_formula)
+                    
+                    # Store once per process; the session keeps the result ID
+                    st.session_state[session_key] = put_videos(videos)
+                    
+                    # Fetch the channel statistics with the videos, not on every rerun; only the
+                    # subscriber counts are kept for the channel table
+                    statistics, channel_stats = channel_statistics(youtube_api_key,
+                                                                   [video.get('channel_id') for video in videos])
+                    if channel_stats['errors']:
+                        st.warning(f"Could not fetch some channel statistics: {channel_stats['errors'][0]}")
+                    st.session_state[f"{session_key}_channels"] = {
+                        channel_id: {'subscriber_count': channel['subscriber_count']}
+                        for channel_id, channel in statistics.items()
+                    }
+                    
+                    # Start on the themes before they are asked for
+                    if speculative_generation and speculative_age_groups and gemini_api_key:
+                        speculate_themes(session_key, videos)
+                else:
+                    st.warning("No videos found or error occurred.")
+        else:
+            st.error("Please enter your YouTube API key in the sidebar.")
+    
+    # Display videos
+    videos = session_videos(session_key)
+    if videos:
+        render_video_results(videos, session_key)
+        show_channel_table(videos, st.session_state.get(f"{session_key}_channels"))
 
 # Main app layout
-tab1, tab2, tab3 = st.tabs(["Mine YouTube Videos", "Lecture Theme Generator", "About"])
+tab1, tab2, tab3, tab4 = st.tabs(["Mine YouTube Videos", "Lecture Theme Generator", "About", "Diagnostics"])
 
 with tab1:
     st.header("Mine Popular Spirituality Videos")
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.subheader("Last Week")
-        if st.button("Mine Last Week's Videos"):
-            if youtube_api_key:
-                with st.spinner("Fetching last week's popular videos..."):
-                    published_after = get_date_for_period("1 week")
-                    videos = get_popular_videos(youtube_api_key, search_query, max_results, published_after)
-                    
-                    if videos:
-                        # Add context to each video
-                        for video in videos:
-                            video['context'] = generate_video_context(video['title'], video['description'])
-                        
-                        # Store in session state for later use
-                        st.session_state['weekly_videos'] = videos
-                        
-                        # Display videos
-                        for i, video in enumerate(videos):
-                            st.write(f"**{i+1}. {video['title']}**")
-                            st.write(f"*Context: {video['context']}*")
-                            st.write(f"Views: {video['view_count']:,} | Channel: {video['channel']}")
-                            st.write(f"[Watch on YouTube](https://www.youtube.com/watch?v={video['video_id']})")
-                            st.image(video['thumbnail'], use_container_width=True)
-                            st.divider()
-                    else:
-                        st.warning("No videos found or error occurred.")
-            else:
-                st.error("Please enter your YouTube API key in the sidebar.")
+        mining_column("Last Week", "1 week", 'weekly_videos', "Mine Last Week's Videos",
+                      "Fetching last week's popular videos...")
     
     with col2:
-        st.subheader("Last Month")
-        if st.button("Mine Last Month's Videos"):
-            if youtube_api_key:
-                with st.spinner("Fetching last month's popular videos..."):
-                    published_after = get_date_for_period("1 month")
-                    videos = get_popular_videos(youtube_api_key, search_query, max_results, published_after)
-                    
-                    if videos:
-                        # Add context to each video
-                        for video in videos:
-                            video['context'] = generate_video_context(video['title'], video['description'])
-                        
-                        # Store in session state for later use
-                        st.session_state['monthly_videos'] = videos
-                        
-                        # Display videos
-                        for i, video in enumerate(videos):
-                            st.write(f"**{i+1}. {video['title']}**")
-                            st.write(f"*Context: {video['context']}*")
-                            st.write(f"Views: {video['view_count']:,} | Channel: {video['channel']}")
-                            st.write(f"[Watch on YouTube](https://www.youtube.com/watch?v={video['video_id']})")
-                            st.image(video['thumbnail'], use_container_width=True)
-                            st.divider()
-                    else:
-                        st.warning("No videos found or error occurred.")
-            else:
-                st.error("Please enter your YouTube API key in the sidebar.")
+        mining_column("Last Month", "1 month", 'monthly_videos', "Mine Last Month's Videos",
+                      "Fetching last month's popular videos...")
     
     with col3:
-        st.subheader("Last 6 Months")
-        if st.button("Mine Last 6 Months' Videos"):
-            if youtube_api_key:
-                with st.spinner("Fetching last 6 months' popular videos..."):
-                    published_after = get_date_for_period("6 months")
-                    videos = get_popular_videos(youtube_api_key, search_query, max_results, published_after)
-                    
-                    if videos:
-                        # Add context to each video
-                        for video in videos:
-                            video['context'] = generate_video_context(video['title'], video['description'])
-                        
-                        # Store in session state for later use
-                        st.session_state['biannual_videos'] = videos
-                        
-                        # Display videos
-                        for i, video in enumerate(videos):
-                            st.write(f"**{i+1}. {video['title']}**")
-                            st.write(f"*Context: {video['context']}*")
-                            st.write(f"Views: {video['view_count']:,} | Channel: {video['channel']}")
-                            st.write(f"[Watch on YouTube](https://www.youtube.com/watch?v={video['video_id']})")
-                            st.image(video['thumbnail'], use_container_width=True)
-                            st.divider()
-                    else:
-                        st.warning("No videos found or error occurred.")
-            else:
-                st.error("Please enter your YouTube API key in the sidebar.")
+        mining_column("Last 6 Months", "6 months", 'biannual_videos', "Mine Last 6 Months' Videos",
+                      "Fetching last 6 months' popular videos...")
 
 with tab2:
     st.header("Generate Lecture Themes by Age Group")
     
     # Show philosophy context status
-    if 'philosophy_context_cleaned' in st.session_state and st.session_state['philosophy_context_cleaned']:
-        context_length = len(st.session_state['philosophy_context_cleaned'])
+    philosophy_context = session_philosophy_context()
+    if philosophy_context:
+        context_length = len(philosophy_context)
         st.success(f"✅ Philosophy context loaded ({context_length} characters)")
         with st.expander("View loaded philosophical context"):
-            st.write(st.session_state['philosophy_context_cleaned'][:2700] + "..." 
-                    if context_length > 2700 else st.session_state['philosophy_context_cleaned'])
+            st.write(philosophy_context[:2700] + "..." 
+                    if context_length > 2700 else philosophy_context)
     else:
         st.warning("⚠️ No philosophical context loaded. Upload an HTML file in the sidebar to provide context.")
     
@@ -883,12 +682,12 @@ with tab2:
     # Get videos from selected source
     selected_videos = []
     if data_source in data_mapping:
-        selected_videos = st.session_state.get(data_mapping[data_source], [])
+        selected_videos = session_videos(data_mapping[data_source])
     elif data_source == "Combined (All Time Periods)":
         # Combine all video sources
-        weekly = st.session_state.get('weekly_videos', [])
-        monthly = st.session_state.get('monthly_videos', [])
-        biannual = st.session_state.get('biannual_videos', [])
+        weekly = session_videos('weekly_videos')
+        monthly = session_videos('monthly_videos')
+        biannual = session_videos('biannual_videos')
         
         # Add source field to track which time period each video came from
         for v in weekly:
@@ -907,6 +706,12 @@ with tab2:
             if video['video_id'] not in video_ids_seen:
                 selected_videos.append(video)
                 video_ids_seen.add(video['video_id'])
+        
+        # Merge near-duplicates found in different time periods
+        selected_videos = cluster_videos(selected_videos, similarity_threshold)
+        
+        # Rank with z-scores computed within each period, so periods of different size are comparable
+        selected_videos = rank_videos(selected_videos, ranking_formula, group='source')
     
     # Show summary of available videos
     if selected_videos:
@@ -925,143 +730,123 @@ with tab2:
     # Age group selection
     age_group = st.selectbox(
         "Select Target Age Group",
-        ["20-30", "30-40", "40-50", "50-60", "60+"]
+        list(AGE_CHARACTERISTICS)
     )
     
     # Generate themes button
     if st.button("Generate Lecture Themes"):
         if gemini_api_key and selected_videos:
-            with st.spinner(f"Generating lecture themes for {age_group} age group..."):
-                try:
-                    # Use the new JSON-based theme generator
-                    themes, themes_text = generate_lecture_themes_json(gemini_api_key, selected_videos, age_group)
-                    
-                    # Check if themes exists and is not empty
-                    if themes:
-                        st.markdown("## Generated Themes")
-                        
-                        # Display the raw JSON in an expander for debugging
-                        #with st.expander("View Raw JSON Response"):
-                        #    st.code(themes_text)
-
-                        # Translate themes to Portuguese
-                        with st.spinner("Translating themes to Portuguese..."):
-                            portuguese_themes, portuguese_text = translate_themes_to_portuguese(gemini_api_key, themes)
-                            
-                            # Store Portuguese themes in session state
-                            st.session_state['portuguese_themes'] = portuguese_themes
-                            
-                            # Display the Portuguese JSON
-                            #with st.expander("View Raw JSON Response (Portuguese)"):
-                            #    st.code(portuguese_text)
-  
-
-
-
-                        
-                        # Display the parsed themes
-                        tabs = st.tabs(["English", "Portuguese"])
-                        
-                        with tabs[0]:  # English tab
-                            
-                            for i, theme in enumerate(themes):
-                                st.markdown(f"### {i+1}. {theme.get('title', 'Untitled Theme')}")
-                                
-                                if 'description' in theme:
-                                    st.markdown(f"**Description:** {theme['description']}")
-                                
-                                if 'teaser' in theme:
-                                    st.markdown(f"**Teaser:** *{theme['teaser']}*")
-                                
-                                with st.expander("View Full Details"):
-                                    if 'age_resonance' in theme:
-                                        st.markdown(f"**Age Group Resonance:** {theme['age_resonance']}")
-                                    
-                                    if 'philosophical_connection' in theme:
-                                        st.markdown(f"**Philosophical Connection:** {theme['philosophical_connection']}")
-                                    
-                                    if 'lecture_outline' in theme:
-                                        st.markdown(f"**Lecture Outline:**\n{theme['lecture_outline']}")
-                                    
-                                    if 'full_text' in theme:
-                                        st.markdown(f"**Full Text:**\n{theme['full_text']}")
-
-                        with tabs[1]:  # Portuguese tab
-                            for i, theme in enumerate(portuguese_themes):
-                                st.markdown(f"### {i+1}. {theme.get('title', 'Tema Sem Título')}")
-                                
-                                if 'description' in theme:
-                                    st.markdown(f"**Descrição:** {theme['description']}")
-                                
-                                if 'teaser' in theme:
-                                    st.markdown(f"**Chamada:** *{theme['teaser']}*")
-                                
-                                with st.expander("Ver Detalhes Completos"):
-                                    if 'age_resonance' in theme:
-                                        st.markdown(f"**Ressonância com a Faixa Etária:** {theme['age_resonance']}")
-                                    
-                                    if 'philosophical_connection' in theme:
-                                        st.markdown(f"**Conexão Filosófica:** {theme['philosophical_connection']}")
-                                    
-                                    if 'lecture_outline' in theme:
-                                        st.markdown(f"**Estrutura da Palestra:**\n{theme['lecture_outline']}")
-                                    
-                                    if 'full_text' in theme:
-                                        st.markdown(f"**Texto Completo:**\n{theme['full_text']}")
-                        
-                except Exception as e:
-                    st.error(f"Error generating lecture themes: {str(e)}")
-                    st.exception(e)  # This will show the full traceback
-                    
-                    # Create a default theme even on error
-                    st.session_state['generated_themes'] = [{
-                        'title': 'Default Theme (Error Recovery)',
-                        'teaser': 'A placeholder theme created when an error occurred.',
-                        'full_text': """This is a default theme created when an error occurred during theme generation. You can still use this to test document generation."""
-                    }]
+            # Generation and translation run as a background job, so a rerun or refresh does not lose them
+            params = generation_params(
+                selected_videos, age_group, session_philosophy_context(), token_budget,
+                comment_sampling, translation_languages, novelty, channel_context
+            )
+            # Take over the themes pre-generated after mining when the videos and settings match
+            job_id = claim_cached_job(GENERATE_THEMES, generation_key(params))
+            if job_id:
+                st.toast("Using the themes pre-generated after mining")
+            else:
+                job_id = submit_job(
+                    GENERATE_THEMES, params, {'gemini_api_key': gemini_api_key, 'youtube_api_key': youtube_api_key}
+                )
+            track_job('generation_job', job_id)
         elif not gemini_api_key:
             st.error("Please ensure your Google Gemini API key is properly set.")
         else:
             st.error("No video data available. Please mine videos first.")
+    
+    generation_job = tracked_job('generation_job')
+    if generation_job:
+        if generation_job['status'] in (QUEUED, RUNNING):
+            show_job_progress(generation_job['id'], f"Generating lecture themes for {generation_job['params']['age_group']} age group:")
+        
+        elif generation_job['status'] == FAILED:
+            st.error(f"Error generating lecture themes: {generation_job['error']}")
+            
+            # Create a default theme even on error
+            if st.session_state.get('loaded_generation_job') != generation_job['id']:
+                st.session_state['loaded_generation_job'] = generation_job['id']
+                st.session_state['theme_set'] = put_themes([Theme.from_dict({
+                    'title': 'Default Theme (Error Recovery)',
+                    'teaser': 'A placeholder theme created when an error occurred.',
+                    'full_text': """This is a default theme created when an error occurred during theme generation. You can still use this to test document generation."""
+                })])
+                st.session_state['theme_repeats'] = None
+                st.session_state['novelty_stats'] = None
+                st.session_state['channel_summary'] = None
+        
+        else:
+            # Load the finished job's themes once, and again if the shared store evicted them
+            if (st.session_state.get('loaded_generation_job') != generation_job['id']
+                    or get_themes(st.session_state.get('theme_set')) is None):
+                st.session_state['loaded_generation_job'] = generation_job['id']
+                result = generation_job['result']
+                job_themes = themes_from_dicts(result['themes'])
+                # Only themes someone is shown go into the history, not unclaimed pre-generated ones
+                try:
+                    record_themes(job_themes, generation_job['params']['age_group'])
+                except Exception as e:
+                    print(f"Could not add the themes to the history: {str(e)}")
+                st.session_state['theme_set'] = put_themes(
+                    job_themes,
+                    {language: themes_from_dicts(translated) for language, translated in result['translations'].items()},
+                    key=generation_job['id']
+                )
+                st.session_state['prompt_stats'] = result['prompt_stats']
+                st.session_state['audience_signals'] = result.get('audience_signals')
+                st.session_state['theme_repeats'] = result.get('repeats')
+                st.session_state['novelty_stats'] = result.get('novelty_stats')
+                st.session_state['channel_summary'] = result.get('channel_summary')
+            
+            # Themes of a failed translation request are left out of that language
+            translation_errors = (generation_job['result'].get('translation_stats') or {}).get('errors')
+            if translation_errors:
+                st.warning("Some themes could not be translated and are left out of their language: " + "; ".join(
+                    f"{language_label(language)}: {error}" for language, error in translation_errors.items()))
+            
+            show_generated_themes(
+                *session_themes(),
+                st.session_state.get('prompt_stats'),
+                st.session_state.get('audience_signals'),
+                st.session_state.get('theme_repeats'),
+                st.session_state.get('novelty_stats'),
+                st.session_state.get('channel_summary')
+            )
                 
     # Show theme details and document generation if we have generated themes
-    if 'generated_themes' in st.session_state and st.session_state['generated_themes']:
+    generated_themes, translated_themes = session_themes()
+    if generated_themes:
         st.markdown("---")
         st.markdown("## Create Document for Theme")
         
-        # Check if we have Portuguese themes
-        has_portuguese = 'portuguese_themes' in st.session_state and st.session_state['portuguese_themes']
+        # Translations that were generated with the themes
+        translated_themes = {language: translated for language, translated in translated_themes.items() if translated}
         
         # Language selection option
-        language_option = "english"
-        if has_portuguese:
+        language_option = SOURCE_LANGUAGE
+        if translated_themes:
             language_option = st.radio(
                 "Select Document Language",
-                ["English", "Portuguese"],
-                horizontal=True
+                [SOURCE_LANGUAGE] + list(translated_themes) + ["all"],
+                format_func=lambda language: "All" if language == "all" else language_label(language),
+                horizontal=True,
+                help="All: English and translated documents of each theme in one pass, sharing one image"
             )
-            language_option = language_option.lower()
+        
+        # Labels are in Portuguese only for Portuguese documents
+        ui_english = language_option != "portuguese"
         
         # Determine which themes to use based on language
-        if language_option == "portuguese" and has_portuguese:
-            themes_to_use = st.session_state['portuguese_themes']
+        if language_option in translated_themes:
+            themes_to_use = translated_themes[language_option]
         else:
-            themes_to_use = st.session_state['generated_themes']
+            themes_to_use = generated_themes
         
         # If we have valid themes, proceed with selection and display
         if themes_to_use and len(themes_to_use) > 0:
-            # Create options for selectbox - extract just the titles
-            options = []
-            for i, theme in enumerate(themes_to_use):
-                # Get title or fallback to a default
-                if isinstance(theme, dict) and 'title' in theme:
-                    # Clean up the title if needed
-                    title = theme['title']
-                    # Remove any markdown formatting
-                    title = title.replace('*', '').replace('#', '').strip()
-                    options.append(title)
-                else:
-                    options.append(f"Theme {i+1}" if language_option == "english" else f"Tema {i+1}")
+            # Options are theme IDs; translations share the ID of their English theme
+            theme_index = index_themes(themes_to_use)
+            theme_labels = theme_option_labels(themes_to_use, ui_english)
             
 
 
@@ -1075,151 +860,120 @@ with tab2:
 
 
             # Replace the single selectbox with multiselect for multiple theme selection
-            select_label = "Select themes to create documents" if language_option == "english" else "Selecione temas para criar documentos"
-            selected_options = st.multiselect(
+            select_label = "Select themes to create documents" if ui_english else "Selecione temas para criar documentos"
+            selected_ids = st.multiselect(
                 select_label,
-                options,
+                list(theme_index),
+                format_func=theme_labels.get,
                 max_selections=10  # Allow up to 10 selections
             )
 
             # Check if any themes are selected
-            if selected_options:
-                # Find all selected themes
+            if selected_ids:
+                # Look up the selected themes (and translations) by ID
                 selected_themes = []
-                for selected_option in selected_options:
-                    for theme in themes_to_use:
-                        if isinstance(theme, dict) and 'title' in theme:
-                            clean_title = theme['title'].replace('*', '').replace('#', '').strip()
-                            if clean_title == selected_option:
-                                selected_themes.append((selected_option, theme))
-                                break
+                missing_translations = []
+                translated_indexes = {language: index_themes(translated) for language, translated in translated_themes.items()}
+                for theme_id in selected_ids:
+                    theme = theme_index[theme_id]
+                    if language_option == "all":
+                        # A language whose translation of the theme failed is left out, not filled with English
+                        translations = [(language, index[theme_id]) for language, index in translated_indexes.items()
+                                        if theme_id in index]
+                        missing_translations.extend(f"{theme_labels[theme_id]} ({language_label(language)})"
+                                                    for language, index in translated_indexes.items()
+                                                    if theme_id not in index)
+                        selected_themes.append((theme_labels[theme_id], theme, translations))
+                    else:
+                        selected_themes.append((theme_labels[theme_id], theme))
+                
+                if missing_translations:
+                    missing_msg = (f"No translation of {len(missing_translations)} documents, left out: {', '.join(missing_translations)}"
+                                   if ui_english else
+                                   f"Sem tradução para {len(missing_translations)} documentos, omitidos: {', '.join(missing_translations)}")
+                    st.warning(missing_msg)
+                
+                # Every selected format is rendered from the same layout and image
+                formats_label = "Document formats" if ui_english else "Formatos dos documentos"
+                selected_formats = st.multiselect(formats_label, list(FORMATS), default=["docx"]) or ["docx"]
                 
                 # Create buttons for individual and batch downloads
                 col1, col2 = st.columns(2)
                 
                 with col1:
                     # Button for generating and downloading individual documents
-                    button_label = "Generate Individual Documents" if language_option == "english" else "Gerar Documentos Individuais"
+                    button_label = "Generate Individual Documents" if ui_english else "Gerar Documentos Individuais"
                     individual_btn = st.button(button_label)
                 
                 with col2:
                     # Button for generating and downloading all documents in a zip
-                    zip_button_label = "Generate & Download All as ZIP" if language_option == "english" else "Gerar & Baixar Todos como ZIP"
+                    zip_button_label = "Generate & Download All as ZIP" if ui_english else "Gerar & Baixar Todos como ZIP"
                     zip_btn = st.button(zip_button_label)
                 
                 # Handle individual document generation
                 if individual_btn:
-                    spinner_text = "Creating documents with automatically generated images..." if language_option == "english" else "Criando documentos com imagens geradas automaticamente..."
+                    spinner_text = "Creating documents with automatically generated images..." if ui_english else "Criando documentos com imagens geradas automaticamente..."
                     
                     with st.spinner(spinner_text):
-                        # Create a container for all download buttons
-                        download_container = st.container()
+                        # Only cache keys are kept in the session; the files stay in the document cache
+                        st.session_state['individual_documents'] = []
                         success_count = 0
                         
                         # Process each selected theme
-                        for selected_option, selected_theme in selected_themes:
+                        for selected in selected_themes:
+                            selected_option = selected[0]
                             try:
-                                # Use the document creator function with language option
-                                doc_bytes = create_theme_document_with_language_option(
-                                    selected_theme, 
-                                    gemini_api_key,
-                                    language_option
-                                )
+                                # Already built themes come from the document cache; all languages share one image
+                                if language_option == "all":
+                                    documents = cached_multilingual_documents(selected[1], selected[2], selected_formats)
+                                else:
+                                    documents = [(language_option,) + built for built in
+                                                 cached_documents(selected[1], language_option, selected_formats)]
                                 
-                                # Sanitize filename
-                                safe_title = re.sub(r'[^\w\-_\. ]', '', selected_option)
-                                safe_title = safe_title.replace(' ', '_')
-                                lang_suffix = "" if language_option == "english" else "_pt"
-                                filename = f"{safe_title}{lang_suffix}_{datetime.now().strftime('%Y%m%d')}.docx"
-                                
-                                # Add download button for this document
-                                with download_container:
-                                    download_label = f"Download: {selected_option}" if language_option == "english" else f"Baixar: {selected_option}"
-                                    st.download_button(
-                                        label=download_label,
-                                        data=doc_bytes,
-                                        file_name=filename,
-                                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                                        key=f"download_{safe_title}"  # Unique key for each button
-                                    )
+                                for document_language, output_format, cache_key, _ in documents:
+                                    variant = output_format if language_option != "all" else f"{output_format}, {language_label(document_language).lower()}"
+                                    download_label = f"Download: {selected_option} ({variant})" if ui_english else f"Baixar: {selected_option} ({variant})"
+                                    st.session_state['individual_documents'].append({
+                                        'label': download_label,
+                                        # Sanitize filename
+                                        'file_name': document_filename(selected_option, document_language, output_format),
+                                        'format': output_format,
+                                        'cache_key': cache_key,
+                                    })
                                 
                                 success_count += 1
                                 
                             except Exception as e:
-                                error_msg = f"Error creating document for '{selected_option}': {str(e)}" if language_option == "english" else f"Erro ao criar documento para '{selected_option}': {str(e)}"
+                                error_msg = f"Error creating document for '{selected_option}': {str(e)}" if ui_english else f"Erro ao criar documento para '{selected_option}': {str(e)}"
                                 st.error(error_msg)
                         
                         # Show a summary message
                         if success_count > 0:
-                            success_msg = f"{success_count} documents created successfully!" if language_option == "english" else f"{success_count} documentos criados com sucesso!"
+                            success_msg = f"{success_count} documents created successfully!" if ui_english else f"{success_count} documentos criados com sucesso!"
                             st.success(success_msg)
                 
                 # Handle zip file generation
                 elif zip_btn:
-                    zip_spinner_text = "Creating all documents and preparing ZIP file..." if language_option == "english" else "Criando todos os documentos e preparando arquivo ZIP..."
-                    
-                    with st.spinner(zip_spinner_text):
-                        # Create a BytesIO object to store the zip file
-                        zip_buffer = io.BytesIO()
-                        
-                        # Create a ZipFile object
-                        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                            success_count = 0
-                            error_docs = []
-                            
-                            # Process each selected theme
-                            for selected_option, selected_theme in selected_themes:
-                                try:
-                                    # Use the document creator function with language option
-                                    doc_bytes = create_theme_document_with_language_option(
-                                        selected_theme, 
-                                        gemini_api_key,
-                                        language_option
-                                    )
-                                    
-                                    # Sanitize filename
-                                    safe_title = re.sub(r'[^\w\-_\. ]', '', selected_option)
-                                    safe_title = safe_title.replace(' ', '_')
-                                    lang_suffix = "" if language_option == "english" else "_pt"
-                                    filename = f"{safe_title}{lang_suffix}_{datetime.now().strftime('%Y%m%d')}.docx"
-                                    
-                                    # Add file to zip
-                                    zip_file.writestr(filename, doc_bytes.getvalue())
-                                    success_count += 1
-                                    
-                                except Exception as e:
-                                    error_docs.append(selected_option)
-                        
-                        # Set the buffer position to the beginning
-                        zip_buffer.seek(0)
-                        
-                        # Show errors if any
-                        if error_docs:
-                            error_msg = f"Failed to generate {len(error_docs)} documents" if language_option == "english" else f"Falha ao gerar {len(error_docs)} documentos"
-                            st.error(error_msg)
-                        
-                        # Show success message and download button if any documents were created
-                        if success_count > 0:
-                            success_msg = f"{success_count} documents created successfully!" if language_option == "english" else f"{success_count} documentos criados com sucesso!"
-                            st.success(success_msg)
-                            
-                            # Create a download button for the zip file
-                            date_str = datetime.now().strftime("%Y%m%d")
-                            zip_label = "Download All Documents (ZIP)" if language_option == "english" else "Baixar Todos os Documentos (ZIP)"
-                            zip_filename = f"lecture_themes_{language_option}_{date_str}.zip"
-                            
-                            st.download_button(
-                                label=zip_label,
-                                data=zip_buffer,
-                                file_name=zip_filename,
-                                mime="application/zip"
-                            )
+                    # The ZIP is built by a background job; its download stays available across reruns
+                    track_job('export_job', submit_job(
+                        EXPORT_ZIP,
+                        export_params(selected_themes, language_option, selected_formats),
+                        {'gemini_api_key': gemini_api_key}
+                    ))
 
             # If no themes are selected, show message
             elif themes_to_use and len(themes_to_use) > 0:
                 # Display a message to prompt selection
-                prompt_msg = "Select themes above to create documents" if language_option == "english" else "Selecione temas acima para criar documentos"
+                prompt_msg = "Select themes above to create documents" if ui_english else "Selecione temas acima para criar documentos"
                 st.info(prompt_msg)
+        
+        # Download buttons of the last individual documents stay available across reruns
+        show_individual_documents(st.session_state.get('individual_documents') or [])
+        
+        # Show the latest ZIP export, which may still be running
+        export_job = tracked_job('export_job')
+        if export_job:
+            show_export_job(export_job)
     
 
 
@@ -1259,6 +1013,114 @@ with tab3:
     terms based on the theme title.
     """)
 
+with tab4:
+    st.header("Pipeline Diagnostics")
+    st.markdown("Latency of each pipeline stage in this server process (recent window), token usage and YouTube quota units.")
+    
+    summary = stage_summary()
+    if summary:
+        stage_df = pd.DataFrame(summary)
+        for column in ['mean', 'p50', 'p95', 'p99']:
+            stage_df[column] = (stage_df[column] * 1000).round(1)
+        st.subheader("Stage Latency (ms)")
+        st.dataframe(stage_df, hide_index=True)
+    else:
+        st.info("No stages recorded yet. Mine videos or generate themes first.")
+    
+    counters = counter_summary()
+    if counters:
+        st.subheader("Counters")
+        st.dataframe(pd.DataFrame(counters), hide_index=True)
+    
+    spans = recent_spans()
+    if spans:
+        with st.expander("Recent spans"):
+            st.dataframe(pd.DataFrame([{
+                'stage': span['name'],
+                'duration (ms)': round((span['end_time_unix_nano'] - span['start_time_unix_nano']) / 1e6, 1),
+                'status': span['status']['code'],
+                'trace': span['trace_id'][:8],
+                'attributes': json.dumps(span['attributes'], ensure_ascii=False),
+            } for span in spans]), hide_index=True)
+    
+    st.subheader("Document Cache")
+    document_stats = cache_stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Hit rate", f"{document_stats['hit_rate']:.0%}",
+                help=f"{document_stats['hits']} hits, {document_stats['misses']} misses since the server started")
+    col2.metric("Cached documents", document_stats['documents'])
+    col3.metric("Size (MB)", document_stats['megabytes'], help=f"{document_stats['evictions']} evicted")
+    if st.button("Clear document cache"):
+        clear_cache()
+        st.rerun()
+    
+    st.subheader("Gemini Context Cache")
+    cached_prefixes = context_cache_stats()
+    if cached_prefixes:
+        st.dataframe(pd.DataFrame(cached_prefixes), hide_index=True)
+        if st.button("Delete cached contexts"):
+            clear_context_caches()
+            st.rerun()
+    else:
+        st.info("No cached philosophy context yet; it is registered on the first generation with a loaded context.")
+    
+    st.subheader("Translation Memory")
+    memory = translation_memory_stats()
+    if memory:
+        st.dataframe(pd.DataFrame(memory), hide_index=True)
+        if st.button("Clear translation memory"):
+            clear_translation_memory()
+            st.rerun()
+    else:
+        st.info("Nothing translated yet; segments and glossary terms are stored on the first translation.")
+    
+    st.subheader("Theme History")
+    history = history_stats()
+    if history['themes']:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Stored themes", f"{history['themes']:,}")
+        col2.metric("Oldest", datetime.fromtimestamp(history['oldest']).strftime("%Y-%m-%d"))
+        col3.metric("Newest", datetime.fromtimestamp(history['newest']).strftime("%Y-%m-%d"))
+        if st.button("Clear theme history"):
+            clear_history()
+            st.rerun()
+    else:
+        st.info("No themes stored yet; every generation adds its themes to the history.")
+    
+    st.subheader("Session Memory")
+    session_memory = session_memory_report(st.session_state)
+    st.caption(
+        f"This session holds ~{sum(row['bytes'] for row in session_memory) / 1024:,.0f} KB and refers to "
+        f"~{sum(row['shared_bytes'] for row in session_memory) / 1024:,.0f} KB kept once per process"
+    )
+    st.dataframe(pd.DataFrame(session_memory[:15]), hide_index=True)
+    st.dataframe(pd.DataFrame(store_stats()), hide_index=True)
+    
+    st.download_button("Download Prometheus metrics", metrics_text(), file_name="themeseeker_metrics.txt", mime="text/plain")
+    
+    st.subheader("Background Jobs")
+    jobs = list_jobs()
+    if jobs:
+        jobs_df = pd.DataFrame(jobs)
+        for column in ['created_at', 'finished_at']:
+            jobs_df[column] = pd.to_datetime(jobs_df[column], unit='s').dt.strftime("%Y-%m-%d %H:%M:%S")
+        st.dataframe(jobs_df, hide_index=True)
+    else:
+        st.info("No jobs submitted yet.")
+    
+    # Any finished job can be reopened by ID, also from another session
+    job_id = st.text_input("Open job by ID").strip()
+    if job_id:
+        job = get_job(job_id)
+        if job is None:
+            st.warning("No job with that ID.")
+        else:
+            st.write(f"**{job['kind']}**: {job['status']} ({job['progress']:.0%}) {job['message']}")
+            if job['error']:
+                st.error(job['error'])
+            if job['artifact_name']:
+                show_artifact_download(job, f"Download {job['artifact_name']}", f"download_job_{job['id']}")
+
 # Footer
 st.divider()
 st.caption("© 2025 Spirituality Trends Analyzer | Developed for philosophical education")
\ No newline at end of file
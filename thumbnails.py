@@ -0,0 +1,99 @@
+"""
+Local thumbnail proxy.
+
+Video thumbnails are downloaded once, downscaled and re-encoded as small
+JPEGs under static/thumbnails/, which Streamlit serves itself when static
+file serving is enabled (see .streamlit/config.toml). The results grid then
+points at those files instead of the full-size YouTube images.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import requests
+from PIL import Image
+
+THUMBNAIL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "thumbnails")
+
+# URL prefix under which Streamlit serves the static/ folder
+STATIC_URL_PREFIX = "app/static/thumbnails"
+
+THUMBNAIL_SIZE = (160, 90)
+JPEG_QUALITY = 70
+MAX_CACHED_THUMBNAILS = 2000
+MAX_WORKERS = 8
+
+
+def thumbnail_url(video):
+    """
+    Pick the smallest usable YouTube thumbnail URL for a video dict.
+    """
+    return video.get('thumbnail_small') or video.get('thumbnail')
+
+
+def _thumbnail_path(video_id):
+    return os.path.join(THUMBNAIL_DIR, f"{video_id}.jpg")
+
+
+def _download_thumbnail(video_id, url):
+    """Fetch, downscale and store one thumbnail; return True on success."""
+    path = _thumbnail_path(video_id)
+    if os.path.exists(path):
+        return True
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        img = Image.open(BytesIO(response.content)).convert("RGB")
+        img.thumbnail(THUMBNAIL_SIZE)
+        # Write then rename so a concurrent reader never sees a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        img.save(tmp_path, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Thumbnail download failed for {video_id}: {str(e)}")
+        return False
+
+
+def prune_thumbnail_cache(max_files=MAX_CACHED_THUMBNAILS):
+    """Delete the least recently written thumbnails beyond max_files."""
+    try:
+        entries = [entry for entry in os.scandir(THUMBNAIL_DIR) if entry.name.endswith(".jpg")]
+    except FileNotFoundError:
+        return
+    if len(entries) <= max_files:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - max_files]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def proxied_thumbnail_urls(videos):
+    """
+    Make sure the thumbnails of the given videos are in the local cache and
+    return the URL to display for each one. Videos whose thumbnail could not
+    be cached fall back to the YouTube URL.
+
+    Parameters:
+    videos (list): Video dicts with 'video_id' and thumbnail URLs
+
+    Returns:
+    list: One URL per video
+    """
+    os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+    missing = [video for video in videos if not os.path.exists(_thumbnail_path(video['video_id']))]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(missing))) as executor:
+            list(executor.map(lambda v: _download_thumbnail(v['video_id'], thumbnail_url(v)), missing))
+        prune_thumbnail_cache()
+
+    urls = []
+    for video in videos:
+        if os.path.exists(_thumbnail_path(video['video_id'])):
+            urls.append(f"{STATIC_URL_PREFIX}/{video['video_id']}.jpg")
+        else:
+            urls.append(thumbnail_url(video))
+    return urls
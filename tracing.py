@@ -0,0 +1,266 @@
+"""
+Lightweight tracing and metrics for the mining/generation/export pipeline.
+
+Spans are timed with trace_span() (a context manager) or @traced (a
+decorator). Finished spans use OpenTelemetry's field names so the JSON log
+can be loaded by OTel tooling, and feed per-stage latency histograms.
+Counters track token usage and YouTube quota units. Metrics are exposed as
+Prometheus text, either via metrics_text() or a small HTTP endpoint started
+with start_metrics_server(), and summarized for the in-app diagnostics panel.
+
+Configuration (environment variables):
+    THEMESEEKER_TRACE_LOG     path of the JSON-lines span log (default: off)
+    THEMESEEKER_METRICS_PORT  port of the /metrics endpoint (default: off)
+"""
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Durations kept per stage for percentile computation
+WINDOW_SIZE = 1000
+
+# Finished spans kept for the diagnostics panel
+RECENT_SPANS = 200
+
+_lock = threading.Lock()
+_local = threading.local()
+_durations = {}
+_bucket_counts = {}
+_totals = {}
+_errors = {}
+_counters = {}
+_recent = deque(maxlen=RECENT_SPANS)
+_metrics_server = None
+_metrics_server_failed = False
+
+
+def _span_stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _record(span):
+    name = span['name']
+    duration = (span['end_time_unix_nano'] - span['start_time_unix_nano']) / 1e9
+    with _lock:
+        _durations.setdefault(name, deque(maxlen=WINDOW_SIZE)).append(duration)
+        buckets = _bucket_counts.setdefault(name, [0] * len(LATENCY_BUCKETS))
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                buckets[i] += 1
+        count, total = _totals.get(name, (0, 0.0))
+        _totals[name] = (count + 1, total + duration)
+        if span['status']['code'] == 'ERROR':
+            _errors[name] = _errors.get(name, 0) + 1
+        _recent.append(span)
+
+    log_path = os.environ.get("THEMESEEKER_TRACE_LOG")
+    if log_path:
+        try:
+            with _lock, open(log_path, "a", encoding="utf-8") as log_file:
+                log_file.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            print(f"Could not write trace log: {str(e)}")
+
+
+@contextmanager
+def trace_span(name, **attributes):
+    """
+    Time a block of code as a span. Spans opened inside it (on the same
+    thread) become its children. Attributes may be added while it runs via
+    the yielded dictionary.
+
+    Parameters:
+    name (str): Stage name, e.g. "youtube.search"
+    attributes: Initial span attributes
+    """
+    stack = _span_stack()
+    parent = stack[-1] if stack else None
+    span = {
+        'name': name,
+        'trace_id': parent['trace_id'] if parent else secrets.token_hex(16),
+        'span_id': secrets.token_hex(8),
+        'parent_span_id': parent['span_id'] if parent else None,
+        'start_time_unix_nano': time.time_ns(),
+        'end_time_unix_nano': None,
+        'attributes': dict(attributes),
+        'status': {'code': 'OK'},
+    }
+    stack.append(span)
+    try:
+        yield span['attributes']
+    except Exception as e:
+        span['status'] = {'code': 'ERROR', 'message': str(e)}
+        raise
+    finally:
+        stack.pop()
+        span['end_time_unix_nano'] = time.time_ns()
+        _record(span)
+
+
+def traced(name):
+    """Decorator form of trace_span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment_counter(name, value=1, **labels):
+    """
+    Add value to a counter, e.g. increment_counter("gemini_tokens", 120,
+    direction="in", call="generate_themes").
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def stage_summary():
+    """
+    Latency statistics per stage over the recent window.
+
+    Returns:
+    list: Dicts with stage, count, errors, mean, p50, p95 and p99 (seconds)
+    """
+    with _lock:
+        snapshot = {name: sorted(values) for name, values in _durations.items()}
+        totals = dict(_totals)
+        errors = dict(_errors)
+    summary = []
+    for name in sorted(snapshot):
+        values = snapshot[name]
+        count, total = totals[name]
+        summary.append({
+            'stage': name,
+            'count': count,
+            'errors': errors.get(name, 0),
+            'mean': total / count if count else 0.0,
+            'p50': _percentile(values, 0.50),
+            'p95': _percentile(values, 0.95),
+            'p99': _percentile(values, 0.99),
+        })
+    return summary
+
+
+def counter_summary():
+    """
+    Current counter values.
+
+    Returns:
+    list: Dicts with counter, labels and value
+    """
+    with _lock:
+        items = list(_counters.items())
+    return [
+        {'counter': name, 'labels': ", ".join(f"{k}={v}" for k, v in labels), 'value': value}
+        for (name, labels), value in sorted(items)
+    ]
+
+
+def recent_spans():
+    """Return the most recently finished spans, newest first."""
+    with _lock:
+        return list(reversed(_recent))
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def metrics_text():
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Returns:
+    str: Metrics text
+    """
+    lines = [
+        "# HELP themeseeker_stage_duration_seconds Duration of pipeline stages",
+        "# TYPE themeseeker_stage_duration_seconds histogram",
+    ]
+    with _lock:
+        for name in sorted(_bucket_counts):
+            count, total = _totals[name]
+            for bound, bucket_count in zip(LATENCY_BUCKETS, _bucket_counts[name]):
+                lines.append(f'themeseeker_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {bucket_count}')
+            lines.append(f'themeseeker_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'themeseeker_stage_duration_seconds_sum{{stage="{name}"}} {total}')
+            lines.append(f'themeseeker_stage_duration_seconds_count{{stage="{name}"}} {count}')
+        lines.append("# TYPE themeseeker_stage_errors_total counter")
+        for name, errors in sorted(_errors.items()):
+            lines.append(f'themeseeker_stage_errors_total{{stage="{name}"}} {errors}')
+        counter_names = sorted({name for name, _ in _counters})
+        for counter_name in counter_names:
+            lines.append(f"# TYPE themeseeker_{counter_name}_total counter")
+            for (name, labels), value in sorted(_counters.items()):
+                if name == counter_name:
+                    lines.append(f"themeseeker_{name}_total{_label_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=None):
+    """
+    Serve /metrics on a background thread. Called on every rerun; only the
+    first call per process starts the server.
+
+    Parameters:
+    port (int): Port to listen on (default: THEMESEEKER_METRICS_PORT, or
+                no server when that is not set)
+
+    Returns:
+    int: The port being served, or None
+    """
+    global _metrics_server, _metrics_server_failed
+    with _lock:
+        if _metrics_server is not None:
+            return _metrics_server.server_address[1]
+        port = port or os.environ.get("THEMESEEKER_METRICS_PORT")
+        if not port or _metrics_server_failed:
+            return None
+        try:
+            _metrics_server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+        except OSError as e:
+            _metrics_server_failed = True
+            print(f"Could not start metrics server on port {port}: {str(e)}")
+            return None
+    threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    return _metrics_server.server_address[1]
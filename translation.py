@@ -0,0 +1,373 @@
+"""
+Theme translation with Gemini, to any number of languages at once.
+
+The English themes are split into segments (sentences and lines). Every
+segment already translated to a language is taken from a translation
+memory, a SQLite table keyed by language and segment hash, so recurring
+sentences (field boilerplate, repeated outlines, themes translated before)
+are never sent again. Only the remaining segments go to Gemini, in chunks
+of CHUNK_SEGMENTS, and the chunks of all languages are sent concurrently by
+a bounded thread pool, so each extra language adds about one request's
+latency to the slowest language rather than a full sequential pass.
+
+A glossary fixes the translation of recurring spiritual terms: a segment
+that is just a glossary term is answered from it, and the entries for the
+terms a chunk contains are given to Gemini with the chunk, so a term is
+translated the same way in every theme. The built-in entries are stored in
+the glossary table on first use; set_glossary_term() adds or overrides
+entries.
+
+Configuration (environment variables):
+    THEMESEEKER_TRANSLATION_DB  path of the SQLite database (default: data/translations.sqlite3)
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from gemini_client import configure_gemini, select_gemini_model, translation_json_model
+from json_extract import scan_json_candidates
+from locales import SOURCE_LANGUAGE, language_label, locale
+from prompt_builder import estimate_tokens, log_token_usage
+from themes import THEME_FIELDS, Theme
+from tracing import trace_span, traced, increment_counter
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "translations.sqlite3")
+
+# Segments sent to Gemini per request
+CHUNK_SEGMENTS = 60
+
+MAX_WORKERS = 8
+
+# Segment hashes looked up per query
+LOOKUP_BATCH = 500
+
+# Established translations of recurring terms: English term -> language -> translation
+GLOSSARY = {
+    "Golden Rosycross": {'portuguese': "Rosacruz Áurea", 'spanish': "Rosacruz Áurea",
+                         'french': "Rose-Croix d'Or", 'german': "Goldenes Rosenkreuz"},
+    "Lectorium Rosicrucianum": {'portuguese': "Lectorium Rosicrucianum", 'spanish': "Lectorium Rosicrucianum",
+                                'french': "Lectorium Rosicrucianum", 'german': "Lectorium Rosicrucianum"},
+    "Gnosis": {'portuguese': "Gnose", 'spanish': "Gnosis", 'french': "Gnose", 'german': "Gnosis"},
+    "rose of the heart": {'portuguese': "rosa do coração", 'spanish': "rosa del corazón",
+                          'french': "rose du cœur", 'german': "Rose des Herzens"},
+    "divine spark": {'portuguese': "centelha divina", 'spanish': "chispa divina",
+                     'french': "étincelle divine", 'german': "göttlicher Funke"},
+    "spirit-spark atom": {'portuguese': "átomo-centelha do espírito", 'spanish': "átomo chispa del espíritu",
+                          'french': "atome étincelle d'esprit", 'german': "Geistfunkenatom"},
+    "transfiguration": {'portuguese': "transfiguração", 'spanish': "transfiguración",
+                        'french': "transfiguration", 'german': "Transfiguration"},
+    "self-knowledge": {'portuguese': "autoconhecimento", 'spanish': "autoconocimiento",
+                       'french': "connaissance de soi", 'german': "Selbsterkenntnis"},
+    "inner path": {'portuguese': "caminho interior", 'spanish': "camino interior",
+                   'french': "chemin intérieur", 'german': "innerer Weg"},
+    "microcosm": {'portuguese': "microcosmo", 'spanish': "microcosmos",
+                  'french': "microcosme", 'german': "Mikrokosmos"},
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translation_memory (
+    language TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (language, source_hash)
+);
+CREATE TABLE IF NOT EXISTS glossary (
+    language TEXT NOT NULL,
+    term TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    PRIMARY KEY (language, term)
+);
+"""
+
+# Segment boundaries: line breaks, and white space after a sentence end
+_BOUNDARY = re.compile(r'(\n+|(?<=[.!?])[ \t]+)')
+_LETTER = re.compile(r'[^\W\d_]')
+
+
+def db_path():
+    return os.environ.get("THEMESEEKER_TRANSLATION_DB", DEFAULT_DB_PATH)
+
+
+def _connect():
+    path = db_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _seed_glossary(conn):
+    """Store the built-in glossary; entries changed with set_glossary_term() are kept."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO glossary (language, term, translation) VALUES (?, ?, ?)",
+        [(language, term, translation) for term, translations in GLOSSARY.items()
+         for language, translation in translations.items()],
+    )
+    conn.commit()
+
+
+def _segment_hash(segment):
+    return hashlib.sha256(segment.encode("utf-8")).hexdigest()
+
+
+def split_segments(text):
+    """
+    Split a text into segments and the separators between them.
+
+    Returns:
+    list: Alternating parts, segments at even and separators at odd
+          positions, so "".join(parts) == text
+    """
+    return _BOUNDARY.split(text)
+
+
+def _translatable(segment):
+    return bool(_LETTER.search(segment))
+
+
+def _glossary(conn, language):
+    """Glossary of a language: lowercase term -> (term, translation)."""
+    rows = conn.execute("SELECT term, translation FROM glossary WHERE language = ?", (language,)).fetchall()
+    return {term.lower(): (term, translation) for term, translation in rows}
+
+
+def _recall(conn, language, segments):
+    """Translations of segments found in the memory: segment -> translation."""
+    known = {}
+    hashes = {_segment_hash(segment): segment for segment in segments}
+    keys = list(hashes)
+    for start in range(0, len(keys), LOOKUP_BATCH):
+        batch = keys[start:start + LOOKUP_BATCH]
+        rows = conn.execute(
+            f"SELECT source_hash, target FROM translation_memory "
+            f"WHERE language = ? AND source_hash IN ({','.join('?' * len(batch))})",
+            [language, *batch],
+        )
+        for source_hash, target in rows:
+            known[hashes[source_hash]] = target
+    return known
+
+
+def _remember(conn, language, segments, translations):
+    now = time.time()
+    conn.executemany(
+        "INSERT OR REPLACE INTO translation_memory (language, source_hash, source, target, created_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [(language, _segment_hash(segment), segment, translation, now)
+         for segment, translation in zip(segments, translations)],
+    )
+    conn.commit()
+
+
+def _parse_translations(text, expected):
+    """Decode the JSON array of translated strings; raises ValueError unless it has one per segment."""
+    candidates = [text] + sorted(scan_json_candidates(text or ""), key=len, reverse=True)
+    for candidate in candidates:
+        try:
+            value = json.loads(candidate)
+        except (TypeError, ValueError):
+            continue
+        if isinstance(value, list) and len(value) == expected and all(isinstance(item, str) for item in value):
+            return value
+    raise ValueError(f"Expected a JSON array of {expected} translated segments")
+
+
+def _translate_segments(model_name, language, segments, glossary):
+    """
+    Translate one chunk of segments with Gemini.
+
+    Parameters:
+    model_name (str): Gemini model name
+    language (str): Target language
+    segments (list): English segments, in document order
+    glossary (dict): Glossary of the language (see _glossary)
+
+    Returns:
+    list: The translations, in segment order
+    """
+    text = "\n".join(segments).lower()
+    terms = [entry for lowered, entry in glossary.items() if lowered in text]
+    glossary_text = ""
+    if terms:
+        glossary_text = "Use these established translations of recurring terms:\n" + "\n".join(
+            f"- {term}: {translation}" for term, translation in terms) + "\n\n"
+
+    target = language_label(language)
+    prompt = f"""
+You are a professional translator with expertise in spirituality, philosophy, and psychology.
+
+Translate each of the following {len(segments)} text segments from English to {target} ({locale(language)['code']}). The segments are sentences and lines of lecture themes, in document order; use the neighbouring segments as context.
+
+Pay special attention to properly translating spiritual and philosophical terms. The translation should sound natural and idiomatic in {target} while preserving the spiritual essence and meaning of the original. Keep Markdown markers, numbering and quotation marks as they are.
+
+{glossary_text}Segments (JSON array):
+{json.dumps(segments, ensure_ascii=False, indent=0)}
+
+IMPORTANT: Return ONLY a JSON array of exactly {len(segments)} strings: the translation of each segment, in the same order.
+"""
+    with trace_span("gemini.translate", model=model_name, language=language, segments=len(segments)):
+        response = translation_json_model(model_name).generate_content(prompt)
+    log_token_usage("translate_themes", response, estimate_tokens(prompt))
+    return _parse_translations(response.text, len(segments))
+
+
+def _translate_part(part, translations):
+    """Replace a segment by its translation, keeping the white space around it."""
+    stripped = part.strip()
+    if stripped not in translations:
+        return part
+    start = part.index(stripped)
+    return part[:start] + translations[stripped] + part[start + len(stripped):]
+
+
+def _translate_theme(theme, layouts, translations):
+    """A theme with its segments replaced by their translations; keeps the theme ID."""
+    fields = {}
+    for field in THEME_FIELDS:
+        parts = layouts[field]
+        fields[field] = "".join(
+            _translate_part(part, translations) if i % 2 == 0 else part for i, part in enumerate(parts)
+        )
+    return Theme.from_dict(dict(fields, theme_id=theme.theme_id))
+
+
+@traced("translate_themes")
+def translate_themes(api_key, themes, languages):
+    """
+    Translate English themes to several languages concurrently, reusing the
+    translation memory and glossary.
+
+    When a request of a language fails, the themes with a segment from its
+    chunk are left out of that language, rather than returned partly or
+    wholly in English; the segments translated before the failure stay in
+    the memory for the next attempt.
+
+    Parameters:
+    api_key (str): Gemini API key
+    themes (list): Theme objects in English
+    languages (list): Target language names, e.g. ["portuguese", "spanish"]
+
+    Returns:
+    tuple: (dict language -> list of translated Theme objects sharing the
+           IDs of the English themes, stats dict with distinct 'segments', per-language
+           'from_memory' and 'translated' counts, 'requests' and 'errors'
+           (language -> message))
+    """
+    languages = [language for language in dict.fromkeys(languages) if language != SOURCE_LANGUAGE]
+    layouts = [{field: split_segments(getattr(theme, field) or "") for field in THEME_FIELDS} for theme in themes]
+    segments = list(dict.fromkeys(
+        part.strip() for layout in layouts for parts in layout.values() for part in parts[0::2] if _translatable(part)
+    ))
+    stats = {'segments': len(segments), 'from_memory': {}, 'translated': {}, 'requests': 0, 'errors': {}}
+    if not languages:
+        return {}, stats
+
+    conn = _connect()
+    try:
+        _seed_glossary(conn)
+        glossaries = {language: _glossary(conn, language) for language in languages}
+        known = {}
+        pending = {}
+        for language in languages:
+            known[language] = _recall(conn, language, segments)
+            for segment in segments:
+                entry = glossaries[language].get(segment.lower())
+                if segment not in known[language] and entry:
+                    known[language][segment] = entry[1]
+            pending[language] = [segment for segment in segments if segment not in known[language]]
+            stats['from_memory'][language] = len(segments) - len(pending[language])
+            stats['translated'][language] = 0
+
+        chunks = [(language, pending[language][start:start + CHUNK_SEGMENTS])
+                  for language in languages for start in range(0, len(pending[language]), CHUNK_SEGMENTS)]
+        stats['requests'] = len(chunks)
+        if chunks:
+            configure_gemini(api_key)
+            model_name = select_gemini_model()
+            with trace_span("translation.fan_out", languages=len(languages), requests=len(chunks)), \
+                    ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunks))) as executor:
+                futures = [
+                    (language, chunk,
+                     executor.submit(_translate_segments, model_name, language, chunk, glossaries[language]))
+                    for language, chunk in chunks
+                ]
+                # The memory is written from this thread only
+                for language, chunk, future in futures:
+                    try:
+                        translations = future.result()
+                    except Exception as e:
+                        stats['errors'][language] = str(e)
+                        continue
+                    _remember(conn, language, chunk, translations)
+                    known[language].update(zip(chunk, translations))
+                    stats['translated'][language] += len(chunk)
+    finally:
+        conn.close()
+
+    results = {}
+    for language in languages:
+        increment_counter("translation_segments", stats['from_memory'][language], language=language, source="memory")
+        increment_counter("translation_segments", stats['translated'][language], language=language, source="gemini")
+        complete = list(zip(themes, layouts))
+        if language in stats['errors']:
+            print(f"Error translating themes to {language_label(language)}: {stats['errors'][language]}")
+            complete = [(theme, layout) for theme, layout in complete
+                        if all(part.strip() in known[language] for parts in layout.values()
+                               for part in parts[0::2] if _translatable(part))]
+        results[language] = [_translate_theme(theme, layout, known[language]) for theme, layout in complete]
+    return results, stats
+
+
+def set_glossary_term(language, term, translation):
+    """
+    Add or change the established translation of a term.
+
+    Parameters:
+    language (str): Target language name
+    term (str): English term
+    translation (str): Its translation
+    """
+    conn = _connect()
+    try:
+        _seed_glossary(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO glossary (language, term, translation) VALUES (?, ?, ?)",
+            (language, term, translation),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def translation_memory_stats():
+    """
+    Size of the translation memory per language.
+
+    Returns:
+    list: Dicts with 'language', 'segments' and 'glossary_terms'
+    """
+    conn = _connect()
+    try:
+        segments = dict(conn.execute("SELECT language, COUNT(*) FROM translation_memory GROUP BY language"))
+        terms = dict(conn.execute("SELECT language, COUNT(*) FROM glossary GROUP BY language"))
+    finally:
+        conn.close()
+    return [{'language': language, 'segments': segments.get(language, 0), 'glossary_terms': terms.get(language, 0)}
+            for language in sorted(set(segments) | set(terms))]
+
+
+def clear_translation_memory():
+    """Forget all remembered segment translations; the glossary is kept."""
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM translation_memory")
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,253 @@
+"""
+YouTube mining: per-query search with a process-level cache, and
+concurrent fan-out over several queries with merged, re-ranked results.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from googleapiclient.discovery import build
+
+from tracing import trace_span, increment_counter
+
+# One query per topic area that generate_video_context knows how to label
+DEFAULT_QUERIES = [
+    "spirituality philosophy meaning of life",
+    "meditation mindfulness practice",
+    "gnosticism gnostic teachings",
+    "near death experience afterlife",
+    "buddhism zen taoism wisdom",
+    "consciousness awakening spiritual",
+    "mystical christianity esoteric",
+    "hermeticism rosicrucian alchemy",
+]
+
+# YouTube Data API quota units
+SEARCH_QUOTA_COST = 100
+VIDEOS_LIST_QUOTA_COST = 1
+QUERY_QUOTA_COST = SEARCH_QUOTA_COST + VIDEOS_LIST_QUOTA_COST
+
+DEFAULT_QUOTA_BUDGET = 1000
+
+# Cached query results are reused for this many seconds
+QUERY_CACHE_TTL = 3 * 60 * 60
+
+# Cached query results kept at most; the oldest are dropped first
+QUERY_CACHE_SIZE = 256
+
+MAX_WORKERS = 8
+
+# In the order the results were stored, so the expired ones come first
+_query_cache = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+def _thumbnail(item, size):
+    """Return the URL of a thumbnail size, falling back to any available one."""
+    thumbnails = item['snippet'].get('thumbnails', {})
+    for name in (size, 'medium', 'default', 'high'):
+        if name in thumbnails:
+            return thumbnails[name]['url']
+    return ""
+
+
+def build_youtube(api_key):
+    """
+    Create a YouTube Data API client. When YOUTUBE_API_ENDPOINT is set (e.g.
+    to a local stand-in server for benchmarks), requests are sent there.
+    """
+    endpoint = os.environ.get("YOUTUBE_API_ENDPOINT")
+    if endpoint:
+        return build("youtube", "v3", developerKey=api_key, client_options={"api_endpoint": endpoint})
+    return build("youtube", "v3", developerKey=api_key)
+
+
+def get_popular_videos(api_key, query, max_results, published_after):
+    """
+    Search YouTube for a query and return the videos with their statistics,
+    most viewed first. Errors are raised to the caller.
+
+    Parameters:
+    api_key (str): YouTube Data API key
+    query (str): Search query
+    max_results (int): Maximum number of videos (1-50)
+    published_after (str): RFC 3339 timestamp
+
+    Returns:
+    list: Video dictionaries
+    """
+    youtube = build_youtube(api_key)
+
+    # First get video IDs from search
+    with trace_span("youtube.search", query=query):
+        increment_counter("youtube_quota_units", SEARCH_QUOTA_COST, call="search.list")
+        search_response = youtube.search().list(
+            part="id,snippet",
+            q=query,
+            type="video",
+            order="viewCount",
+            publishedAfter=published_after,
+            maxResults=max_results
+        ).execute()
+
+    video_ids = [item['id']['videoId'] for item in search_response['items']]
+    if not video_ids:
+        return []
+
+    # Get detailed video statistics
+    with trace_span("youtube.videos_list", videos=len(video_ids)):
+        increment_counter("youtube_quota_units", VIDEOS_LIST_QUOTA_COST, call="videos.list")
+        videos_response = youtube.videos().list(
+            part="snippet,statistics",
+            id=','.join(video_ids)
+        ).execute()
+
+    results = []
+    for item in videos_response['items']:
+        results.append({
+            'title': item['snippet']['title'],
+            'channel': item['snippet']['channelTitle'],
+            'channel_id': item['snippet'].get('channelId'),
+            'published_at': item['snippet']['publishedAt'],
+            'view_count': int(item['statistics'].get('viewCount', 0)),
+            'like_count': int(item['statistics'].get('likeCount', 0)),
+            'comment_count': int(item['statistics'].get('commentCount', 0)),
+            'video_id': item['id'],
+            'thumbnail': _thumbnail(item, 'medium'),
+            'thumbnail_small': _thumbnail(item, 'default'),
+            'description': item['snippet']['description']
+        })
+
+    # Sort by view count
+    results.sort(key=lambda x: x['view_count'], reverse=True)
+    return results
+
+
+def _cache_key(query, max_results, published_after):
+    # The period start moves every second; results are reused within the day
+    return (query.strip().lower(), max_results, published_after[:10])
+
+
+def get_cached_query(query, max_results, published_after):
+    """Return cached results for a query, or None if absent or expired."""
+    key = _cache_key(query, max_results, published_after)
+    with _query_cache_lock:
+        entry = _query_cache.get(key)
+        if entry and time.time() - entry[0] < QUERY_CACHE_TTL:
+            return entry[1]
+        _query_cache.pop(key, None)
+    return None
+
+
+def _store_cached_query(query, max_results, published_after, videos):
+    key = _cache_key(query, max_results, published_after)
+    now = time.time()
+    with _query_cache_lock:
+        _query_cache.pop(key, None)
+        _query_cache[key] = (now, videos)
+        # Drop expired entries, which are never looked up again in a long-running server
+        while _query_cache and (len(_query_cache) > QUERY_CACHE_SIZE
+                                or now - next(iter(_query_cache.values()))[0] >= QUERY_CACHE_TTL):
+            _query_cache.popitem(last=False)
+
+
+def _popularity_scores(videos):
+    """
+    Log-scaled views relative to the query's most viewed video, so that each
+    query contributes on the same 0-1 scale regardless of its audience size.
+    """
+    top = max((video['view_count'] for video in videos), default=0)
+    if top <= 0:
+        return [0.0] * len(videos)
+    return [math.log1p(video['view_count']) / math.log1p(top) for video in videos]
+
+
+def merge_query_results(results_by_query):
+    """
+    Merge per-query results, deduplicating by video ID and ranking by the
+    best normalized popularity score a video reached in any query.
+
+    Parameters:
+    results_by_query (dict): query -> list of video dicts
+
+    Returns:
+    list: Merged video dicts with 'popularity_score' and 'queries'
+    """
+    merged = {}
+    for query, videos in results_by_query.items():
+        for video, score in zip(videos, _popularity_scores(videos)):
+            entry = merged.get(video['video_id'])
+            if entry is None:
+                entry = dict(video, popularity_score=score, queries=[query])
+                merged[video['video_id']] = entry
+            else:
+                entry['popularity_score'] = max(entry['popularity_score'], score)
+                entry['queries'].append(query)
+
+    return sorted(merged.values(), key=lambda v: (v['popularity_score'], v['view_count']), reverse=True)
+
+
+def mine_period(api_key, queries, max_results, published_after, quota_budget=DEFAULT_QUOTA_BUDGET):
+    """
+    Run several queries for one period concurrently and merge the results.
+
+    Cached queries are free; uncached ones are run in the given order while
+    the quota budget allows it, the rest are skipped.
+
+    Parameters:
+    api_key (str): YouTube Data API key
+    queries (list): Search queries
+    max_results (int): Maximum videos per query
+    published_after (str): RFC 3339 timestamp
+    quota_budget (int): Maximum YouTube quota units to spend
+
+    Returns:
+    tuple: (merged videos, stats dict with queries run/cached/skipped,
+            quota used and errors)
+    """
+    queries = list(dict.fromkeys(q.strip() for q in queries if q.strip()))
+    results = {}
+    to_fetch = []
+    skipped = []
+    remaining = quota_budget
+
+    for query in queries:
+        cached = get_cached_query(query, max_results, published_after)
+        if cached is not None:
+            results[query] = cached
+        elif remaining >= QUERY_QUOTA_COST:
+            to_fetch.append(query)
+            remaining -= QUERY_QUOTA_COST
+        else:
+            skipped.append(query)
+
+    errors = {}
+    if to_fetch:
+        with trace_span("youtube.mine_period", queries=len(to_fetch)), ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(to_fetch))) as executor:
+            futures = {
+                query: executor.submit(get_popular_videos, api_key, query, max_results, published_after)
+                for query in to_fetch
+            }
+            for query, future in futures.items():
+                try:
+                    videos = future.result()
+                except Exception as e:
+                    errors[query] = str(e)
+                    continue
+                _store_cached_query(query, max_results, published_after, videos)
+                results[query] = videos
+
+    # Keep the configured query order so ties resolve the same way every time
+    ordered = {query: results[query] for query in queries if query in results}
+
+    stats = {
+        'queries_run': len(to_fetch),
+        'queries_cached': len(queries) - len(to_fetch) - len(skipped),
+        'queries_skipped': skipped,
+        'quota_used': len(to_fetch) * QUERY_QUOTA_COST,
+        'errors': errors,
+    }
+    return merge_query_results(ordered), stats